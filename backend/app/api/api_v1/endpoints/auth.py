@@ -3,12 +3,14 @@ from typing import Any
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError, jwt
 
 from app.core.auth import (
     authenticate_user,
     create_access_token,
     create_refresh_token,
     get_password_hash,
+    get_user,
     get_user_by_email,
     Token,
     User,
@@ -108,7 +110,7 @@ async def register_user(
     user_in_db = UserInDB(
         email=user_in.email,
         name=user_in.name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash(user_in.password),
     )
     
     # Insertion dans la base de données
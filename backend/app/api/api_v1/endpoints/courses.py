@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from pymongo import DESCENDING, ReturnDocument
 from typing import List, Optional
 
 from app.core.auth import get_current_active_user
-from app.db.mongodb import get_database
+from app.core.conditional import ConditionalGet
+from app.core.pagination import PageParams, encode_cursor, keyset_filter, paginate, set_page_headers
+from app.core.responses import ModelSerializer, list_response
+from app.db import note_codec
+from app.db.mongodb import get_database, to_object_id
+from app.models.note import NOTE_SUMMARY_PROJECTION, NoteResponse, NoteSummary
+from app.services import purge, scheduler
+from app.services.autocomplete import autocomplete_index
+from app.services.due_queue import due_queue
 from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
-from app.db.mongodb import ObjectIdField, PyObjectId
+from datetime import datetime, timedelta
+from app.db.mongodb import ObjectIdField, PyObjectId, StrObjectId
 
 # Modèles pour les cours (normalement dans un fichier séparé)
 class CourseBase(BaseModel):
@@ -38,27 +47,46 @@ class CourseInDB(CourseBase):
     )
 
 class CourseResponse(CourseBase):
-    id: str = Field(..., alias="_id")
+    id: StrObjectId = Field(..., alias="_id")
     user_id: str
     created_at: datetime
     updated_at: Optional[datetime] = None
     
     model_config = ConfigDict(populate_by_name=True)
 
+class DueRevisionCounts(BaseModel):
+    due: int = 0  # en retard ou à faire maintenant
+    today: int = 0  # d'ici la fin de la journée (UTC), `due` compris
+    week: int = 0  # dans les 7 prochains jours, `today` compris
+
+class CourseDashboard(BaseModel):
+    course: CourseResponse
+    notes: List[NoteSummary]  # page de notes, la plus récente d'abord
+    note_count: int = 0
+    last_updated_at: Optional[datetime] = None
+    revisions: DueRevisionCounts = DueRevisionCounts()
+
 router = APIRouter()
 
+course_serializer = ModelSerializer(CourseResponse)
+note_serializer = ModelSerializer(NoteResponse)
+
 @router.get("/", response_model=List[CourseResponse])
 async def read_courses(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(),
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
 ):
     """
     Récupère les cours de l'utilisateur.
     """
-    courses = await db.courses.find({"user_id": str(current_user.id)}).skip(skip).limit(limit).to_list(limit)
-    return courses
+    courses, next_cursor = await paginate(
+        db.courses, {"user_id": str(current_user.id), "deleted_at": None}, page,
+        sort_field="created_at", projection=course_serializer.projection,
+    )
+    set_page_headers(response, page, next_cursor)
+    return list_response(courses, course_serializer, response)
 
 @router.post("/", response_model=CourseResponse, status_code=status.HTTP_201_CREATED)
 async def create_course(
@@ -69,42 +97,43 @@ async def create_course(
     """
     Crée un nouveau cours.
     """
-    # TODO: Implémenter la logique de création
-    # Placeholder pour test
-    return {
-        "_id": "courseid123",
-        "name": course.name,
-        "description": course.description,
-        "tags": course.tags,
-        "color": course.color,
-        "icon": course.icon,
-        "user_id": str(current_user.id),
-        "created_at": "2023-01-01T00:00:00",
-        "updated_at": None
-    }
+    course_in_db = CourseInDB(**course.model_dump(), user_id=str(current_user.id))
+    course_doc = course_in_db.model_dump(by_alias=True)
+    await db.courses.insert_one(course_doc)
+    autocomplete_index.set_course(str(current_user.id), str(course_doc["_id"]), course_doc["name"])
+    return course_doc
+
+async def _get_course(db, course_id: str, user_id: str, projection: Optional[dict] = None) -> dict:
+    """
+    Charge un cours de l'utilisateur ou lève une 404.
+    """
+    course = await db.courses.find_one(
+        {"_id": to_object_id(course_id), "user_id": user_id, "deleted_at": None}, projection
+    )
+    if course is None:
+        raise HTTPException(status_code=404, detail="Cours non trouvé")
+    return course
+
+def _course_version(course: dict):
+    return course.get("updated_at") or course["created_at"]
 
 @router.get("/{course_id}", response_model=CourseResponse)
 async def read_course(
     course_id: str,
+    conditional: ConditionalGet = Depends(),
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
 ):
     """
-    Récupère un cours spécifique.
+    Récupère un cours spécifique (GET conditionnel, voir read_note).
     """
-    # TODO: Implémenter la logique de récupération
-    # Placeholder pour test
-    return {
-        "_id": course_id,
-        "name": "Nom du cours",
-        "description": "Description du cours...",
-        "tags": ["tag1", "tag2"],
-        "color": "#4287f5",
-        "icon": "book",
-        "user_id": str(current_user.id),
-        "created_at": "2023-01-01T00:00:00",
-        "updated_at": None
-    }
+    user_id = str(current_user.id)
+    if conditional.requested:
+        current = await _get_course(db, course_id, user_id, {"created_at": 1, "updated_at": 1})
+        conditional.check("course", course_id, _course_version(current))
+    course = await _get_course(db, course_id, user_id, course_serializer.projection)
+    conditional.check("course", course_id, _course_version(course))
+    return course
 
 @router.put("/{course_id}", response_model=CourseResponse)
 async def update_course(
@@ -116,19 +145,19 @@ async def update_course(
     """
     Met à jour un cours.
     """
-    # TODO: Implémenter la logique de mise à jour
-    # Placeholder pour test
-    return {
-        "_id": course_id,
-        "name": course_update.name or "Nom du cours",
-        "description": course_update.description or "Description du cours...",
-        "tags": course_update.tags or ["tag1", "tag2"],
-        "color": course_update.color or "#4287f5",
-        "icon": course_update.icon or "book",
-        "user_id": str(current_user.id),
-        "created_at": "2023-01-01T00:00:00",
-        "updated_at": "2023-01-02T00:00:00"
-    }
+    update_data = course_update.model_dump(exclude_unset=True)
+    # `updated_at` sert aussi de version pour l'ETag
+    update_data["updated_at"] = datetime.utcnow()
+    course = await db.courses.find_one_and_update(
+        {"_id": to_object_id(course_id), "user_id": str(current_user.id), "deleted_at": None},
+        {"$set": update_data},
+        projection=course_serializer.projection,
+        return_document=ReturnDocument.AFTER,
+    )
+    if course is None:
+        raise HTTPException(status_code=404, detail="Cours non trouvé")
+    autocomplete_index.set_course(str(current_user.id), course_id, course["name"])
+    return course
 
 @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_course(
@@ -138,44 +167,128 @@ async def delete_course(
 ):
     """
     Supprime un cours.
+    
+    Le cours est masqué immédiatement ; ses notes et leurs dépendances sont
+    supprimées en tâche de fond par le purgeur.
     """
-    # TODO: Implémenter la logique de suppression
+    user_id = str(current_user.id)
+    result = await db.courses.update_one(
+        {"_id": to_object_id(course_id), "user_id": user_id, "deleted_at": None},
+        {"$set": {"deleted_at": datetime.utcnow()}},
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Cours non trouvé")
+    await purge.enqueue(db, purge.COURSE, course_id, user_id)
+    autocomplete_index.remove_course(user_id, course_id)
+    await due_queue.invalidate(user_id)
     return None
 
-@router.get("/{course_id}/notes", response_model=List[dict])  # Idéalement, utilisez un modèle approprié
-async def read_course_notes(
+@router.get("/{course_id}/dashboard", response_model=CourseDashboard)
+async def read_course_dashboard(
     course_id: str,
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(),
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
 ):
     """
-    Récupère les notes associées à un cours.
-    """
-    # TODO: Implémenter la logique de récupération
-    # Placeholder pour test
-    return [
-        {
-            "_id": "note1",
-            "title": "Note 1 du cours",
-            "content": "Contenu...",
-            "tags": ["tag1"],
-            "course_id": course_id,
-            "creator_id": str(current_user.id),
-            "created_at": "2023-01-01T00:00:00",
-            "updated_at": None,
-            "version": 1
-        },
-        {
-            "_id": "note2",
-            "title": "Note 2 du cours",
-            "content": "Contenu...",
-            "tags": ["tag2"],
-            "course_id": course_id,
-            "creator_id": str(current_user.id),
-            "created_at": "2023-01-02T00:00:00",
-            "updated_at": None,
-            "version": 1
-        }
+    Page d'un cours en une seule agrégation : le cours, une page de ses notes
+    (pagination par curseur, comme read_notes), leur nombre, la date de
+    dernière modification et le nombre de révisions à faire.
+    
+    Les notes et les révisions sont jointes par des `$lookup` non corrélés,
+    chacun servi par un index ; les notes passent par un `$facet` (page et
+    statistiques sur le même parcours).
+    """
+    user_id = str(current_user.id)
+    now = datetime.utcnow()
+    tomorrow = datetime(now.year, now.month, now.day) + timedelta(days=1)
+
+    notes_page = []
+    if page.cursor:
+        notes_page.append({"$match": keyset_filter("created_at", DESCENDING, page.cursor)})
+    if page.skip:
+        notes_page.append({"$skip": page.skip})
+    # Un document supplémentaire indique s'il existe une page suivante
+    notes_page += [{"$limit": page.limit + 1}, {"$project": NOTE_SUMMARY_PROJECTION}]
+
+    pipeline = [
+        {"$match": {"_id": to_object_id(course_id), "user_id": user_id, "deleted_at": None}},
+        {"$project": course_serializer.projection},
+        {"$lookup": {
+            "from": "notes",
+            "pipeline": [
+                {"$match": {"creator_id": user_id, "is_deleted": False, "course_id": course_id}},
+                {"$sort": {"created_at": DESCENDING, "_id": DESCENDING}},
+                {"$facet": {
+                    "page": notes_page,
+                    "stats": [{"$group": {
+                        "_id": None,
+                        "count": {"$sum": 1},
+                        "last_updated_at": {"$max": {"$ifNull": ["$updated_at", "$created_at"]}},
+                    }}],
+                }},
+            ],
+            "as": "notes",
+        }},
+        {"$lookup": {
+            "from": "revisions",
+            "pipeline": [
+                {"$match": {
+                    "user_id": user_id,
+                    "course_id": course_id,
+                    "status": {"$in": scheduler.REVIEWABLE_STATUSES},
+                    "scheduled_date": {"$lt": now + timedelta(days=7)},
+                }},
+                {"$group": {
+                    "_id": None,
+                    "due": {"$sum": {"$cond": [{"$lte": ["$scheduled_date", now]}, 1, 0]}},
+                    "today": {"$sum": {"$cond": [{"$lt": ["$scheduled_date", tomorrow]}, 1, 0]}},
+                    "week": {"$sum": 1},
+                }},
+                {"$project": {"_id": 0}},
+            ],
+            "as": "revisions",
+        }},
     ]
+    results = await db.courses.aggregate(pipeline).to_list(1)
+    if not results:
+        raise HTTPException(status_code=404, detail="Cours non trouvé")
+    course = results[0]
+    facets = course.pop("notes")[0]
+    revisions = course.pop("revisions")
+    stats = facets["stats"][0] if facets["stats"] else {}
+
+    notes = facets["page"]
+    next_cursor = None
+    if len(notes) > page.limit:
+        notes = notes[:page.limit]
+        next_cursor = encode_cursor(notes[-1], "created_at")
+    set_page_headers(response, page, next_cursor)
+    return {
+        "course": course,
+        "notes": notes,
+        "note_count": stats.get("count", 0),
+        "last_updated_at": stats.get("last_updated_at"),
+        "revisions": revisions[0] if revisions else {},
+    }
+
+@router.get("/{course_id}/notes", response_model=List[NoteResponse])
+async def read_course_notes(
+    course_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Récupère les notes associées à un cours, la plus récente d'abord.
+    """
+    user_id = str(current_user.id)
+    await _get_course(db, course_id, user_id, {"_id": 1})
+    notes, next_cursor = await paginate(
+        db.notes, {"creator_id": user_id, "is_deleted": False, "course_id": course_id}, page,
+        sort_field="created_at", projection=note_serializer.projection,
+    )
+    set_page_headers(response, page, next_cursor)
+    return list_response([note_codec.decode_note(note) for note in notes], note_serializer, response)
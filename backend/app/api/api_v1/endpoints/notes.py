@@ -1,16 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
 
 from app.core.auth import get_current_active_user
-from app.models.note import NoteCreate, NoteInDB, NoteResponse, NoteUpdate, NoteFilter
+from app.core.conditional import ConditionalGet
+from app.core.pagination import PageParams, paginate, set_page_headers
+from app.core.responses import ModelSerializer, list_response, ndjson_stream
+from app.models.note import (
+    NOTE_SUMMARY_PROJECTION,
+    AutocompleteSuggestion,
+    DuplicateCluster,
+    NoteBatchGetRequest,
+    NoteBatchGetResponse,
+    NoteCounts,
+    NoteCreate,
+    NoteFilter,
+    NoteImportResult,
+    NoteInDB,
+    NotePatch,
+    NotePatchResponse,
+    NoteResponse,
+    NoteSearchResponse,
+    NoteSummary,
+    NoteUpdate,
+    NoteVersionInfo,
+    NoteVersionResponse,
+    RelatedNote,
+    RelatedNotesRequest,
+    build_snippet,
+)
+from app.db import note_codec
+from app.db.mongodb import to_object_id
+from app.services import counters, dedup, note_transfer, purge, search, versioning
+from app.services.autocomplete import autocomplete_index
+from app.services.due_queue import due_queue
+from app.services.semantic import semantic_index
 from app.db.mongodb import get_database
 
 router = APIRouter()
 
+# Tentatives d'une sauvegarde incrémentale face aux écritures concurrentes
+PATCH_MAX_ATTEMPTS = 3
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EXPORT_BATCH_SIZE = 500
+
+note_serializer = ModelSerializer(NoteResponse)
+note_summary_serializer = ModelSerializer(NoteSummary)
+
+def _notes_filter(current_user, course_id: Optional[str], tag: Optional[str]) -> dict:
+    """
+    Construit le filtre de liste des notes de l'utilisateur.
+    """
+    filter_query = {"creator_id": str(current_user.id), "is_deleted": False}
+    
+    if course_id:
+        filter_query["course_id"] = course_id
+    
+    if tag:
+        filter_query["tags"] = tag
+    
+    return filter_query
+
 @router.get("/", response_model=List[NoteResponse])
 async def read_notes(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(),
     course_id: Optional[str] = None,
     tag: Optional[str] = None,
     db = Depends(get_database),
@@ -19,18 +78,109 @@ async def read_notes(
     """
     Récupère les notes de l'utilisateur avec filtrage optionnel.
     """
-    # Construction du filtre
-    filter_query = {"creator_id": str(current_user.id), "is_deleted": False}
+    filter_query = _notes_filter(current_user, course_id, tag)
     
-    if course_id:
-        filter_query["course_id"] = course_id
+    # Récupération des notes, des plus récentes aux plus anciennes
+    notes, next_cursor = await paginate(
+        db.notes, filter_query, page, sort_field="created_at", projection=note_serializer.projection
+    )
+    for note in notes:
+        note_codec.decode_note(note)
+    set_page_headers(response, page, next_cursor)
+    return list_response(notes, note_serializer, response)
+
+@router.get("/summary", response_model=List[NoteSummary])
+async def read_notes_summary(
+    response: Response,
+    page: PageParams = Depends(),
+    course_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Liste allégée des notes : titre, tags, dates et aperçu, sans le contenu complet.
+    """
+    filter_query = _notes_filter(current_user, course_id, tag)
     
-    if tag:
-        filter_query["tags"] = tag
+    notes, next_cursor = await paginate(
+        db.notes, filter_query, page, sort_field="created_at", projection=NOTE_SUMMARY_PROJECTION
+    )
+    set_page_headers(response, page, next_cursor)
+    return list_response(notes, note_summary_serializer, response)
+
+@router.get("/counts", response_model=NoteCounts)
+async def read_note_counts(
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Nombre de notes par tag et par cours (barre latérale), lu depuis les
+    compteurs matérialisés.
+    """
+    return await counters.get_counts(db, str(current_user.id))
+
+@router.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Suggestions par préfixe (titres, tags, cours) depuis l'index en mémoire.
+    """
+    return await autocomplete_index.complete(db, str(current_user.id), q, limit)
+
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+async def read_duplicate_notes(
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Groupes de notes quasi identiques (contenu collé plusieurs fois, OCR
+    du même document...), à partir des signatures MinHash des notes.
+    """
+    return await dedup.find_clusters(db, str(current_user.id))
+
+@router.get("/export")
+async def export_notes(
+    course_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Exporte les notes de l'utilisateur en NDJSON (une note par ligne),
+    en flux depuis un curseur MongoDB.
+    """
+    cursor = db.notes.find(
+        _notes_filter(current_user, course_id, tag), note_serializer.projection
+    ).sort([("created_at", ASCENDING), ("_id", ASCENDING)]).batch_size(EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        ndjson_stream((note_codec.decode_note(note) async for note in cursor), note_serializer),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="notes.ndjson"'},
+    )
+
+@router.post("/import", response_model=NoteImportResult)
+async def import_notes(
+    request: Request,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Importe des notes depuis un corps NDJSON (une NoteCreate par ligne).
     
-    # Récupération des notes
-    notes = await db.notes.find(filter_query).skip(skip).limit(limit).to_list(limit)
-    return notes
+    Le corps est lu au fil de l'eau et inséré par lots ; les lignes invalides
+    sont ignorées et signalées avec leur numéro.
+    """
+    user_id = str(current_user.id)
+    result = await note_transfer.import_notes(db, user_id, request.stream())
+    if result["inserted"]:
+        semantic_index.invalidate(user_id)
+        autocomplete_index.invalidate(user_id)
+    return result
 
 @router.post("/", response_model=NoteResponse, status_code=status.HTTP_201_CREATED)
 async def create_note(
@@ -41,42 +191,151 @@ async def create_note(
     """
     Crée une nouvelle note.
     """
-    # TODO: Implémenter la logique de création
-    # Placeholder pour test
+    note_in_db = NoteInDB(**note.model_dump(), creator_id=str(current_user.id))
+    note_doc = note_in_db.model_dump(by_alias=True)
+    await db.notes.insert_one(note_codec.encode_note(note_doc))
+    await counters.record_change(db, str(current_user.id), None, note_doc)
+    autocomplete_index.set_note(str(current_user.id), str(note_doc["_id"]), note_doc["title"], note_doc["tags"])
+    await dedup.record(db, str(current_user.id), str(note_doc["_id"]), 1, note_doc["content"])
+    await versioning.record_version(
+        db, str(note_doc["_id"]), 1, note_doc["title"], note_doc["content"], str(current_user.id)
+    )
+    semantic_index.upsert(str(current_user.id), str(note_doc["_id"]), note_doc)
+    return note_doc
+
+@router.post("/batch-get", response_model=NoteBatchGetResponse, response_model_exclude_unset=True)
+async def batch_get_notes(
+    request: NoteBatchGetRequest,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Récupère plusieurs notes en une seule requête `$in`, dans l'ordre demandé.
+    
+    Les notes de l'utilisateur et celles qui lui sont partagées (partage actif
+    et non expiré) sont renvoyées ; les autres identifiants sont listés dans
+    `not_found`, sans distinguer absence et refus d'accès.
+    """
+    user_id = str(current_user.id)
+    note_ids = list(dict.fromkeys(request.ids))
+    object_ids = [oid for oid in (to_object_id(i) for i in note_ids) if isinstance(oid, ObjectId)]
+
+    projection = dict(note_serializer.projection)
+    if request.fields is not None:
+        projection = {field: 1 for field in request.fields}
+    # Nécessaire au contrôle d'accès, retiré ensuite s'il n'a pas été demandé
+    projection["creator_id"] = 1
+
+    cursor = db.notes.find({"_id": {"$in": object_ids}, "is_deleted": False}, projection)
+    found = {str(note["_id"]): note_codec.decode_note(note) async for note in cursor}
+
+    # Contrôle des partages groupé pour les notes d'autres utilisateurs
+    foreign = [note_id for note_id, note in found.items() if note["creator_id"] != user_id]
+    shared = set()
+    if foreign:
+        shares = db.shares.find(
+            {
+                "note_id": {"$in": foreign},
+                "active": True,
+                "$and": [
+                    {"$or": [{"target_user_id": user_id}, {"target_email": current_user.email}]},
+                    {"$or": [{"expiration_date": None}, {"expiration_date": {"$gt": datetime.utcnow()}}]},
+                ],
+            },
+            {"note_id": 1},
+        )
+        shared = {share["note_id"] async for share in shares}
+
+    keep_creator = request.fields is None or "creator_id" in request.fields
+    notes, not_found = [], []
+    for note_id in note_ids:
+        note = found.get(note_id)
+        if note is None or (note["creator_id"] != user_id and note_id not in shared):
+            not_found.append(note_id)
+            continue
+        note["_id"] = note_id
+        if not keep_creator:
+            del note["creator_id"]
+        notes.append(note)
+    return {"notes": notes, "not_found": not_found}
+
+async def _get_note(db, note_id: str, user_id: str, projection: Optional[dict] = None) -> dict:
+    """
+    Charge une note de l'utilisateur ou lève une 404.
+    """
+    note = await db.notes.find_one(
+        {"_id": to_object_id(note_id), "creator_id": user_id, "is_deleted": False}, projection
+    )
+    if note is None:
+        raise HTTPException(status_code=404, detail="Note non trouvée")
+    return note
+
+async def _related_notes(db, user_id: str, note_ids: List[str], k: int) -> Dict[str, List[dict]]:
+    """
+    Résout les notes liées (index sémantique) en ajoutant leurs titres.
+    """
+    neighbours = await semantic_index.related(db, user_id, note_ids, k)
+    related_ids = {related_id for pairs in neighbours.values() for related_id, _ in pairs}
+    titles = {}
+    if related_ids:
+        cursor = db.notes.find(
+            {"_id": {"$in": [to_object_id(i) for i in related_ids]}, "creator_id": user_id, "is_deleted": False},
+            {"title": 1},
+        )
+        titles = {str(note["_id"]): note["title"] async for note in cursor}
     return {
-        "_id": "noteid123",
-        "title": note.title,
-        "content": note.content,
-        "tags": note.tags,
-        "course_id": note.course_id,
-        "creator_id": str(current_user.id),
-        "created_at": "2023-01-01T00:00:00",
-        "updated_at": None,
-        "version": 1
+        note_id: [
+            {"id": related_id, "title": titles[related_id], "score": score}
+            for related_id, score in pairs if related_id in titles
+        ]
+        for note_id, pairs in neighbours.items()
     }
 
+@router.post("/related", response_model=Dict[str, List[RelatedNote]])
+async def read_related_notes_batch(
+    request: RelatedNotesRequest,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Notes liées pour plusieurs notes en une seule requête.
+    """
+    return await _related_notes(db, str(current_user.id), request.note_ids, request.k)
+
 @router.get("/{note_id}", response_model=NoteResponse)
 async def read_note(
     note_id: str,
+    conditional: ConditionalGet = Depends(),
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
 ):
     """
     Récupère une note spécifique.
+    
+    Répond 304 si le client possède déjà la version courante (If-None-Match),
+    après une lecture limitée au numéro de version.
     """
-    # TODO: Implémenter la logique de récupération
-    # Placeholder pour test
-    return {
-        "_id": note_id,
-        "title": "Titre de la note",
-        "content": "Contenu de la note...",
-        "tags": ["tag1", "tag2"],
-        "course_id": "course123",
-        "creator_id": str(current_user.id),
-        "created_at": "2023-01-01T00:00:00",
-        "updated_at": None,
-        "version": 1
-    }
+    user_id = str(current_user.id)
+    if conditional.requested:
+        current = await _get_note(db, note_id, user_id, {"version": 1})
+        conditional.check("note", note_id, current["version"])
+    note = note_codec.decode_note(await _get_note(db, note_id, user_id, note_serializer.projection))
+    # L'ETag suit le contenu renvoyé (éventuellement modifié depuis la première lecture)
+    conditional.check("note", note_id, note["version"])
+    return note
+
+@router.get("/{note_id}/related", response_model=List[RelatedNote])
+async def read_related_notes(
+    note_id: str,
+    k: int = Query(5, ge=1, le=50),
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Notes les plus proches sémantiquement (vue NoteWithSummary).
+    """
+    related = await _related_notes(db, str(current_user.id), [note_id], k)
+    return related[note_id]
 
 @router.put("/{note_id}", response_model=NoteResponse)
 async def update_note(
@@ -87,20 +346,163 @@ async def update_note(
 ):
     """
     Met à jour une note.
+    
+    Si `version` est fourni, la modification n'est appliquée que si la note
+    est toujours à cette version (sinon 409) : deux éditeurs ne peuvent pas
+    s'écraser mutuellement. Sans `version`, la dernière écriture l'emporte.
     """
-    # TODO: Implémenter la logique de mise à jour
-    # Placeholder pour test
-    return {
-        "_id": note_id,
-        "title": note_update.title or "Titre de la note",
-        "content": note_update.content or "Contenu de la note...",
-        "tags": note_update.tags or ["tag1", "tag2"],
-        "course_id": note_update.course_id or "course123",
-        "creator_id": str(current_user.id),
-        "created_at": "2023-01-01T00:00:00",
-        "updated_at": "2023-01-02T00:00:00",
-        "version": 2
-    }
+    user_id = str(current_user.id)
+    note_filter = {"_id": to_object_id(note_id), "creator_id": user_id, "is_deleted": False}
+    update_data = note_update.model_dump(exclude_unset=True, exclude={"version"})
+
+    update_data["updated_at"] = datetime.utcnow()
+    if "content" in update_data:
+        update_data["snippet"] = build_snippet(update_data["content"])
+    update = {**note_codec.storage_update(update_data), "$inc": {"version": 1}}
+
+    # Écriture conditionnelle si le client connaît sa version ; la note
+    # d'avant l'écriture donne dans tous les cas la version produite
+    write_filter = note_filter
+    if note_update.version is not None:
+        write_filter = {**note_filter, "version": note_update.version}
+    before = note_codec.decode_note(await db.notes.find_one_and_update(
+        write_filter,
+        update,
+        return_document=ReturnDocument.BEFORE,
+    ))
+    if before is None:
+        current = None if note_update.version is None else await db.notes.find_one(note_filter, {"version": 1})
+        if current is None:
+            raise HTTPException(status_code=404, detail="Note non trouvée")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Conflit de version : la note est à la version {current['version']}",
+        )
+
+    note_doc = {**before, **update_data, "version": before["version"] + 1}
+    await counters.record_change(db, user_id, before, note_doc)
+    autocomplete_index.set_note(user_id, note_id, note_doc["title"], note_doc.get("tags") or [])
+    if "content" in update_data:
+        await dedup.record(db, user_id, note_id, note_doc["version"], note_doc["content"])
+    if "course_id" in update_data and update_data["course_id"] != before.get("course_id"):
+        # Les révisions portent le cours de leur note (tableau de bord du cours)
+        await db.revisions.update_many({"note_id": note_id}, {"$set": {"course_id": update_data["course_id"]}})
+        await due_queue.invalidate(user_id)
+    await versioning.record_version(
+        db, note_id, note_doc["version"], note_doc["title"], note_doc["content"], user_id,
+        previous_content=before["content"], previous_title=before["title"],
+    )
+    semantic_index.upsert(user_id, note_id, note_doc)
+    return note_doc
+
+@router.patch("/{note_id}", response_model=NotePatchResponse)
+async def patch_note(
+    note_id: str,
+    patch: NotePatch,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Sauvegarde incrémentale : applique des éditions de texte à la version
+    `version` de la note, sans renvoyer ni recevoir le contenu complet.
+    
+    Si la note a changé depuis, les éditions sont transposées sur la version
+    actuelle ; elles sont rejetées (409) si elles chevauchent une modification
+    concurrente. Une sauvegarde qui ne change ni le contenu ni le titre ne
+    crée pas de version.
+    """
+    user_id = str(current_user.id)
+    note_filter = {"_id": to_object_id(note_id), "creator_id": user_id, "is_deleted": False}
+    edits = [(edit.start, edit.end, edit.text) for edit in patch.edits]
+
+    for _ in range(PATCH_MAX_ATTEMPTS):
+        note = note_codec.decode_note(
+            await db.notes.find_one(
+                note_filter, {"title": 1, "content": 1, "version": 1, "created_at": 1, "updated_at": 1}
+            )
+        )
+        if note is None:
+            raise HTTPException(status_code=404, detail="Note non trouvée")
+        if patch.version > note["version"]:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Version de base inconnue")
+
+        rebased = patch.version < note["version"]
+        try:
+            applied = edits
+            if rebased:
+                applied = await versioning.rebase_onto(
+                    db, note_id, patch.version, note["version"], note["content"], edits
+                )
+            content = versioning.apply_edits(note["content"], applied)
+        except ValueError as e:
+            code = status.HTTP_409_CONFLICT if rebased else status.HTTP_400_BAD_REQUEST
+            raise HTTPException(status_code=code, detail=str(e))
+
+        if content == note["content"] and patch.title in (None, note["title"]):
+            return {
+                "_id": note["_id"],
+                "version": note["version"],
+                "updated_at": note.get("updated_at") or note["created_at"],
+                "rebased": rebased,
+            }
+
+        update_data = {"content": content, "snippet": build_snippet(content), "updated_at": datetime.utcnow()}
+        if patch.title is not None:
+            update_data["title"] = patch.title
+        update = {**note_codec.storage_update(update_data), "$inc": {"version": 1}}
+        result = await db.notes.update_one({**note_filter, "version": note["version"]}, update)
+        if result.modified_count:
+            version = note["version"] + 1
+            title = update_data.get("title", note["title"])
+            await versioning.record_version(
+                db, note_id, version, title, content, user_id,
+                previous_content=note["content"], edits=applied, previous_title=note["title"],
+            )
+            await dedup.record(db, user_id, note_id, version, content)
+            semantic_index.upsert(user_id, note_id, {"title": title, "content": content})
+            if patch.title is not None:
+                autocomplete_index.set_note(user_id, note_id, title)
+            return {"_id": note["_id"], "version": version, "updated_at": update_data["updated_at"], "rebased": rebased}
+        # Écriture concurrente entre la lecture et la mise à jour : on recommence
+
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Note modifiée simultanément, réessayez")
+
+@router.get("/{note_id}/versions", response_model=List[NoteVersionInfo])
+async def read_note_versions(
+    note_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Historique des versions d'une note, de la plus récente à la plus ancienne.
+    """
+    await _get_note(db, note_id, str(current_user.id), {"_id": 1})
+    versions, next_cursor = await paginate(
+        db.note_versions, {"note_id": note_id}, page, sort_field="version", projection={"data": 0}
+    )
+    set_page_headers(response, page, next_cursor)
+    return versions
+
+@router.get("/{note_id}/versions/{version}", response_model=NoteVersionResponse)
+async def read_note_version(
+    note_id: str,
+    version: int,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Contenu d'une version passée d'une note, reconstruit depuis l'historique.
+    """
+    await _get_note(db, note_id, str(current_user.id), {"_id": 1})
+    try:
+        note_version = await versioning.rebuild_version(db, note_id, version)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Historique de la note incohérent")
+    if note_version is None:
+        raise HTTPException(status_code=404, detail="Version non trouvée")
+    return note_version
 
 @router.delete("/{note_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_note(
@@ -111,42 +513,47 @@ async def delete_note(
 ):
     """
     Supprime une note (mise en corbeille ou suppression permanente).
+    
+    La note est marquée supprimée immédiatement ; la suppression permanente
+    (note, historique, révisions, partages, médias) est confiée au purgeur.
+    Les notes en corbeille sont purgées après NOTE_TRASH_RETENTION_DAYS jours.
     """
-    # TODO: Implémenter la logique de suppression
+    user_id = str(current_user.id)
+    note_filter = {"_id": to_object_id(note_id), "creator_id": user_id}
+    if not permanent:
+        note_filter["is_deleted"] = False
+    # $min conserve la date de mise en corbeille d'une note déjà supprimée
+    before = await db.notes.find_one_and_update(
+        note_filter,
+        {"$set": {"is_deleted": True}, "$min": {"deleted_at": datetime.utcnow()}},
+        projection={"tags": 1, "course_id": 1, "is_deleted": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        raise HTTPException(status_code=404, detail="Note non trouvée")
+    await counters.record_change(db, user_id, before, None)
+    autocomplete_index.remove_note(user_id, note_id)
+    # Ses révisions, conservées jusqu'à la purge, sortent de la file
+    await due_queue.invalidate(user_id)
+    if permanent:
+        await purge.enqueue(db, purge.NOTE, note_id, user_id)
+    semantic_index.remove(user_id, note_id)
     return None
 
-@router.post("/search", response_model=List[NoteResponse])
+@router.post("/search", response_model=NoteSearchResponse)
 async def search_notes(
     filter_params: NoteFilter,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
 ):
     """
     Recherche de notes avec des critères avancés.
+    
+    Résultats classés par pertinence (ou par date sans texte), avec extraits
+    surlignés et facettes par tag et par cours, en une seule agrégation.
     """
-    # TODO: Implémenter la logique de recherche
-    # Placeholder pour test
-    return [
-        {
-            "_id": "note1",
-            "title": "Titre de la note 1",
-            "content": "Contenu de la note 1...",
-            "tags": ["tag1"],
-            "course_id": "course123",
-            "creator_id": str(current_user.id),
-            "created_at": "2023-01-01T00:00:00",
-            "updated_at": None,
-            "version": 1
-        },
-        {
-            "_id": "note2",
-            "title": "Titre de la note 2",
-            "content": "Contenu de la note 2...",
-            "tags": ["tag2"],
-            "course_id": "course123",
-            "creator_id": str(current_user.id),
-            "created_at": "2023-01-02T00:00:00",
-            "updated_at": None,
-            "version": 1
-        }
-    ]
+    return await search.search_notes(
+        db, str(current_user.id), filter_params, limit=limit, cursor=cursor
+    )
@@ -1,55 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
 from typing import List, Optional
 from datetime import datetime, timedelta
-from pydantic import BaseModel, Field, ConfigDict
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from app.core.auth import get_current_active_user
-from app.db.mongodb import get_database, ObjectIdField, PyObjectId
-
-# Modèles pour les révisions
-class RevisionBase(BaseModel):
-    note_id: str
-    scheduled_date: datetime
-    status: str = "pending"  # pending, completed, missed
-    difficulty: Optional[int] = None  # 1-5, plus la valeur est élevée, plus c'était difficile
-
-class RevisionCreate(RevisionBase):
-    pass
-
-class RevisionUpdate(BaseModel):
-    scheduled_date: Optional[datetime] = None
-    status: Optional[str] = None
-    difficulty: Optional[int] = None
-    feedback: Optional[str] = None
-
-class RevisionInDB(RevisionBase):
-    id: ObjectIdField = Field(default_factory=PyObjectId, alias="_id")
-    user_id: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    completed_at: Optional[datetime] = None
-    feedback: Optional[str] = None
-    
-    model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={PyObjectId: str}
-    )
-
-class RevisionResponse(RevisionBase):
-    id: str = Field(..., alias="_id")
-    user_id: str
-    created_at: datetime
-    completed_at: Optional[datetime] = None
-    feedback: Optional[str] = None
-    
-    model_config = ConfigDict(populate_by_name=True)
+from app.core.pagination import PageParams, paginate, set_page_headers
+from app.core.responses import ModelSerializer, list_response, serialized_list_response
+from app.db.mongodb import get_database, to_object_id
+from app.models.revision import (
+    DueRevisionCount,
+    RescheduleResult,
+    RevisionBatchRequest,
+    RevisionBatchResponse,
+    RevisionCreate,
+    RevisionInDB,
+    RevisionResponse,
+    RevisionStats,
+    RevisionUpdate,
+)
+from app.services import rollups, scheduler
+from app.services.due_queue import due_queue
+from app.services.sweeper import mark_if_overdue, missed_threshold
 
 router = APIRouter()
 
+# Avance tolérée de l'horloge d'un client pour `reviewed_at`
+REVIEW_CLOCK_SKEW = timedelta(minutes=5)
+
+revision_serializer = ModelSerializer(RevisionResponse)
+
 @router.get("/", response_model=List[RevisionResponse])
 async def read_revisions(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(),
     status: Optional[str] = None,
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
@@ -63,9 +48,24 @@ async def read_revisions(
     if status:
         filter_query["status"] = status
     
-    # Récupération des révisions
-    revisions = await db.revisions.find(filter_query).skip(skip).limit(limit).to_list(limit)
-    return revisions
+    # Récupération des révisions par date prévue croissante
+    revisions, next_cursor = await paginate(
+        db.revisions, filter_query, page, sort_field="scheduled_date", direction=ASCENDING,
+        projection=revision_serializer.projection,
+    )
+    set_page_headers(response, page, next_cursor)
+    return list_response(revisions, revision_serializer, response)
+
+async def _get_note_course(db, note_id: str, user_id: str) -> Optional[str]:
+    """
+    Cours de la note de l'utilisateur, ou 404 si la note n'existe pas.
+    """
+    note = await db.notes.find_one(
+        {"_id": to_object_id(note_id), "creator_id": user_id, "is_deleted": False}, {"course_id": 1}
+    )
+    if note is None:
+        raise HTTPException(status_code=404, detail="Note non trouvée")
+    return note.get("course_id")
 
 @router.post("/", response_model=RevisionResponse, status_code=status.HTTP_201_CREATED)
 async def create_revision(
@@ -75,58 +75,214 @@ async def create_revision(
 ):
     """
     Crée une nouvelle révision programmée.
+    
+    Une révision en attente dont la date prévue est déjà dépassée depuis plus
+    de REVISION_MISSED_AFTER_HOURS est créée manquée (voir services/sweeper.py).
     """
-    # TODO: Implémenter la logique de création
-    # Placeholder pour test
-    return {
-        "_id": "revisionid123",
-        "note_id": revision.note_id,
-        "scheduled_date": revision.scheduled_date,
-        "status": revision.status,
-        "difficulty": revision.difficulty,
-        "user_id": str(current_user.id),
-        "created_at": datetime.utcnow(),
-        "completed_at": None,
-        "feedback": None
-    }
+    user_id = str(current_user.id)
+    course_id = await _get_note_course(db, revision.note_id, user_id)
+    revision_doc = RevisionInDB(**revision.model_dump(), user_id=user_id, course_id=course_id).model_dump(by_alias=True)
+    missed = mark_if_overdue(revision_doc, datetime.utcnow())
+    await db.revisions.insert_one(revision_doc)
+    if missed:
+        await rollups.record_missed(db, [revision_doc])
+    await due_queue.upsert(revision_doc)
+    return revision_doc
 
 @router.get("/due", response_model=List[RevisionResponse])
 async def read_due_revisions(
-    days: int = 1,
+    days: int = Query(1, ge=0, le=365),
+    limit: int = Query(100, ge=1, le=500),
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Récupère les révisions en attente prévues d'ici N jours (en retard
+    comprises), par date croissante, depuis la file des révisions à faire.
+    """
+    until = datetime.utcnow() + timedelta(days=days)
+    return serialized_list_response(await due_queue.due(db, str(current_user.id), until, limit))
+
+@router.get("/due/count", response_model=DueRevisionCount)
+async def count_due_revisions(
+    days: int = Query(1, ge=0, le=365),
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Nombre de révisions en retard et à faire d'ici N jours (badge de l'application).
+    """
+    user_id = str(current_user.id)
+    now = datetime.utcnow()
+    return {
+        "overdue": await due_queue.count(db, user_id, now),
+        "due": await due_queue.count(db, user_id, now + timedelta(days=days)),
+    }
+
+@router.get("/stats", response_model=RevisionStats)
+async def read_revision_stats(
+    days: int = Query(30, ge=1, le=365),
+    course_id: Optional[str] = None,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
+    """
+    Statistiques de révision des N derniers jours, par jour et par cours
+    (éventuellement limitées à un cours), et séries de jours de révision.
+    
+    Servies par les agrégats quotidiens tenus à jour à chaque révision
+    terminée ou manquée, sans parcourir les révisions.
+    """
+    return await rollups.get_stats(db, str(current_user.id), days, course_id)
+
+@router.post("/reschedule", response_model=RescheduleResult)
+async def reschedule_revisions(
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
 ):
     """
-    Récupère les révisions prévues pour les N prochains jours.
+    Replanifie les révisions en attente de l'utilisateur selon les paramètres
+    de répétition espacée actuels.
+    """
+    stats = await scheduler.reschedule(db, user_id=str(current_user.id))
+    if stats.rescheduled:
+        await due_queue.invalidate(str(current_user.id))
+    return {"scanned": stats.scanned, "rescheduled": stats.rescheduled}
+
+async def _complete_revision(db, revision_filter: dict, update_data: dict) -> dict:
+    """
+    Termine une révision en attente (ou manquée) et planifie la suivante
+    d'après la difficulté ressentie.
+    """
+    now = datetime.utcnow()
+    update_data = {**update_data, "completed_at": now}
+    revision = await db.revisions.find_one_and_update(
+        {**revision_filter, "status": {"$in": scheduler.REVIEWABLE_STATUSES}},
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if revision is None:
+        if await db.revisions.find_one(revision_filter, {"_id": 1}) is None:
+            raise HTTPException(status_code=404, detail="Révision non trouvée")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Révision déjà terminée")
+    await rollups.record_completed(db, [{**revision, **update_data}])
+
+    next_doc = scheduler.follow_up(revision, update_data["difficulty"], now)
+    try:
+        result = await db.revisions.update_one(*scheduler.follow_up_upsert(next_doc), upsert=True)
+    except DuplicateKeyError:
+        # Révision suivante insérée simultanément
+        result = None
+    if result is not None and result.upserted_id is not None:
+        await due_queue.upsert(next_doc)
+    await due_queue.remove(revision["user_id"], [str(revision["_id"])])
+    return {**revision, **update_data}
+
+@router.post("/batch", response_model=RevisionBatchResponse)
+async def submit_reviews(
+    batch: RevisionBatchRequest,
+    db = Depends(get_database),
+    current_user = Depends(get_current_active_user),
+):
     """
-    # TODO: Implémenter la logique de récupération
-    # Placeholder pour test
-    due_date = datetime.utcnow() + timedelta(days=days)
+    Termine les révisions d'une séance (ou d'une file hors ligne) en une
+    requête : une lecture `$in`, puis un seul `bulk_write` contenant, pour
+    chaque révision, sa clôture et l'insertion de la révision suivante.
     
-    return [
-        {
-            "_id": "revision1",
-            "note_id": "note1",
-            "scheduled_date": datetime.utcnow() + timedelta(hours=4),
-            "status": "pending",
-            "difficulty": None,
-            "user_id": str(current_user.id),
-            "created_at": datetime.utcnow() - timedelta(days=1),
-            "completed_at": None,
-            "feedback": None
-        },
-        {
-            "_id": "revision2",
-            "note_id": "note2",
-            "scheduled_date": datetime.utcnow() + timedelta(days=1),
-            "status": "pending",
-            "difficulty": None,
-            "user_id": str(current_user.id),
-            "created_at": datetime.utcnow() - timedelta(days=2),
-            "completed_at": None,
-            "feedback": None
+    Idempotent : renvoyer le même lot ne modifie rien et renvoie les mêmes
+    révisions suivantes (statut `already_completed`). Le résultat de chaque
+    révision est donné dans l'ordre de la requête.
+    """
+    user_id = str(current_user.id)
+    now = datetime.utcnow()
+    object_ids = [oid for oid in (to_object_id(r.revision_id) for r in batch.reviews) if isinstance(oid, ObjectId)]
+    found = {
+        str(revision["_id"]): revision
+        async for revision in db.revisions.find({"_id": {"$in": object_ids}, "user_id": user_id})
+    }
+
+    results: List[dict] = []
+    requests = []
+    # (résultat, révision suivante, position de son upsert dans `requests`)
+    applied = []
+    completions = {}
+    # Révisions terminées auparavant : on renvoie leur révision suivante
+    replayed = []
+    seen = set()
+    for review in batch.reviews:
+        outcome = {"revision_id": review.revision_id}
+        results.append(outcome)
+        revision = found.get(review.revision_id)
+        if review.revision_id in seen:
+            outcome["status"] = "duplicate"
+            continue
+        seen.add(review.revision_id)
+        if revision is None:
+            outcome["status"] = "not_found"
+        elif revision["status"] == "completed":
+            outcome["status"] = "already_completed"
+            replayed.append(outcome)
+        elif revision["status"] not in scheduler.REVIEWABLE_STATUSES:
+            outcome.update(status="invalid", message=f"Révision au statut {revision['status']}")
+        elif review.reviewed_at is not None and review.reviewed_at > now + REVIEW_CLOCK_SKEW:
+            outcome.update(status="invalid", message="Date de révision dans le futur")
+        else:
+            reviewed_at = review.reviewed_at or now
+            completion = {"status": "completed", "difficulty": review.difficulty, "completed_at": reviewed_at}
+            if review.feedback is not None:
+                completion["feedback"] = review.feedback
+            completions[review.revision_id] = {**revision, **completion}
+            requests.append(UpdateOne(
+                {"_id": revision["_id"], "user_id": user_id, "status": {"$in": scheduler.REVIEWABLE_STATUSES}},
+                {"$set": completion},
+            ))
+            next_doc = scheduler.follow_up(revision, review.difficulty, reviewed_at)
+            # Révision faite hors ligne il y a longtemps : la suivante peut être déjà manquée
+            mark_if_overdue(next_doc, now)
+            requests.append(UpdateOne(*scheduler.follow_up_upsert(next_doc), upsert=True))
+            outcome["status"] = "completed"
+            applied.append((outcome, next_doc, len(requests) - 1))
+
+    upserted = {}
+    if requests:
+        try:
+            result = await db.revisions.bulk_write(requests, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            # Révision suivante insérée simultanément (index unique) : sans conséquence
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+
+    inserted = []
+    completed = []
+    for outcome, next_doc, position in applied:
+        if position in upserted:
+            outcome.update(next_revision_id=str(next_doc["_id"]), next_scheduled_date=next_doc["scheduled_date"])
+            inserted.append(next_doc)
+            completed.append(completions[outcome["revision_id"]])
+        else:
+            # Terminée entre la lecture et l'écriture (autre requête)
+            outcome["status"] = "already_completed"
+            replayed.append(outcome)
+    if replayed:
+        followers = {
+            doc["previous_revision_id"]: doc async for doc in db.revisions.find(
+                {"previous_revision_id": {"$in": [outcome["revision_id"] for outcome in replayed]}},
+                {"previous_revision_id": 1, "scheduled_date": 1},
+            )
         }
-    ]
+        for outcome in replayed:
+            follower = followers.get(outcome["revision_id"])
+            if follower is not None:
+                outcome.update(next_revision_id=str(follower["_id"]), next_scheduled_date=follower["scheduled_date"])
+
+    await rollups.record_completed(db, completed)
+    await rollups.record_missed(db, [next_doc for next_doc in inserted if next_doc["status"] == "missed"])
+    await due_queue.remove(user_id, [outcome["revision_id"] for outcome, _, _ in applied])
+    for next_doc in inserted:
+        await due_queue.upsert(next_doc)
+    return {"completed": len(inserted), "results": results}
 
 @router.put("/{revision_id}", response_model=RevisionResponse)
 async def update_revision(
@@ -137,24 +293,65 @@ async def update_revision(
 ):
     """
     Met à jour une révision (marquer comme terminée, reporter, etc.).
+    
+    Terminer une révision (`status` = "completed") demande la difficulté
+    ressentie et planifie la révision suivante de la note. Une révision
+    terminée ne peut plus être rouverte ni replanifiée : seul son
+    commentaire (`feedback`) peut encore changer. Une révision ne peut pas
+    être laissée en attente à une date dépassée depuis plus de
+    REVISION_MISSED_AFTER_HOURS : le balayeur ne la marquerait jamais
+    manquée (voir services/sweeper.py).
     """
-    # TODO: Implémenter la logique de mise à jour
-    # Placeholder pour test
-    completed_at = None
-    if revision_update.status == "completed":
-        completed_at = datetime.utcnow()
-        
-    return {
-        "_id": revision_id,
-        "note_id": "note1",
-        "scheduled_date": revision_update.scheduled_date or (datetime.utcnow() + timedelta(hours=4)),
-        "status": revision_update.status or "pending",
-        "difficulty": revision_update.difficulty or 3,
-        "user_id": str(current_user.id),
-        "created_at": datetime.utcnow() - timedelta(days=1),
-        "completed_at": completed_at,
-        "feedback": revision_update.feedback or None
-    }
+    revision_filter = {"_id": to_object_id(revision_id), "user_id": str(current_user.id)}
+    update_data = revision_update.model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucune modification demandée")
+    nulls = sorted(name for name, value in update_data.items() if value is None)
+    if nulls:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Champs non nullables : {', '.join(nulls)}",
+        )
+    if update_data.get("status") == "completed":
+        if revision_update.difficulty is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La difficulté ressentie est requise pour terminer une révision",
+            )
+        return await _complete_revision(db, revision_filter, update_data)
+    if "difficulty" in update_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La difficulté ne se donne qu'en terminant la révision",
+        )
+
+    # Seul le commentaire d'une révision terminée reste modifiable
+    writable = revision_filter
+    if set(update_data) != {"feedback"}:
+        writable = {**revision_filter, "status": {"$in": scheduler.REVIEWABLE_STATUSES}}
+    threshold = missed_threshold()
+    if "scheduled_date" in update_data and update_data["scheduled_date"] < threshold:
+        if update_data.get("status") == "pending":
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Date prévue dépassée")
+        # Une révision manquée peut être déplacée dans le passé : elle le reste
+        writable["status"] = "missed"
+    elif update_data.get("status") == "pending" and "scheduled_date" not in update_data:
+        writable["scheduled_date"] = {"$gte": threshold}
+    revision = await db.revisions.find_one_and_update(
+        writable,
+        {"$set": update_data},
+        projection=revision_serializer.projection,
+        return_document=ReturnDocument.AFTER,
+    )
+    if revision is None:
+        current = await db.revisions.find_one(revision_filter, {"status": 1})
+        if current is None:
+            raise HTTPException(status_code=404, detail="Révision non trouvée")
+        if current.get("status") not in scheduler.REVIEWABLE_STATUSES:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Révision déjà terminée")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Date prévue dépassée")
+    await due_queue.upsert(revision)
+    return revision
 
 @router.delete("/{revision_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_revision(
@@ -165,35 +362,40 @@ async def delete_revision(
     """
     Supprime une révision programmée.
     """
-    # TODO: Implémenter la logique de suppression
+    user_id = str(current_user.id)
+    result = await db.revisions.delete_one({"_id": to_object_id(revision_id), "user_id": user_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Révision non trouvée")
+    await due_queue.remove(user_id, [revision_id])
     return None
 
 @router.post("/generate", response_model=List[RevisionResponse])
 async def generate_revision_schedule(
     note_id: str,
-    count: int = 5,
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
 ):
     """
-    Génère un programme de révision basé sur la courbe de l'oubli.
-    """
-    # TODO: Implémenter la logique de génération
-    # Placeholder pour test
-    revisions = []
-    intervals = [1, 3, 7, 14, 30]  # Intervalles en jours selon la courbe de l'oubli
+    Démarre le suivi d'une note en répétition espacée.
     
-    for i in range(min(count, len(intervals))):
-        revisions.append({
-            "_id": f"revision{i+1}",
-            "note_id": note_id,
-            "scheduled_date": datetime.utcnow() + timedelta(days=intervals[i]),
-            "status": "pending",
-            "difficulty": None,
-            "user_id": str(current_user.id),
-            "created_at": datetime.utcnow(),
-            "completed_at": None,
-            "feedback": None
-        })
-    
-    return revisions
+    Seule la prochaine révision est planifiée : les suivantes dépendent de la
+    difficulté ressentie à chaque révision (voir update_revision). Si la note
+    a déjà une révision en attente, elle est renvoyée telle quelle.
+    """
+    user_id = str(current_user.id)
+    course_id = await _get_note_course(db, note_id, user_id)
+    first = RevisionInDB(
+        note_id=note_id,
+        scheduled_date=datetime.utcnow() + scheduler.FIRST_REVIEW_DELAY,
+        user_id=user_id,
+        course_id=course_id,
+    ).model_dump(by_alias=True)
+    revision = await db.revisions.find_one_and_update(
+        {"note_id": note_id, "user_id": user_id, "status": "pending"},
+        {"$setOnInsert": first},
+        upsert=True,
+        projection=revision_serializer.projection,
+        return_document=ReturnDocument.AFTER,
+    )
+    await due_queue.upsert(revision)
+    return [revision]
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 
 from app.core.auth import get_current_active_user
-from app.db.mongodb import get_database, ObjectIdField, PyObjectId
+from app.core.pagination import PageParams, paginate, set_page_headers
+from app.core.responses import ModelSerializer, list_response
+from app.db.mongodb import get_database, ObjectIdField, PyObjectId, StrObjectId
 
 # Modèles pour les partages
 class ShareBase(BaseModel):
@@ -36,7 +38,7 @@ class ShareInDB(ShareBase):
     )
 
 class ShareResponse(ShareBase):
-    id: str = Field(..., alias="_id")
+    id: StrObjectId = Field(..., alias="_id")
     source_user_id: str
     created_at: datetime
     active: bool
@@ -45,10 +47,12 @@ class ShareResponse(ShareBase):
 
 router = APIRouter()
 
+share_serializer = ModelSerializer(ShareResponse)
+
 @router.get("/", response_model=List[ShareResponse])
 async def read_shared_by_me(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(),
     active_only: bool = True,
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
@@ -62,14 +66,17 @@ async def read_shared_by_me(
     if active_only:
         filter_query["active"] = True
     
-    # Récupération des partages
-    shares = await db.shares.find(filter_query).skip(skip).limit(limit).to_list(limit)
-    return shares
+    # Récupération des partages, des plus récents aux plus anciens
+    shares, next_cursor = await paginate(
+        db.shares, filter_query, page, sort_field="created_at", projection=share_serializer.projection
+    )
+    set_page_headers(response, page, next_cursor)
+    return list_response(shares, share_serializer, response)
 
 @router.get("/shared-with-me", response_model=List[ShareResponse])
 async def read_shared_with_me(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(),
     active_only: bool = True,
     db = Depends(get_database),
     current_user = Depends(get_current_active_user),
@@ -88,9 +95,12 @@ async def read_shared_with_me(
     if active_only:
         filter_query["active"] = True
     
-    # Récupération des partages
-    shares = await db.shares.find(filter_query).skip(skip).limit(limit).to_list(limit)
-    return shares
+    # Récupération des partages, des plus récents aux plus anciens
+    shares, next_cursor = await paginate(
+        db.shares, filter_query, page, sort_field="created_at", projection=share_serializer.projection
+    )
+    set_page_headers(response, page, next_cursor)
+    return list_response(shares, share_serializer, response)
 
 @router.post("/", response_model=ShareResponse, status_code=status.HTTP_201_CREATED)
 async def create_share(
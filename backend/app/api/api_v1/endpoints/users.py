@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from typing import List
 
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_user, get_password_hash, invalidate_user_cache
+from app.core.conditional import ConditionalGet
+from app.core.pagination import PageParams, paginate, set_page_headers
+from app.core.responses import ModelSerializer, list_response
 from app.models.user import UserCreate, UserInDB, UserResponse, UserUpdate
-from app.db.mongodb import get_database
+from app.db.mongodb import get_database, to_object_id
+from app.services import purge
+from app.services.autocomplete import autocomplete_index
+from app.services.due_queue import due_queue
+from app.services.semantic import semantic_index
 
 router = APIRouter()
 
+user_serializer = ModelSerializer(UserResponse)
+
 @router.get("/", response_model=List[UserResponse])
 async def read_users(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(),
     db = Depends(get_database),
     current_user: UserInDB = Depends(get_current_active_user),
 ):
@@ -24,16 +36,21 @@ async def read_users(
             detail="Permission insuffisante"
         )
     
-    users = await db.users.find().skip(skip).limit(limit).to_list(limit)
-    return users
+    users, next_cursor = await paginate(
+        db.users, {}, page, sort_field="_id", direction=ASCENDING, projection=user_serializer.projection
+    )
+    set_page_headers(response, page, next_cursor)
+    return list_response(users, user_serializer, response)
 
 @router.get("/me", response_model=UserResponse)
 async def read_user_me(
+    conditional: ConditionalGet = Depends(),
     current_user: UserInDB = Depends(get_current_active_user),
 ):
     """
-    Récupère les informations de l'utilisateur connecté.
+    Récupère les informations de l'utilisateur connecté (GET conditionnel).
     """
+    conditional.check("user", current_user.id, current_user.updated_at or current_user.created_at)
     return current_user
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -52,7 +69,7 @@ async def read_user(
             detail="Permission insuffisante"
         )
     
-    user = await db.users.find_one({"_id": user_id})
+    user = await db.users.find_one({"_id": to_object_id(user_id)})
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -77,9 +94,39 @@ async def update_user(
             detail="Permission insuffisante"
         )
     
-    # TODO: Implémenter la logique de mise à jour
-    # Placeholder pour test
-    return {"_id": user_id, "email": "user@example.com", "name": "User", "is_active": True, "is_superuser": False, "created_at": "2023-01-01T00:00:00"}
+    update_data = user_update.model_dump(exclude_unset=True, exclude_none=True)
+    
+    # Seul un super-utilisateur peut modifier les droits ou activer/désactiver un compte
+    if not current_user.is_superuser and {"is_active", "is_superuser"} & update_data.keys():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Permission insuffisante"
+        )
+    
+    if "password" in update_data:
+        update_data["hashed_password"] = await get_password_hash(update_data.pop("password"))
+    update_data["updated_at"] = datetime.utcnow()
+    
+    try:
+        user = await db.users.find_one_and_update(
+            {"_id": to_object_id(user_id)},
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Un compte avec cet email existe déjà"
+        )
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Utilisateur non trouvé"
+        )
+    
+    # Le compte a changé : l'entrée en cache ne doit plus être servie
+    await invalidate_user_cache(user_id)
+    return user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
@@ -97,5 +144,20 @@ async def delete_user(
             detail="Permission insuffisante"
         )
     
-    # TODO: Implémenter la logique de suppression
+    # Désactivation immédiate ; le compte et ses données sont purgés en tâche de fond
+    result = await db.users.update_one(
+        {"_id": to_object_id(user_id), "deleted_at": None},
+        {"$set": {"is_active": False, "deleted_at": datetime.utcnow()}},
+    )
+    if result.matched_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Utilisateur non trouvé"
+        )
+    
+    await purge.enqueue(db, purge.USER, user_id)
+    await invalidate_user_cache(user_id)
+    semantic_index.invalidate(user_id)
+    autocomplete_index.invalidate(user_id)
+    await due_queue.invalidate(user_id)
     return None
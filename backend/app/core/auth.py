@@ -1,5 +1,7 @@
-from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple, Union
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -7,8 +9,9 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr, Field
 
+from app.core.cache import InvalidationChannel, TTLCache
 from app.core.config import settings
-from app.db.mongodb import get_database
+from app.db.mongodb import StrObjectId, get_database, to_object_id
 
 # Modèle utilisateur pour JWT
 class TokenData(BaseModel):
@@ -23,28 +26,93 @@ class Token(BaseModel):
 
 # Schéma utilisateur
 class User(BaseModel):
-    id: str = Field(..., alias="_id")
+    id: StrObjectId = Field(..., alias="_id")
     email: EmailStr
     name: str
     is_active: bool = True
     is_superuser: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
 
 # Configuration de la sécurité
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Les hash dont le coût est inférieur à BCRYPT_ROUNDS sont considérés obsolètes
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Pool borné dédié à bcrypt pour ne pas bloquer la boucle d'événements
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+# Cache des utilisateurs authentifiés, indexé par ID utilisateur
+user_cache: TTLCache[User] = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+# Invalidations diffusées à tous les workers : une désactivation prend
+# effet immédiatement partout, pas à l'expiration du cache
+user_invalidations = InvalidationChannel(
+    user_cache,
+    settings.REDIS_URL if settings.USER_CACHE_SHARED_INVALIDATION else None,
+    channel="user_cache_invalidation",
+)
+
+async def invalidate_user_cache(user_id: Union[str, Any]) -> None:
+    """
+    Retire un utilisateur du cache de tous les workers après une
+    modification de son compte (mise à jour, désactivation, suppression).
+    """
+    await user_invalidations.publish(str(user_id))
+
+async def _get_cached_user(db, user_id: str) -> Optional[User]:
+    """
+    Utilisateur depuis le cache tant que les invalidations des autres
+    workers sont reçues, sinon depuis la base.
+    """
+    if user_invalidations.listening:
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
+    epoch = user_invalidations.epoch
+    user = await get_user(db, user_id=user_id)
+    # Compte modifié pendant la lecture : l'utilisateur lu est peut-être déjà périmé
+    if user is not None and user_invalidations.listening and user_invalidations.epoch == epoch:
+        user_cache.set(user_id, user)
+    return user
+
+async def _run_password_task(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, func, *args)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Vérifie si un mot de passe en clair correspond à un hash.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return await _run_password_task(pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Vérifie un mot de passe et renvoie un nouveau hash si celui
+    stocké utilise un coût obsolète (None sinon).
+    """
+    return await _run_password_task(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """
     Génère un hash sécurisé pour un mot de passe en clair.
     """
-    return pwd_context.hash(password)
+    return await _run_password_task(pwd_context.hash, password)
 
 async def get_user(db, user_id: str) -> Optional[User]:
     """
@@ -52,7 +120,7 @@ async def get_user(db, user_id: str) -> Optional[User]:
     """
     if not user_id:
         return None
-    user_data = await db["users"].find_one({"_id": user_id})
+    user_data = await db["users"].find_one({"_id": to_object_id(user_id)})
     if user_data:
         return User(**user_data)
     return None
@@ -73,8 +141,16 @@ async def authenticate_user(db, email: str, password: str) -> Optional[User]:
     user_data = await db["users"].find_one({"email": email})
     if not user_data:
         return None
-    if not verify_password(password, user_data["hashed_password"]):
+    valid, new_hash = await verify_and_update_password(
+        password, user_data["hashed_password"]
+    )
+    if not valid:
         return None
+    if new_hash:
+        # Rehachage transparent avec le coût courant
+        await db["users"].update_one(
+            {"_id": user_data["_id"]}, {"$set": {"hashed_password": new_hash}}
+        )
     return User(**user_data)
 
 def create_access_token(
@@ -137,14 +213,14 @@ async def get_current_user(
         raise credentials_exception
     
     # Vérifier si le token a expiré
-    if token_data.exp and datetime.utcnow() > token_data.exp:
+    if token_data.exp and datetime.now(timezone.utc) > token_data.exp:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token expiré",
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    user = await get_user(db, user_id=token_data.user_id)
+    user = await _get_cached_user(db, token_data.user_id)
     if user is None:
         raise credentials_exception
     return user
@@ -0,0 +1,123 @@
+"""
+Tâches de fond périodiques exécutées dans chaque worker.
+
+Plusieurs workers (et instances) exécutent les mêmes tâches : celles qui ne
+doivent tourner qu'une fois à la fois prennent un bail dans `job_state`
+(voir `acquire_lease`), qui expire de lui-même si le worker s'arrête.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Identifiant de ce worker pour les baux
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class PeriodicTask:
+    """
+    Exécute `func()` toutes les `interval` secondes jusqu'à l'arrêt.
+    Une exception est journalisée sans interrompre la boucle.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Échec de la tâche de fond %s", self.name)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class BackgroundTasks:
+    """
+    Ensemble des tâches de fond démarrées avec l'application.
+    """
+
+    def __init__(self):
+        self.tasks: List[PeriodicTask] = []
+
+    def add(self, name: str, interval: float, func: Callable[[], Awaitable[None]]) -> None:
+        self.tasks.append(PeriodicTask(name, interval, func))
+
+    def start(self) -> None:
+        for task in self.tasks:
+            task.start()
+
+    async def stop(self) -> None:
+        await asyncio.gather(*(task.stop() for task in self.tasks))
+        self.tasks.clear()
+
+
+background_tasks = BackgroundTasks()
+
+
+async def acquire_lease(db, name: str, ttl: float, owner: str = WORKER_ID) -> bool:
+    """
+    Prend (ou renouvelle) le bail `name` pour `ttl` secondes.
+
+    Renvoie False si un autre worker détient un bail non expiré.
+    """
+    now = datetime.utcnow()
+    try:
+        result = await db.job_state.update_one(
+            {"_id": name, "$or": [{"lease_owner": owner}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"lease_owner": owner, "lease_until": now + timedelta(seconds=ttl)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Le document existe et le bail appartient à un autre worker
+        return False
+    return result.matched_count > 0 or result.upserted_id is not None
+
+
+async def release_lease(db, name: str, owner: str = WORKER_ID) -> None:
+    await db.job_state.update_one(
+        {"_id": name, "lease_owner": owner}, {"$set": {"lease_until": datetime.utcnow()}}
+    )
+
+
+class Throttle:
+    """
+    Limite la part du temps passée par une tâche de fond à interroger la base :
+    après chaque lot, on attend en proportion de la durée du lot, de sorte
+    que la tâche n'occupe que `duty_cycle` du temps (0 < duty_cycle <= 1).
+    Les lots ralentissent d'eux-mêmes quand la base est chargée.
+    """
+
+    def __init__(self, duty_cycle: float):
+        self.duty_cycle = min(max(duty_cycle, 0.01), 1.0)
+        self._started = time.monotonic()
+
+    async def pause(self) -> None:
+        elapsed = time.monotonic() - self._started
+        await asyncio.sleep(elapsed * (1 - self.duty_cycle) / self.duty_cycle)
+        self._started = time.monotonic()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # Redis absent (requirements-minimal.txt) : caches locaux seulement
+    aioredis = None
+    RedisError = OSError
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Cache mémoire borné avec expiration (TTL) et éviction LRU.
+
+    Prévu pour être utilisé depuis la boucle d'événements (pas de verrou) :
+    chaque worker uvicorn possède sa propre instance.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        """
+        Renvoie la valeur associée à la clé si elle est présente et non expirée.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= self._timer():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        """
+        Ajoute ou remplace une entrée, en évinçant la moins récemment utilisée
+        si la taille maximale est atteinte.
+        """
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (self._timer() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Supprime explicitement une entrée du cache.
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class InvalidationChannel:
+    """
+    Invalidation des entrées d'un cache local sur tous les workers, par
+    Redis pub/sub.
+
+    `publish` retire l'entrée du cache du worker et diffuse sa clé ; chaque
+    worker abonné (`start`, dans le lifespan) la retire à son tour. Les
+    lectures restent locales : le cache n'est servi que pendant l'abonnement
+    (`listening`) et il est vidé à chaque (ré)abonnement, les messages
+    publiés entre-temps étant perdus. `epoch` change à chaque invalidation :
+    une valeur chargée pendant qu'il changeait ne doit pas être mise en cache.
+
+    Sans Redis (`url` vide ou module absent), l'invalidation reste locale au
+    worker et le cache est toujours servi.
+    """
+
+    RETRY_SECONDS = 1.0
+
+    def __init__(self, cache: TTLCache, url: Optional[str], channel: str):
+        self.cache = cache
+        self.channel = channel
+        self.redis = aioredis.from_url(url) if aioredis is not None and url else None
+        self.listening = self.redis is None
+        self.epoch = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _invalidate(self, key: Optional[str]) -> None:
+        self.epoch += 1
+        if key is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(key)
+
+    async def publish(self, key: str) -> None:
+        self._invalidate(key)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(self.channel, key)
+        except RedisError as e:
+            logger.warning("Invalidation partagée impossible pour %s (%s)", key, e)
+
+    def start(self) -> None:
+        if self.redis is not None and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "subscribe":
+                            self._invalidate(None)
+                            self.listening = True
+                        elif message["type"] == "message":
+                            self._invalidate(message["data"].decode())
+            except RedisError as e:
+                logger.warning("Abonnement aux invalidations de cache interrompu (%s)", e)
+            self.listening = False
+            await asyncio.sleep(self.RETRY_SECONDS)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.listening = self.redis is None
+        if self.redis is not None:
+            await self.redis.aclose()
@@ -0,0 +1,63 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+from starlette.responses import Response as StarletteResponse
+
+# Le client peut garder la ressource mais doit la revalider (If-None-Match)
+CACHE_CONTROL = "private, no-cache"
+
+
+class NotModified(Exception):
+    """
+    La version connue du client est à jour : réponse 304 sans corps.
+    """
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    ETag fort dérivé de l'identité et de la version d'une ressource.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+class ConditionalGet:
+    """
+    Dépendance de GET conditionnel (If-None-Match).
+
+    Si le client a envoyé If-None-Match (`requested`), la route lit d'abord
+    la seule version de la ressource (projection minimale), puis appelle
+    `check` : si le client possède déjà cette version, NotModified
+    interrompt la requête avant tout chargement ou sérialisation du document
+    complet. Sinon (et sans If-None-Match, en une seule lecture) l'ETag et
+    Cache-Control sont posés sur la réponse.
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.response = response
+        header = request.headers.get("if-none-match", "")
+        # Comparaison faible, comme le prévoit la RFC 9110 pour If-None-Match
+        self.client_etags = {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+    @property
+    def requested(self) -> bool:
+        return bool(self.client_etags)
+
+    def check(self, *parts: Any) -> str:
+        etag = make_etag(*parts)
+        if etag in self.client_etags or "*" in self.client_etags:
+            raise NotModified(etag)
+        self.response.headers["ETag"] = etag
+        self.response.headers["Cache-Control"] = CACHE_CONTROL
+        return etag
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> StarletteResponse:
+    return StarletteResponse(
+        status_code=304,
+        headers={"ETag": exc.etag, "Cache-Control": CACHE_CONTROL},
+    )
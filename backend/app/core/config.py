@@ -53,6 +53,22 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB: str = "studyhub"
+    # Pool de connexions (par worker uvicorn)
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 5
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 10000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # Sonde /ready : ping mis en cache, délai maximal du ping
+    MONGODB_READY_CACHE_SECONDS: float = 5
+    MONGODB_READY_TIMEOUT_SECONDS: float = 2
+    # Liste séparée par des virgules, ex. "zstd,snappy,zlib"
+    MONGODB_COMPRESSORS: str = ""
+    # Création des index déclarés au démarrage de l'application
+    MONGODB_ENSURE_INDEXES: bool = True
+    # Recréation au démarrage des index aux options modifiées
+    # (sinon : python -m app.db.indexes --replace-changed)
+    MONGODB_REPLACE_CHANGED_INDEXES: bool = False
+    MONGODB_INDEX_LEASE_SECONDS: int = 600
     
     # IA Models
     OCR_MODEL_PATH: str = "models/ocr"
@@ -69,9 +85,88 @@ class Settings(BaseSettings):
     MINIO_BUCKET: str = "studyhub"
     MINIO_SECURE: bool = False
     
+    # Hachage des mots de passe (bcrypt)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    
+    # Sérialisation directe des grandes listes (sans validation Pydantic par élément)
+    FAST_LIST_SERIALIZATION: bool = False
+    
+    # Longueur de l'aperçu des notes affiché dans les listes
+    NOTE_SNIPPET_LENGTH: int = 200
+    
+    # Historique des notes : un instantané complet toutes les N versions
+    NOTE_VERSION_SNAPSHOT_INTERVAL: int = 20
+    
+    # Compression du contenu des notes au-delà de ce seuil (octets) ; codec zstd ou zlib
+    NOTE_COMPRESSION_THRESHOLD: int = 4096
+    NOTE_COMPRESSION_CODEC: str = "zstd"
+    NOTE_COMPRESSION_LEVEL: int = 3
+    
+    # Part maximale du temps passée en base par chaque tâche de fond
+    BACKGROUND_DUTY_CYCLE: float = 0.25
+    
+    # Purge en tâche de fond (suppressions en cascade, corbeille)
+    PURGE_ENABLED: bool = True
+    PURGE_INTERVAL_SECONDS: int = 30
+    PURGE_BATCH_SIZE: int = 200
+    PURGE_LEASE_SECONDS: int = 120
+    NOTE_TRASH_RETENTION_DAYS: int = 30
+    
+    # Compteurs de notes par tag et par cours : réconciliation périodique
+    COUNTERS_RECONCILE_INTERVAL_SECONDS: int = 60
+    COUNTERS_RECONCILE_BATCH_SIZE: int = 100
+    
+    # Nombre maximal d'identifiants par requête POST /notes/batch-get
+    NOTE_BATCH_GET_MAX_IDS: int = 100
+    
+    # Import NDJSON des notes
+    NOTE_IMPORT_BATCH_SIZE: int = 500
+    NOTE_IMPORT_MAX_LINE_BYTES: int = 1_000_000
+    NOTE_IMPORT_MAX_ERRORS: int = 1000
+    
+    # Recherche plein texte
+    SEARCH_FACET_LIMIT: int = 20
+    
+    # Index sémantique local (« notes liées »)
+    SEMANTIC_INDEX_DIR: str = "data/semantic_index"
+    SEMANTIC_INDEX_DIM: int = 128
+    SEMANTIC_INDEX_MAX_USERS: int = 200
+    SEMANTIC_INDEX_MAX_AGE_SECONDS: int = 3600
+    
+    # Autocomplétion (index de préfixes en mémoire, par worker)
+    AUTOCOMPLETE_MEMORY_BUDGET_MB: int = 64
+    AUTOCOMPLETE_MAX_AGE_SECONDS: int = 300
+    
+    # Répétition espacée (voir services/scheduler.py)
+    REVISION_DESIRED_RETENTION: float = 0.9
+    REVISION_MAX_INTERVAL_DAYS: int = 365
+    REVISION_RESCHEDULE_BATCH_SIZE: int = 5000
+    # Révisions par requête POST /revisions/batch
+    REVISION_BATCH_MAX_ITEMS: int = 500
+    # Révisions en attente marquées manquées (voir services/sweeper.py)
+    REVISION_MISSED_AFTER_HOURS: int = 24
+    REVISION_SWEEP_INTERVAL_SECONDS: int = 300
+    REVISION_SWEEP_BATCH_SIZE: int = 500
+    REVISION_SWEEP_MAX_BATCHES: int = 20
+    
+    # Détection des notes quasi identiques (MinHash / LSH)
+    DEDUP_SIMILARITY_THRESHOLD: float = 0.8
+    DEDUP_MIN_WORDS: int = 20
+    
+    # Cache des utilisateurs authentifiés (par worker)
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    # Invalidation du cache propagée aux autres workers par Redis (REDIS_URL)
+    USER_CACHE_SHARED_INVALIDATION: bool = True
+    
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # File des révisions à faire : "redis" (partagée) ou "memory" (par worker)
+    DUE_QUEUE_BACKEND: str = "redis"
+    DUE_QUEUE_TTL_SECONDS: int = 3600
+    
     # Email
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = 587
@@ -0,0 +1,118 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Query, Response, status
+from pymongo import DESCENDING
+
+# En-tête portant le curseur de la page suivante
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Taille de page maximale (limit=0 ou négatif serait sans borne côté MongoDB)
+MAX_PAGE_LIMIT = 500
+
+
+class PageParams:
+    """
+    Paramètres de pagination par curseur (keyset).
+
+    `skip` reste accepté pendant la période de dépréciation mais coûte
+    un parcours linéaire côté MongoDB ; il est ignoré si un curseur est fourni.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Curseur opaque renvoyé dans l'en-tête X-Next-Cursor"),
+        skip: int = Query(0, ge=0, deprecated=True, description="Utiliser `cursor` à la place"),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_LIMIT),
+    ):
+        self.cursor = cursor
+        self.skip = 0 if cursor else skip
+        self.limit = limit
+
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    """
+    Encode la position d'un document (clé de tri + _id) en curseur opaque.
+    """
+    payload = json_util.dumps([doc.get(sort_field), doc["_id"]])
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """
+    Décode un curseur produit par `encode_cursor`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, last_id = json_util.loads(urlsafe_b64decode(padded).decode())
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur de pagination invalide"
+        )
+    return sort_value, last_id
+
+
+def keyset_filter(sort_field: str, direction: int, cursor: str) -> Dict[str, Any]:
+    """
+    Construit le filtre sélectionnant les documents situés après le curseur
+    dans l'ordre (sort_field, _id).
+    """
+    sort_value, last_id = decode_cursor(cursor)
+    op = "$lt" if direction == DESCENDING else "$gt"
+    if sort_field == "_id":
+        return {"_id": {op: last_id}}
+    return {
+        "$or": [
+            {sort_field: {op: sort_value}},
+            {sort_field: sort_value, "_id": {op: last_id}},
+        ]
+    }
+
+
+async def paginate(
+    collection,
+    filter_query: Dict[str, Any],
+    page: PageParams,
+    sort_field: str,
+    direction: int = DESCENDING,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Récupère une page de documents triés par (sort_field, _id).
+
+    Renvoie les documents et le curseur de la page suivante (None en fin de liste).
+    """
+    query = filter_query
+    if page.cursor:
+        after = keyset_filter(sort_field, direction, page.cursor)
+        if any(key in filter_query for key in ("$or", sort_field, "_id")):
+            query = {"$and": [filter_query, after]}
+        else:
+            query = {**filter_query, **after}
+
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    cursor = collection.find(query, projection).sort(sort)
+    if page.skip:
+        cursor = cursor.skip(page.skip)
+    # Un document supplémentaire indique s'il existe une page suivante
+    docs = await cursor.limit(page.limit + 1).to_list(page.limit + 1)
+
+    next_cursor = None
+    if len(docs) > page.limit:
+        docs = docs[:page.limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
+
+
+def set_page_headers(response: Response, page: PageParams, next_cursor: Optional[str]) -> None:
+    """
+    Expose le curseur suivant et signale l'usage du paramètre déprécié `skip`.
+    """
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if page.skip:
+        response.headers["Deprecation"] = "true"
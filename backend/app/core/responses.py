@@ -0,0 +1,108 @@
+from typing import Any, AsyncIterator, Dict, Iterable, List, Type
+
+from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import from_json, to_json
+
+from app.core.config import settings
+
+
+def _json_fallback(value: Any) -> Any:
+    """
+    Conversion des types BSON non gérés nativement par pydantic-core.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+class FastJSONResponse(Response):
+    """
+    Réponse JSON sérialisée directement par pydantic-core (sans validation).
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content, fallback=_json_fallback)
+
+
+class ModelSerializer:
+    """
+    Sérialiseur précompilé pour un modèle de réponse.
+
+    Les documents lus en base sont considérés comme fiables : au lieu de
+    valider chaque élément contre le modèle, on restreint les champs par une
+    projection MongoDB et on complète les valeurs par défaut manquantes.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.projection: Dict[str, int] = {}
+        self.defaults: Dict[str, Any] = {}
+        for name, field in model.model_fields.items():
+            key = field.alias or name
+            self.projection[key] = 1
+            if not field.is_required():
+                self.defaults[key] = field.get_default(call_default_factory=True)
+
+    def prepare(self, docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        prepared = []
+        for doc in docs:
+            for key, default in self.defaults.items():
+                if key not in doc:
+                    doc[key] = default
+            prepared.append(doc)
+        return prepared
+
+    def dump_json(self, docs: Iterable[Dict[str, Any]]) -> bytes:
+        return to_json(self.prepare(docs), fallback=_json_fallback)
+
+
+def list_response(
+    docs: List[Dict[str, Any]], serializer: ModelSerializer, response: Response
+) -> Any:
+    """
+    Renvoie une liste de documents, sérialisée directement en JSON si le
+    chemin rapide est activé (FAST_LIST_SERIALIZATION), sinon laissée à la
+    validation habituelle de FastAPI via `response_model`.
+
+    Les en-têtes déjà posés sur `response` (pagination) sont conservés.
+    """
+    if not settings.FAST_LIST_SERIALIZATION:
+        return docs
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return FastJSONResponse(serializer.dump_json(docs), headers=headers)
+
+
+def serialized_list_response(payload: bytes) -> Any:
+    """
+    Comme `list_response`, pour une liste déjà sérialisée en JSON (file des
+    révisions) : renvoyée telle quelle sur le chemin rapide, sinon relue
+    pour passer par la validation de `response_model`.
+    """
+    if not settings.FAST_LIST_SERIALIZATION:
+        return from_json(payload)
+    return FastJSONResponse(payload)
+
+
+# Taille visée des morceaux envoyés par ndjson_stream
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+async def ndjson_stream(cursor, serializer: ModelSerializer) -> AsyncIterator[bytes]:
+    """
+    Sérialise un curseur MongoDB en NDJSON au fil de l'eau, par morceaux
+    d'environ NDJSON_CHUNK_BYTES : seul le lot courant du curseur est en mémoire.
+    """
+    chunk = bytearray()
+    async for doc in cursor:
+        chunk += to_json(serializer.prepare([doc])[0], fallback=_json_fallback)
+        chunk += b"\n"
+        if len(chunk) >= NDJSON_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
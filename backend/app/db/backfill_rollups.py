@@ -0,0 +1,73 @@
+"""
+Calcul des statistiques quotidiennes de révision depuis l'historique des
+révisions (voir services/rollups.py).
+
+Usage (depuis backend/) :
+
+    python -m app.db.backfill_rollups [--batch-size 100]
+    python -m app.db.backfill_rollups --user <user_id>
+
+Les statistiques de chaque utilisateur sont entièrement recalculées et
+remplacent les précédentes ; la commande peut donc être interrompue et
+relancée. Une révision terminée pendant le recalcul d'un utilisateur peut
+être comptée deux fois ou pas du tout : relancer la commande pour cet
+utilisateur corrige ses statistiques.
+"""
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from pymongo import ASCENDING
+
+from app.services import rollups
+
+
+@dataclass
+class BackfillStats:
+    users: int = 0
+    days: int = 0
+
+
+async def backfill_rollups(db, user_id: Optional[str] = None, batch_size: int = 100) -> BackfillStats:
+    """
+    Recalcule les statistiques d'un utilisateur, ou de tous par _id croissant.
+    """
+    stats = BackfillStats()
+    if user_id is not None:
+        stats.users, stats.days = 1, await rollups.rebuild_user(db, user_id)
+        return stats
+    last_id = None
+    while True:
+        query = {} if last_id is None else {"_id": {"$gt": last_id}}
+        users = await db.users.find(query, {"_id": 1}).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+        if not users:
+            return stats
+        last_id = users[-1]["_id"]
+        for user in users:
+            stats.days += await rollups.rebuild_user(db, str(user["_id"]))
+        stats.users += len(users)
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from app.db.mongodb import close_mongo_connection, connect_to_mongo
+
+    db = connect_to_mongo()
+    started = time.monotonic()
+    try:
+        stats = await backfill_rollups(db, args.user, args.batch_size)
+    finally:
+        await close_mongo_connection()
+    print(f"Utilisateurs traités : {stats.users}")
+    print(f"Jours (par cours) écrits : {stats.days}")
+    print(f"Durée : {time.monotonic() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Statistiques quotidiennes de révision")
+    parser.add_argument("--user", help="limite le calcul à un utilisateur")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args)))
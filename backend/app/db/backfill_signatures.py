@@ -0,0 +1,85 @@
+"""
+Calcul des signatures MinHash des notes existantes (voir services/dedup.py).
+
+Usage (depuis backend/) :
+
+    python -m app.db.backfill_signatures [--dry-run] [--batch-size 500]
+
+Les notes sont parcourues par _id croissant ; seules celles sans signature
+ou dont la signature correspond à une version antérieure sont traitées, par
+lots écrits en un seul `bulk_write`. La commande peut donc être interrompue
+et relancée.
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+
+from pymongo import ASCENDING
+
+from app.db import note_codec
+from app.services import dedup
+
+
+@dataclass
+class BackfillStats:
+    scanned: int = 0
+    signed: int = 0
+    up_to_date: int = 0
+
+
+async def backfill_signatures(db, batch_size: int = 500, dry_run: bool = False) -> BackfillStats:
+    """
+    Calcule les signatures manquantes ou périmées des notes hors corbeille.
+    """
+    stats = BackfillStats()
+    last_id = None
+    while True:
+        query = {"is_deleted": False}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db.notes.find(
+            query, {"creator_id": 1, "content": 1, "version": 1}
+        ).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return stats
+        last_id = batch[-1]["_id"]
+        stats.scanned += len(batch)
+
+        signed = {
+            doc["note_id"]: doc["note_version"] async for doc in db.note_signatures.find(
+                {"note_id": {"$in": [str(note["_id"]) for note in batch]}}, {"note_id": 1, "note_version": 1}
+            )
+        }
+        stale = [note for note in batch if signed.get(str(note["_id"]), 0) < note.get("version", 1)]
+        stats.up_to_date += len(batch) - len(stale)
+        stats.signed += len(stale)
+        if dry_run:
+            continue
+
+        by_user = {}
+        for note in stale:
+            by_user.setdefault(note["creator_id"], []).append(note_codec.decode_note(note))
+        for user_id, notes in by_user.items():
+            await dedup.record_many(db, user_id, notes)
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from app.db.mongodb import close_mongo_connection, connect_to_mongo
+
+    db = connect_to_mongo()
+    try:
+        stats = await backfill_signatures(db, args.batch_size, args.dry_run)
+    finally:
+        await close_mongo_connection()
+    print(f"Notes examinées : {stats.scanned}")
+    print(f"Signatures calculées{' (simulation)' if args.dry_run else ''} : {stats.signed}")
+    print(f"Signatures déjà à jour : {stats.up_to_date}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Signatures MinHash des notes existantes")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="compte les notes à traiter sans écrire")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args)))
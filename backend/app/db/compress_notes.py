@@ -0,0 +1,157 @@
+"""
+Migration du contenu des notes vers le stockage compressé (voir note_codec).
+
+Usage (depuis backend/) :
+
+    python -m app.db.compress_notes [--dry-run] [--batch-size 500]
+    python -m app.db.compress_notes --decompress   # retour arrière
+
+Les notes sont parcourues par _id croissant et réécrites par lots
+(`bulk_write` non ordonné). Chaque écriture est conditionnée à la version lue :
+une note modifiée entre-temps est laissée telle quelle (elle sera encodée par
+sa prochaine écriture ou une exécution ultérieure).
+
+L'aperçu (`snippet`) des notes antérieures à ce champ est calculé dans la
+même écriture, la liste des notes ne pouvant pas le tirer d'un contenu
+compressé ; les notes déjà compressées sans aperçu sont complétées.
+
+Avant toute compression, l'ancien index texte des notes est remplacé par
+celui qui couvre `search_terms` (un seul index texte par collection : la
+recherche échoue pendant sa construction). Les workers démarrés avant la
+migration ne compressent pas les notes écrites : les redémarrer ensuite.
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.core.config import settings
+from app.db import note_codec
+from app.db.indexes import replace_text_index
+from app.models.note import build_snippet
+
+
+@dataclass
+class MigrationStats:
+    scanned: int = 0
+    converted: int = 0
+    skipped: int = 0
+    snippets: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    text_index_replaced: bool = False
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_after / self.bytes_before if self.bytes_before else 1.0
+
+
+def _candidates(decompress: bool) -> Dict[str, Any]:
+    if decompress:
+        return {"content": {"$type": "binData"}}
+    # Seules les notes au-dessus du seuil sont transférées
+    return {"$or": [
+        {"$expr": {"$and": [
+            {"$eq": [{"$type": "$content"}, "string"]},
+            {"$gte": [{"$strLenBytes": "$content"}, settings.NOTE_COMPRESSION_THRESHOLD]},
+        ]}},
+        # Compressées par une version précédente de la migration, sans aperçu
+        {"content": {"$type": "binData"}, "snippet": {"$in": [None, ""]}},
+    ]}
+
+
+def _stored_size(value: Any) -> int:
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+
+async def compress_notes(
+    db, batch_size: int = 500, dry_run: bool = False, decompress: bool = False
+) -> MigrationStats:
+    """
+    Encode (ou décode avec `decompress`) le contenu des notes existantes.
+    """
+    stats = MigrationStats()
+    if not decompress and not dry_run:
+        # Les notes compressées ne sont trouvées que par `search_terms`
+        stats.text_index_replaced = await replace_text_index(db)
+        note_codec.set_compression(True)
+    last_id = None
+    while True:
+        query = _candidates(decompress)
+        if last_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+        batch = await db.notes.find(query, {"content": 1, "version": 1, "snippet": 1}).sort(
+            "_id", ASCENDING
+        ).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return stats
+        last_id = batch[-1]["_id"]
+
+        requests = []
+        # Notes déjà compressées : seul l'aperçu est ajouté
+        snippet_requests = []
+        for note in batch:
+            stats.scanned += 1
+            if decompress:
+                update = {
+                    "$set": {"content": note_codec.decode_content(note["content"])},
+                    "$unset": {"search_terms": ""},
+                }
+            elif not isinstance(note["content"], str):
+                snippet = build_snippet(note_codec.decode_content(note["content"]))
+                snippet_requests.append(
+                    UpdateOne({"_id": note["_id"], "version": note.get("version")}, {"$set": {"snippet": snippet}})
+                )
+                continue
+            else:
+                fields = {"content": note["content"]}
+                if not note.get("snippet"):
+                    fields["snippet"] = build_snippet(note["content"])
+                update = note_codec.storage_update(fields)
+                if not note_codec.is_compressed(update["$set"]["content"]):
+                    continue
+                stats.snippets += "snippet" in fields
+            stats.bytes_before += _stored_size(note["content"])
+            stats.bytes_after += _stored_size(update["$set"]["content"])
+            requests.append(UpdateOne({"_id": note["_id"], "version": note.get("version")}, update))
+
+        stats.snippets += len(snippet_requests)
+        if snippet_requests and not dry_run:
+            await db.notes.bulk_write(snippet_requests, ordered=False)
+        if requests and not dry_run:
+            result = await db.notes.bulk_write(requests, ordered=False)
+            stats.converted += result.modified_count
+            stats.skipped += len(requests) - result.modified_count
+        elif dry_run:
+            stats.converted += len(requests)
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from app.db.mongodb import close_mongo_connection, connect_to_mongo
+
+    db = connect_to_mongo()
+    try:
+        stats = await compress_notes(db, args.batch_size, args.dry_run, args.decompress)
+    finally:
+        await close_mongo_connection()
+    action = "décompressées" if args.decompress else "compressées"
+    if stats.text_index_replaced:
+        print("Index texte des notes remplacé (search_terms)")
+    print(f"Notes examinées : {stats.scanned}")
+    print(f"Notes {action}{' (simulation)' if args.dry_run else ''} : {stats.converted}")
+    print(f"Notes modifiées entre-temps (ignorées) : {stats.skipped}")
+    print(f"Aperçus calculés : {stats.snippets}")
+    print(f"Contenu : {stats.bytes_before / 1e6:.1f} Mo -> {stats.bytes_after / 1e6:.1f} Mo "
+          f"(ratio {stats.ratio:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compression du contenu des notes existantes")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="calcule le gain sans écrire")
+    parser.add_argument("--decompress", action="store_true", help="repasse le contenu en texte brut")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args)))
@@ -0,0 +1,413 @@
+"""
+Gestion déclarative des index MongoDB.
+
+Chaque collection déclare ici les index composés correspondant aux requêtes
+réellement émises par les endpoints. Au démarrage, un seul worker (bail
+`ensure_indexes`) crée les index manquants ; les index aux options modifiées,
+redondants ou inattendus sont seulement signalés. Leur remplacement ou leur
+suppression se fait par la commande :
+
+    python -m app.db.indexes --replace-changed [--drop-redundant]
+
+Vérification des plans d'exécution (échoue si une requête fait un COLLSCAN) :
+
+    python -m app.db.indexes --check
+
+MongoDB n'accepte qu'un index texte par collection : le nouvel index texte
+des notes (avec `search_terms`) ne peut pas être créé à côté de l'ancien.
+Tant qu'il manque, les workers ne compressent pas le contenu des notes
+(note_codec.set_compression) ; `compress_notes` le met en place avant de
+compresser les notes existantes.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Code d'erreur MongoDB IndexNotFound
+INDEX_NOT_FOUND = 27
+
+
+# Index déclarés par collection
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "notes": [
+        # Liste des notes : {creator_id, is_deleted} + filtre optionnel, tri par date
+        IndexModel([("creator_id", ASCENDING), ("is_deleted", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("creator_id", ASCENDING), ("is_deleted", ASCENDING), ("course_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("creator_id", ASCENDING), ("is_deleted", ASCENDING), ("tags", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # Purge de la corbeille (voir services/purge.py)
+        IndexModel([("deleted_at", ASCENDING)], partialFilterExpression={"is_deleted": True}),
+        # Recherche plein texte, partitionnée par utilisateur (égalité sur creator_id requise)
+        IndexModel(
+            # `search_terms` remplace `content` pour les notes compressées (note_codec)
+            [("creator_id", ASCENDING), ("title", TEXT), ("content", TEXT), ("search_terms", TEXT)],
+            weights={"title": 10, "content": 1, "search_terms": 1},
+            default_language="french",
+        ),
+    ],
+    "note_versions": [
+        IndexModel([("note_id", ASCENDING), ("version", DESCENDING)], unique=True),
+        IndexModel([("note_id", ASCENDING), ("kind", ASCENDING), ("version", DESCENDING)]),
+    ],
+    "note_signatures": [
+        IndexModel([("note_id", ASCENDING)], unique=True),
+        # Candidats doublons : notes de l'utilisateur partageant une bande LSH
+        IndexModel([("user_id", ASCENDING), ("bands", ASCENDING)]),
+    ],
+    "note_counters": [
+        IndexModel([("user_id", ASCENDING), ("kind", ASCENDING), ("value", ASCENDING)], unique=True),
+    ],
+    "courses": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "media": [
+        IndexModel([("note_id", ASCENDING)]),
+    ],
+    "revisions": [
+        IndexModel([("user_id", ASCENDING), ("scheduled_date", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("scheduled_date", ASCENDING), ("_id", ASCENDING)]),
+        # Révisions à faire d'un cours (tableau de bord du cours)
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING), ("status", ASCENDING), ("scheduled_date", ASCENDING)]),
+        IndexModel([("note_id", ASCENDING)]),
+        IndexModel([("scheduled_date", ASCENDING)]),
+        # Une seule révision suivante par révision terminée (voir services/scheduler.py)
+        IndexModel([("previous_revision_id", ASCENDING)], unique=True,
+                   partialFilterExpression={"previous_revision_id": {"$type": "string"}}),
+    ],
+    # Statistiques quotidiennes (voir services/rollups.py)
+    "revision_rollups": [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING), ("course_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING), ("day", ASCENDING)]),
+    ],
+    "purge_jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        IndexModel([("kind", ASCENDING), ("target_id", ASCENDING)], unique=True,
+                   partialFilterExpression={"status": "pending"}),
+    ],
+    "shares": [
+        IndexModel([("note_id", ASCENDING)]),
+        IndexModel([("source_user_id", ASCENDING), ("active", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("target_user_id", ASCENDING), ("active", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("target_email", ASCENDING), ("active", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+
+class QueryShape(NamedTuple):
+    """
+    Forme de requête émise par un endpoint, utilisée pour vérifier son plan.
+    """
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[tuple]] = None
+
+
+_SAMPLE_ID = "000000000000000000000000"
+_SAMPLE_DATE = datetime(2000, 1, 1)
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("read_notes", "notes",
+               {"creator_id": _SAMPLE_ID, "is_deleted": False},
+               [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("read_notes?course_id", "notes",
+               {"creator_id": _SAMPLE_ID, "is_deleted": False, "course_id": _SAMPLE_ID},
+               [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("read_notes?tag", "notes",
+               {"creator_id": _SAMPLE_ID, "is_deleted": False, "tags": "tag"},
+               [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("read_courses", "courses",
+               {"user_id": _SAMPLE_ID},
+               [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("read_revisions", "revisions",
+               {"user_id": _SAMPLE_ID},
+               [("scheduled_date", ASCENDING), ("_id", ASCENDING)]),
+    QueryShape("read_revisions?status", "revisions",
+               {"user_id": _SAMPLE_ID, "status": "pending", "scheduled_date": {"$lte": _SAMPLE_DATE}},
+               [("scheduled_date", ASCENDING), ("_id", ASCENDING)]),
+    QueryShape("course_dashboard_revisions", "revisions",
+               {"user_id": _SAMPLE_ID, "course_id": _SAMPLE_ID, "status": {"$in": ["pending", "missed"]},
+                "scheduled_date": {"$lt": _SAMPLE_DATE}}),
+    QueryShape("sweep_missed_revisions", "revisions",
+               {"scheduled_date": {"$gte": _SAMPLE_DATE, "$lt": _SAMPLE_DATE}, "status": "pending"},
+               [("scheduled_date", ASCENDING)]),
+    QueryShape("revision_stats", "revision_rollups",
+               {"user_id": _SAMPLE_ID, "day": {"$gte": _SAMPLE_DATE}}),
+    QueryShape("revision_stats?course_id", "revision_rollups",
+               {"user_id": _SAMPLE_ID, "course_id": _SAMPLE_ID, "day": {"$gte": _SAMPLE_DATE}}),
+    QueryShape("read_shared_by_me", "shares",
+               {"source_user_id": _SAMPLE_ID, "active": True},
+               [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("read_shared_with_me", "shares",
+               {"$or": [{"target_user_id": _SAMPLE_ID}, {"target_email": "user@example.com"}], "active": True},
+               [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("batch_get_shares", "shares",
+               {"note_id": {"$in": [_SAMPLE_ID]}, "active": True}),
+    QueryShape("search_notes", "notes",
+               {"creator_id": _SAMPLE_ID, "is_deleted": False, "$text": {"$search": "thermodynamique"}}),
+    QueryShape("rebuild_version", "note_versions",
+               {"note_id": _SAMPLE_ID, "kind": "snapshot", "version": {"$lte": 10}},
+               [("version", DESCENDING)]),
+    QueryShape("purge_expired_trash", "notes",
+               {"is_deleted": True, "deleted_at": {"$lt": _SAMPLE_DATE}}),
+    QueryShape("claim_purge_job", "purge_jobs",
+               {"status": "pending", "$or": [{"lease_until": None}, {"lease_until": {"$lt": _SAMPLE_DATE}}]},
+               [("created_at", ASCENDING)]),
+    QueryShape("get_user_by_email", "users", {"email": "user@example.com"}),
+]
+
+
+class IndexReport(NamedTuple):
+    """
+    Écart entre les index déclarés et ceux présents en base.
+    """
+    missing: Dict[str, List[str]]
+    changed: Dict[str, List[str]]
+    redundant: Dict[str, List[str]]
+    unexpected: Dict[str, List[str]]
+
+
+class CollectionScanError(RuntimeError):
+    """
+    Levée lorsqu'une forme de requête déclarée est exécutée par un COLLSCAN.
+    """
+
+
+def _is_prefix(keys: List[tuple], other: List[tuple]) -> bool:
+    return len(keys) < len(other) and list(other[:len(keys)]) == list(keys)
+
+
+def _is_text(keys: List[tuple]) -> bool:
+    return any(direction == TEXT for _, direction in keys)
+
+
+def _is_text_info(info: Dict[str, Any]) -> bool:
+    # Clés d'un index texte existant, telles que renvoyées par MongoDB (`_fts`)
+    return any(key == "_fts" for key, _ in info["key"]) or _is_text(info["key"])
+
+
+def _options_differ(model: IndexModel, info: Dict[str, Any]) -> bool:
+    """
+    Compare les options déclarées (unique, langue, poids...) à l'index existant.
+    """
+    for option, value in model.document.items():
+        if option in ("name", "key"):
+            continue
+        current = info.get(option)
+        if isinstance(value, dict) and isinstance(current, dict):
+            current = dict(current)
+        if current != value:
+            return True
+    return False
+
+
+async def check_indexes(db) -> IndexReport:
+    """
+    Compare les index déclarés aux index existants.
+
+    Un index non déclaré est dit redondant lorsque ses clés forment un préfixe
+    d'un index déclaré (qui peut donc servir les mêmes requêtes).
+    """
+    missing: Dict[str, List[str]] = {}
+    changed: Dict[str, List[str]] = {}
+    redundant: Dict[str, List[str]] = {}
+    unexpected: Dict[str, List[str]] = {}
+
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        declared = {model.document["name"]: list(model.document["key"].items()) for model in models}
+
+        missing_names = [name for name in declared if name not in existing]
+        if missing_names:
+            missing[collection] = missing_names
+        changed_names = [
+            model.document["name"] for model in models
+            if model.document["name"] in existing
+            and _options_differ(model, existing[model.document["name"]])
+        ]
+        if changed_names:
+            changed[collection] = changed_names
+
+        for name, info in existing.items():
+            if name == "_id_" or name in declared:
+                continue
+            keys = [tuple(key) for key in info["key"]]
+            if any(_is_prefix(keys, declared_keys) for declared_keys in declared.values()):
+                redundant.setdefault(collection, []).append(name)
+            else:
+                unexpected.setdefault(collection, []).append(name)
+
+    return IndexReport(missing=missing, changed=changed, redundant=redundant, unexpected=unexpected)
+
+
+async def _drop_index(db, collection: str, name: str) -> None:
+    try:
+        await db[collection].drop_index(name)
+    except OperationFailure as exc:
+        # Déjà supprimé (par une autre instance)
+        if exc.code != INDEX_NOT_FOUND:
+            raise
+
+
+def _declared_text_index(collection: str) -> IndexModel:
+    return next(model for model in INDEXES[collection] if _is_text(list(model.document["key"].items())))
+
+
+async def text_index_current(db, collection: str = "notes") -> bool:
+    """
+    Indique si l'index texte déclaré de la collection est en place.
+    """
+    return _declared_text_index(collection).document["name"] in await db[collection].index_information()
+
+
+async def replace_text_index(db, collection: str = "notes") -> bool:
+    """
+    Remplace l'ancien index texte de la collection par celui déclaré ;
+    renvoie False s'il était déjà en place.
+    """
+    model = _declared_text_index(collection)
+    existing = await db[collection].index_information()
+    if model.document["name"] in existing:
+        return False
+    for name, info in existing.items():
+        if _is_text_info(info):
+            await _drop_index(db, collection, name)
+            logger.info("Ancien index texte supprimé sur %s : %s", collection, name)
+    await db[collection].create_indexes([model])
+    return True
+
+
+async def ensure_indexes(db, replace_changed: bool = False, drop_redundant: bool = False) -> IndexReport:
+    """
+    Crée les index déclarés manquants et renvoie le rapport d'écart.
+
+    Avec `replace_changed`, les index dont les options ont changé (et un
+    ancien index texte non déclaré) sont supprimés puis recréés ; sinon ils
+    sont seulement signalés.
+    """
+    report = await check_indexes(db)
+
+    for collection, names in report.changed.items():
+        if replace_changed:
+            for name in names:
+                await _drop_index(db, collection, name)
+            report.missing.setdefault(collection, []).extend(names)
+        else:
+            logger.warning("Index aux options modifiées sur %s : %s", collection, ", ".join(names))
+
+    for collection, names in report.missing.items():
+        models = [model for model in INDEXES[collection] if model.document["name"] in names]
+        # MongoDB n'autorise qu'un index texte par collection : l'ancien est remplacé
+        if any(_is_text(list(model.document["key"].items())) for model in models):
+            existing = await db[collection].index_information()
+            previous = [
+                name for name, info in existing.items()
+                if name not in names and _is_text_info(info)
+            ]
+            if previous and not replace_changed:
+                logger.warning("Index texte non remplacé sur %s : %s (voir compress_notes)", collection, ", ".join(previous))
+                models = [model for model in models if not _is_text(list(model.document["key"].items()))]
+            for name in previous if replace_changed else []:
+                await _drop_index(db, collection, name)
+                if name in report.unexpected.get(collection, []):
+                    report.unexpected[collection].remove(name)
+                logger.info("Ancien index texte supprimé sur %s : %s", collection, name)
+        if models:
+            await db[collection].create_indexes(models)
+            logger.info("Index créés sur %s : %s", collection, ", ".join(model.document["name"] for model in models))
+
+    for collection, names in report.redundant.items():
+        if drop_redundant:
+            for name in names:
+                await _drop_index(db, collection, name)
+            logger.info("Index redondants supprimés sur %s : %s", collection, ", ".join(names))
+        else:
+            logger.warning("Index redondants sur %s : %s", collection, ", ".join(names))
+    for collection, names in report.unexpected.items():
+        if names:
+            logger.warning("Index non déclarés sur %s : %s", collection, ", ".join(names))
+
+    if report.missing or (replace_changed and report.changed) or (drop_redundant and report.redundant):
+        report = await check_indexes(db)
+    return report
+
+
+def _plan_stages(plan: Dict[str, Any]) -> Iterator[str]:
+    """
+    Parcourt récursivement les étapes d'un plan d'exécution.
+    """
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def explain_query_shapes(db) -> Dict[str, List[str]]:
+    """
+    Exécute explain() sur chaque forme de requête déclarée.
+
+    Renvoie les étapes du plan gagnant par forme et lève CollectionScanError
+    si l'une d'elles utilise un COLLSCAN.
+    """
+    plans: Dict[str, List[str]] = {}
+    for shape in QUERY_SHAPES:
+        cursor = db[shape.collection].find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explanation = await cursor.explain()
+        plans[shape.name] = list(_plan_stages(explanation["queryPlanner"]["winningPlan"]))
+
+    scans = [name for name, stages in plans.items() if "COLLSCAN" in stages]
+    if scans:
+        raise CollectionScanError(f"COLLSCAN détecté pour : {', '.join(scans)}")
+    return plans
+
+
+async def _main(check: bool, replace_changed: bool, drop_redundant: bool) -> int:
+    from app.db.mongodb import close_mongo_connection, connect_to_mongo
+
+    db = connect_to_mongo()
+    try:
+        return await _run(db, check, replace_changed, drop_redundant)
+    finally:
+        await close_mongo_connection()
+
+
+async def _run(db, check: bool, replace_changed: bool, drop_redundant: bool) -> int:
+    report = await ensure_indexes(db, replace_changed=replace_changed, drop_redundant=drop_redundant)
+    print(f"Index manquants : {report.missing or 'aucun'}")
+    print(f"Index aux options modifiées : {report.changed or 'aucun'}")
+    print(f"Index redondants : {report.redundant or 'aucun'}")
+    print(f"Index non déclarés : {report.unexpected or 'aucun'}")
+    if not check:
+        return 0
+    try:
+        plans = await explain_query_shapes(db)
+    except CollectionScanError as exc:
+        print(exc)
+        return 1
+    for name, stages in plans.items():
+        print(f"{name}: {' <- '.join(stages)}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestion des index MongoDB de StudyHub")
+    parser.add_argument("--check", action="store_true", help="vérifie les plans d'exécution (explain)")
+    parser.add_argument("--replace-changed", action="store_true",
+                        help="recrée les index aux options modifiées et remplace l'ancien index texte")
+    parser.add_argument("--drop-redundant", action="store_true", help="supprime les index redondants")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.check, args.replace_changed, args.drop_redundant)))
@@ -1,13 +1,24 @@
+import asyncio
+import time
 import motor.motor_asyncio
 from fastapi import Depends
 from bson.objectid import ObjectId
-from typing import Any, Annotated
+from typing import Any, Annotated, Optional
 
 from app.core.config import settings
+from app.db.monitoring import PoolMonitor
 
-# Client MongoDB
-client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URL)
-db = client[settings.MONGODB_DB]
+# Client MongoDB, créé au démarrage de l'application (voir connect_to_mongo)
+client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
+db = None
+
+# Métriques du pool de connexions de ce worker
+pool_monitor = PoolMonitor()
+# Dernier ping de disponibilité : (instant monotone, succès)
+_last_ping = (0.0, False)
+
+# Bail pris par le worker qui crée les index au démarrage
+INDEX_LEASE = "ensure_indexes"
 
 class PyObjectId(ObjectId):
     """
@@ -37,7 +48,7 @@ class PyObjectId(ObjectId):
 
 
 # Pour Pydantic v2
-from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic import BeforeValidator, GetCoreSchemaHandler, GetJsonSchemaHandler
 from pydantic_core import CoreSchema, core_schema
 
 def validate_object_id(v: Any) -> ObjectId:
@@ -56,6 +67,80 @@ def object_id_schema(field_name: str) -> CoreSchema:
 # Alias pour l'utilisation avec Annotated
 ObjectIdField = Annotated[ObjectId, object_id_schema]
 
+# Identifiant exposé sous forme de chaîne dans les réponses (accepte un ObjectId)
+StrObjectId = Annotated[str, BeforeValidator(lambda v: str(v) if isinstance(v, ObjectId) else v)]
+
+
+def to_object_id(value: Any) -> Any:
+    """
+    Convertit un identifiant en ObjectId lorsqu'il est valide,
+    sinon le renvoie tel quel (identifiants historiques en chaîne).
+    """
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+def connect_to_mongo():
+    """
+    Crée le client MongoDB à partir de la configuration du pool.
+    """
+    global client, db
+    options = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [pool_monitor],
+    }
+    compressors = [c.strip() for c in settings.MONGODB_COMPRESSORS.split(",") if c.strip()]
+    if compressors:
+        options["compressors"] = compressors
+    client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URL, **options)
+    db = client[settings.MONGODB_DB]
+    return db
+
+
+async def warm_up_pool():
+    """
+    Ouvre minPoolSize connexions en parallèle pour que les premières
+    requêtes ne paient pas l'établissement des connexions.
+    """
+    global _last_ping
+    size = max(settings.MONGODB_MIN_POOL_SIZE, 1)
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(size)))
+    _last_ping = (time.monotonic(), True)
+
+
+async def is_pool_ready() -> bool:
+    """
+    Disponibilité de MongoDB pour ce worker : résultat d'un ping, mis en
+    cache MONGODB_READY_CACHE_SECONDS pour ne pas solliciter la base à
+    chaque sonde.
+    """
+    global _last_ping
+    checked_at, ready = _last_ping
+    if time.monotonic() - checked_at < settings.MONGODB_READY_CACHE_SECONDS:
+        return ready
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), settings.MONGODB_READY_TIMEOUT_SECONDS)
+        ready = True
+    except Exception:
+        ready = False
+    _last_ping = (time.monotonic(), ready)
+    return ready
+
+
+async def close_mongo_connection():
+    """
+    Ferme le client MongoDB à l'arrêt de l'application.
+    """
+    global client, _last_ping
+    _last_ping = (time.monotonic(), False)
+    if client is not None:
+        client.close()
+        client = None
+
 
 async def get_database():
     """
@@ -68,30 +153,29 @@ async def init_mongodb():
     """
     Initialise les index et collections MongoDB.
     """
-    # Collection utilisateurs
-    await db.users.create_index("email", unique=True)
-    
-    # Collection notes
-    await db.notes.create_index("creator_id")
-    await db.notes.create_index("course_id")
-    await db.notes.create_index("tags")
-    await db.notes.create_index([("title", "text"), ("content", "text")])
-    
-    # Collection cours
-    await db.courses.create_index("user_id")
-    await db.courses.create_index("tags")
-    
-    # Collection éléments multimédias
-    await db.media.create_index("note_id")
-    
-    # Collection révisions
-    await db.revisions.create_index("user_id")
-    await db.revisions.create_index("note_id")
-    await db.revisions.create_index("scheduled_date")
-    
-    # Collection partages
-    await db.shares.create_index("note_id")
-    await db.shares.create_index("source_user_id")
-    await db.shares.create_index("target_user_id")
-    
-    print("MongoDB initialized with indexes")
+    from app.core.background import acquire_lease, release_lease
+    from app.db.indexes import ensure_indexes
+
+    # Un seul worker à la fois : les autres démarrent sans attendre
+    if not await acquire_lease(db, INDEX_LEASE, settings.MONGODB_INDEX_LEASE_SECONDS):
+        return
+    try:
+        report = await ensure_indexes(db, replace_changed=settings.MONGODB_REPLACE_CHANGED_INDEXES)
+    finally:
+        await release_lease(db, INDEX_LEASE)
+    print(f"MongoDB initialized with indexes (redundant: {report.redundant or 'none'})")
+
+
+async def check_text_index():
+    """
+    Désactive la compression des notes de ce worker si l'index texte ne
+    couvre pas encore `search_terms` (migration : python -m app.db.compress_notes).
+    """
+    from app.db import note_codec
+    from app.db.indexes import text_index_current
+
+    current = await text_index_current(db)
+    note_codec.set_compression(current)
+    if not current:
+        print("Index texte des notes à migrer : compression du contenu désactivée "
+              "(python -m app.db.compress_notes)")
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict
+
+from pymongo import monitoring
+
+# Bornes (ms) de l'histogramme des temps d'attente au checkout
+WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Écouteur du pool de connexions MongoDB.
+
+    Mesure le temps d'attente des checkouts et le nombre de connexions
+    ouvertes / utilisées, pour dimensionner le pool de chaque worker uvicorn.
+    Les événements sont émis depuis les threads de Motor, d'où le verrou.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.open_connections = 0
+            self.in_use = 0
+            self.max_in_use = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def _record_wait(self, event) -> None:
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            wait_ms = duration * 1000
+        else:
+            # pymongo < 4.7 : durée mesurée depuis l'événement de début (même thread)
+            started = getattr(self._local, "started", None)
+            wait_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        self.wait_buckets[bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._record_wait(event)
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._record_wait(event)
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(self.open_connections - 1, 0)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Renvoie l'état courant du pool pour ce worker.
+        """
+        with self._lock:
+            observed = self.checkouts + self.checkout_failures
+            buckets = {f"le_{bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+            buckets["gt_%sms" % WAIT_BUCKETS_MS[-1]] = self.wait_buckets[-1]
+            return {
+                "pid": os.getpid(),
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_avg_ms": round(self.wait_total_ms / observed, 3) if observed else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram": buckets,
+            }
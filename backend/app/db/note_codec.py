@@ -0,0 +1,146 @@
+"""
+Codec de stockage du contenu des notes.
+
+Au-delà de NOTE_COMPRESSION_THRESHOLD octets, `content` est stocké compressé
+dans un BSON Binary de sous-type utilisateur (128) dont le premier octet
+identifie l'algorithme (zstd ou zlib). Les documents restent plus petits dans
+le cache WiredTiger ; la décompression n'a lieu que lorsque `content` est lu
+(les listes allégées et la recherche le projettent hors de la requête).
+
+L'index texte ne voit pas un Binary : les notes compressées portent donc un
+champ `search_terms` (mots distincts du contenu) indexé à la place. Tant que
+l'index texte n'inclut pas ce champ (voir db/indexes.py), le worker ne
+compresse pas (`set_compression`) : les notes resteraient introuvables.
+"""
+import re
+import zlib
+from typing import Any, Dict, Optional, Union
+
+from bson import Binary
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd optionnel (requirements-minimal.txt) : repli sur zlib
+    zstandard = None
+
+COMPRESSED_SUBTYPE = 128
+
+ZLIB = 1
+ZSTD = 2
+
+CODECS = {"zlib": ZLIB, "zstd": ZSTD}
+
+# Un gain inférieur à 10 % ne justifie pas la décompression à la lecture
+MIN_RATIO = 0.9
+
+_WORD = re.compile(r"\w+")
+
+# Désactivée au démarrage si l'index texte ne couvre pas `search_terms`
+_compression_enabled = True
+
+
+def set_compression(enabled: bool) -> None:
+    global _compression_enabled
+    _compression_enabled = enabled
+
+
+def default_codec() -> int:
+    codec = CODECS.get(settings.NOTE_COMPRESSION_CODEC, ZLIB)
+    if codec == ZSTD and zstandard is None:
+        return ZLIB
+    return codec
+
+
+def compress(data: bytes, codec: int) -> bytes:
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=settings.NOTE_COMPRESSION_LEVEL).compress(data)
+    return zlib.compress(data, min(settings.NOTE_COMPRESSION_LEVEL, 9))
+
+
+def decompress(data: bytes, codec: int) -> bytes:
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Contenu compressé en zstd mais le module zstandard est absent")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == ZLIB:
+        return zlib.decompress(data)
+    raise ValueError(f"Codec de contenu inconnu : {codec}")
+
+
+def encode_content(text: str, codec: Optional[int] = None) -> Union[str, Binary]:
+    """
+    Forme stockée d'un contenu : texte brut sous le seuil, Binary compressé au-delà.
+    """
+    raw = text.encode("utf-8")
+    if not _compression_enabled or len(raw) < settings.NOTE_COMPRESSION_THRESHOLD:
+        return text
+    codec = codec or default_codec()
+    packed = compress(raw, codec)
+    if len(packed) + 1 > len(raw) * MIN_RATIO:
+        return text
+    return Binary(bytes([codec]) + packed, COMPRESSED_SUBTYPE)
+
+
+def decode_content(value: Any) -> Any:
+    """
+    Contenu lisible à partir de sa forme stockée (texte renvoyé tel quel).
+    """
+    if isinstance(value, bytes) and getattr(value, "subtype", None) == COMPRESSED_SUBTYPE:
+        return decompress(value[1:], value[0]).decode("utf-8")
+    return value
+
+
+def is_compressed(value: Any) -> bool:
+    return isinstance(value, Binary) and value.subtype == COMPRESSED_SUBTYPE
+
+
+def search_terms(text: str) -> str:
+    """
+    Mots distincts du contenu, dans leur ordre d'apparition, pour l'index texte.
+    """
+    return " ".join(dict.fromkeys(word.lower() for word in _WORD.findall(text)))
+
+
+def content_fields(text: str) -> Dict[str, Any]:
+    """
+    Champs à écrire pour un contenu (insertion).
+    """
+    stored = encode_content(text)
+    if is_compressed(stored):
+        return {"content": stored, "search_terms": search_terms(text)}
+    return {"content": stored}
+
+
+def storage_update(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Opérateurs de mise à jour écrivant `fields` ($set), contenu encodé.
+    """
+    update: Dict[str, Any] = {"$set": dict(fields)}
+    if isinstance(fields.get("content"), str):
+        stored = content_fields(fields["content"])
+        update["$set"].update(stored)
+        if "search_terms" not in stored:
+            update["$unset"] = {"search_terms": ""}
+    return update
+
+
+def encode_note(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copie d'un document de note prête à être insérée.
+    """
+    if not isinstance(doc.get("content"), str):
+        return doc
+    return {**doc, **content_fields(doc["content"])}
+
+
+def decode_note(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Décompresse en place le contenu d'un document lu en base, s'il a été projeté.
+    """
+    if doc is not None:
+        doc.pop("search_terms", None)
+        if "content" in doc:
+            doc["content"] = decode_content(doc["content"])
+    return doc
@@ -0,0 +1,50 @@
+"""
+Replanification des révisions en attente de tous les utilisateurs, après un
+changement des paramètres de répétition espacée (voir services/scheduler.py).
+
+Usage (depuis backend/) :
+
+    python -m app.db.reschedule_revisions [--retention 0.85] [--max-days 180]
+    python -m app.db.reschedule_revisions --user <user_id>
+
+Sans option, les valeurs de la configuration (REVISION_DESIRED_RETENTION,
+REVISION_MAX_INTERVAL_DAYS) sont utilisées. L'opération peut être relancée
+sans effet de bord.
+"""
+import argparse
+import asyncio
+import time
+
+from app.services import scheduler
+from app.services.due_queue import due_queue
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from app.db.mongodb import close_mongo_connection, connect_to_mongo
+
+    db = connect_to_mongo()
+    started = time.monotonic()
+    try:
+        stats = await scheduler.reschedule(
+            db, user_id=args.user, retention=args.retention, max_days=args.max_days, batch_size=args.batch_size
+        )
+        # Files des révisions à faire partagées (Redis) : rechargées à la prochaine lecture
+        if stats.rescheduled:
+            await due_queue.invalidate(args.user)
+    finally:
+        await due_queue.close()
+        await close_mongo_connection()
+    print(f"Révisions en attente examinées : {stats.scanned}")
+    print(f"Révisions replanifiées : {stats.rescheduled}")
+    print(f"Durée : {time.monotonic() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replanification des révisions en attente")
+    parser.add_argument("--user", help="limite la replanification à un utilisateur")
+    parser.add_argument("--retention", type=float, help="probabilité de rappel visée (0 à 1)")
+    parser.add_argument("--max-days", type=int, help="intervalle maximal en jours")
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args)))
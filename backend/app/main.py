@@ -1,16 +1,63 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.api.api_v1.api import api_router
-from app.core.auth import get_current_user
+from app.core.auth import get_current_active_superuser, get_current_user, user_invalidations
+from app.core.background import background_tasks
+from app.core.conditional import NotModified, not_modified_handler
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.db.mongodb import (
+    close_mongo_connection,
+    check_text_index,
+    connect_to_mongo,
+    init_mongodb,
+    is_pool_ready,
+    pool_monitor,
+    warm_up_pool,
+)
+from app.services import counters, purge, sweeper
+from app.services.due_queue import due_queue
+from app.services.semantic import semantic_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Initialisation et arrêt de l'application.
+    """
+    db = connect_to_mongo()
+    if settings.MONGODB_ENSURE_INDEXES:
+        await init_mongodb()
+    await check_text_index()
+    await warm_up_pool()
+    user_invalidations.start()
+    if settings.PURGE_ENABLED:
+        background_tasks.add("purge", settings.PURGE_INTERVAL_SECONDS, lambda: purge.run_purges(db))
+    background_tasks.add(
+        "note_counters", settings.COUNTERS_RECONCILE_INTERVAL_SECONDS, lambda: counters.reconcile(db)
+    )
+    background_tasks.add(
+        "revision_sweeper", settings.REVISION_SWEEP_INTERVAL_SECONDS, lambda: sweeper.sweep_missed(db)
+    )
+    background_tasks.start()
+    yield
+    await background_tasks.stop()
+    semantic_index.flush()
+    await due_queue.close()
+    await user_invalidations.close()
+    await close_mongo_connection()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API pour l'application StudyHub de prise de notes intelligente",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Configuration CORS
@@ -26,6 +73,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 # Inclusion des routes
@@ -52,9 +100,28 @@ async def readiness_check():
     """
     Endpoint de vérification de disponibilité.
     Utilisé par Kubernetes pour les readiness checks.
+    Prêt tant que MongoDB répond (ping mis en cache quelques secondes).
     """
+    if not await is_pool_ready():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable"},
+        )
     return {"status": "ready"}
 
+@app.get("/metrics/mongodb-pool", tags=["Santé"])
+async def mongodb_pool_metrics(current_user = Depends(get_current_active_superuser)):
+    """
+    Métriques du pool de connexions MongoDB de ce worker
+    (temps d'attente au checkout, connexions utilisées). Réservé aux
+    super-utilisateurs.
+    """
+    return {
+        "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+        **pool_monitor.snapshot(),
+    }
+
 @app.get("/me", tags=["Utilisateur"])
 async def read_current_user(current_user = Depends(get_current_user)):
     """
@@ -72,6 +139,8 @@ async def http_exception_handler(request, exc):
         content={"message": exc.detail},
     )
 
+app.add_exception_handler(NotModified, not_modified_handler)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,9 +1,22 @@
+import re
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 
-from app.db.mongodb import ObjectIdField, PyObjectId
+from app.core.config import settings
+from app.db.mongodb import ObjectIdField, PyObjectId, StrObjectId
+
+
+def build_snippet(content: str, length: int = settings.NOTE_SNIPPET_LENGTH) -> str:
+    """
+    Construit l'aperçu d'une note affiché dans les listes.
+    """
+    text = re.sub(r"\s+", " ", content or "").strip()
+    if len(text) <= length:
+        return text
+    cut = text.rfind(" ", 0, length)
+    return text[:cut if cut > 0 else length].rstrip() + "…"
 
 
 class NoteBase(BaseModel):
@@ -33,6 +46,60 @@ class NoteUpdate(BaseModel):
     tags: Optional[List[str]] = None
     course_id: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    # Version sur laquelle la modification est basée (contrôle de concurrence)
+    version: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_not_null(self):
+        # Seul `course_id` peut être remis à null (note retirée de son cours)
+        nulls = [
+            name for name in ("title", "content", "tags", "metadata")
+            if name in self.model_fields_set and getattr(self, name) is None
+        ]
+        if nulls:
+            raise ValueError(f"Champs non nullables : {', '.join(nulls)}")
+        return self
+
+
+class TextEdit(BaseModel):
+    """
+    Remplace content[start:end] par `text` (positions en caractères dans la
+    version de base).
+    """
+    start: int = Field(..., ge=0)
+    end: int = Field(..., ge=0)
+    text: str = ""
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.end < self.start:
+            raise ValueError("end doit être supérieur ou égal à start")
+        return self
+
+
+class NotePatch(BaseModel):
+    """
+    Sauvegarde incrémentale : éditions appliquées à la version `version`.
+    """
+    version: int = Field(..., ge=1)
+    edits: List[TextEdit] = Field(default_factory=list, max_length=1000)
+    title: Optional[str] = None
+
+
+class NotePatchResponse(BaseModel):
+    """
+    Résultat d'une sauvegarde incrémentale. Si `rebased` est vrai, les
+    éditions ont été rejouées sur une version plus récente que celle du
+    client, qui doit recharger la note.
+    """
+    id: StrObjectId = Field(..., alias="_id")
+    version: int
+    updated_at: datetime
+    rebased: bool = False
+
+    model_config = ConfigDict(
+        populate_by_name=True
+    )
 
 
 class NoteInDB(NoteBase):
@@ -45,6 +112,8 @@ class NoteInDB(NoteBase):
     updated_at: Optional[datetime] = None
     version: int = 1
     is_deleted: bool = False
+    # Aperçu précalculé pour les listes (voir NoteSummary)
+    snippet: str = ""
 
     # Configuration compatible avec Pydantic v2
     model_config = ConfigDict(
@@ -53,12 +122,18 @@ class NoteInDB(NoteBase):
         json_encoders={PyObjectId: str}
     )
 
+    @model_validator(mode="after")
+    def fill_snippet(self):
+        if not self.snippet:
+            self.snippet = build_snippet(self.content)
+        return self
+
 
 class NoteResponse(NoteBase):
     """
     Modèle de réponse pour les informations de note.
     """
-    id: str = Field(..., alias="_id")
+    id: StrObjectId = Field(..., alias="_id")
     creator_id: str
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -70,6 +145,44 @@ class NoteResponse(NoteBase):
     )
 
 
+class NoteSummary(BaseModel):
+    """
+    Modèle allégé pour la liste des notes (sans contenu ni métadonnées).
+    """
+    id: StrObjectId = Field(..., alias="_id")
+    title: str
+    tags: List[str] = []
+    course_id: Optional[str] = None
+    snippet: str = ""
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    version: int
+
+    model_config = ConfigDict(
+        populate_by_name=True
+    )
+
+
+# Projection MongoDB correspondant à NoteSummary ; l'aperçu est recalculé
+# côté serveur pour les notes antérieures au champ `snippet` (vide si leur
+# contenu est compressé, voir db/compress_notes.py)
+NOTE_SUMMARY_PROJECTION = {
+    "title": 1,
+    "tags": 1,
+    "course_id": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "version": 1,
+    "snippet": {
+        "$ifNull": ["$snippet", {"$cond": [
+            {"$eq": [{"$type": "$content"}, "string"]},
+            {"$substrCP": ["$content", 0, settings.NOTE_SNIPPET_LENGTH]},
+            "",
+        ]}]
+    },
+}
+
+
 class NoteWithSummary(NoteResponse):
     """
     Note avec résumé automatique.
@@ -78,6 +191,23 @@ class NoteWithSummary(NoteResponse):
     key_concepts: List[str] = []
 
 
+class RelatedNote(BaseModel):
+    """
+    Note proche d'une autre selon l'index sémantique.
+    """
+    id: str
+    title: str
+    score: float
+
+
+class RelatedNotesRequest(BaseModel):
+    """
+    Requête groupée de notes liées.
+    """
+    note_ids: List[str] = Field(..., max_length=50)
+    k: int = Field(5, ge=1, le=50)
+
+
 class NoteVersion(BaseModel):
     """
     Version d'une note pour l'historique.
@@ -98,6 +228,94 @@ class NoteVersion(BaseModel):
     )
 
 
+class NoteVersionInfo(BaseModel):
+    """
+    Entrée de l'historique d'une note (sans contenu).
+    """
+    version: int
+    title: str
+    kind: str  # 'snapshot', 'diff'
+    created_at: datetime
+    created_by: str
+
+
+class NoteVersionResponse(BaseModel):
+    """
+    Version reconstruite d'une note.
+    """
+    note_id: str
+    version: int
+    title: str
+    content: str
+    created_at: datetime
+    created_by: str
+
+
+class NoteBatchGetRequest(BaseModel):
+    """
+    Récupération groupée de notes par identifiant.
+    """
+    ids: List[str] = Field(..., min_length=1, max_length=settings.NOTE_BATCH_GET_MAX_IDS)
+    # Champs de NoteResponse à renvoyer (tous par défaut) ; `_id` est toujours inclus
+    fields: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.fields is not None:
+            known = {field.alias or name for name, field in NoteResponse.model_fields.items()}
+            unknown = sorted(set(self.fields) - known)
+            if unknown:
+                raise ValueError(f"Champs inconnus : {', '.join(unknown)}")
+        return self
+
+
+class NotePartialResponse(BaseModel):
+    """
+    Champs de NoteResponse, tous facultatifs : une note réduite aux champs
+    demandés (`fields`), les autres étant omis de la réponse.
+    """
+    id: StrObjectId = Field(..., alias="_id")
+    title: Optional[str] = None
+    content: Optional[str] = None
+    tags: Optional[List[str]] = None
+    course_id: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    creator_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    version: Optional[int] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True
+    )
+
+
+class NoteBatchGetResponse(BaseModel):
+    """
+    Notes trouvées dans l'ordre demandé, et identifiants absents ou inaccessibles.
+    """
+    notes: List[NotePartialResponse]
+    not_found: List[str] = []
+
+
+class NoteImportError(BaseModel):
+    """
+    Ligne rejetée lors d'un import NDJSON.
+    """
+    line: int
+    message: str
+
+
+class NoteImportResult(BaseModel):
+    """
+    Bilan d'un import NDJSON (les erreurs au-delà de NOTE_IMPORT_MAX_ERRORS
+    sont seulement comptées).
+    """
+    inserted: int
+    failed: int
+    errors: List[NoteImportError] = []
+
+
 class NoteFilter(BaseModel):
     """
     Filtre pour la recherche de notes.
@@ -110,6 +328,83 @@ class NoteFilter(BaseModel):
     end_date: Optional[datetime] = None
 
 
+class SearchHighlight(BaseModel):
+    """
+    Extrait d'un champ contenant les termes recherchés.
+    `matches` contient les positions [début, fin) des termes dans `fragment`.
+    """
+    field: str
+    fragment: str
+    matches: List[Tuple[int, int]] = []
+
+
+class NoteSearchHit(NoteSummary):
+    """
+    Résultat de recherche : note allégée avec score et extraits.
+    """
+    score: Optional[float] = None
+    highlights: List[SearchHighlight] = []
+
+
+class FacetCount(BaseModel):
+    """
+    Nombre de notes correspondant à une valeur de facette.
+    """
+    value: Optional[str] = None
+    count: int
+
+
+class NoteSearchFacets(BaseModel):
+    """
+    Facettes calculées sur l'ensemble des résultats.
+    """
+    tags: List[FacetCount] = []
+    courses: List[FacetCount] = []
+
+
+class NoteCounts(NoteSearchFacets):
+    """
+    Nombre de notes de l'utilisateur, au total, par tag et par cours.
+    """
+    total: int = 0
+
+
+class AutocompleteSuggestion(BaseModel):
+    """
+    Suggestion d'autocomplétion : titre de note, tag ou nom de cours.
+    """
+    kind: str  # 'title', 'tag', 'course'
+    value: str
+    id: Optional[str] = None  # note ou cours (absent pour un tag)
+
+
+class DuplicateNote(BaseModel):
+    """
+    Note d'un groupe de doublons.
+    """
+    id: str
+    title: str
+    updated_at: Optional[datetime] = None
+
+
+class DuplicateCluster(BaseModel):
+    """
+    Groupe de notes quasi identiques (similarité estimée par MinHash).
+    """
+    similarity: float  # plus faible similarité entre deux notes regroupées
+    notes: List[DuplicateNote]
+
+
+class NoteSearchResponse(BaseModel):
+    """
+    Réponse de la recherche de notes.
+    """
+    results: List[NoteSearchHit]
+    facets: NoteSearchFacets
+    total: int
+    next_cursor: Optional[str] = None
+
+
 class MediaItem(BaseModel):
     """
     Élément multimédia attaché à une note.
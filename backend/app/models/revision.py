@@ -0,0 +1,158 @@
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+
+from app.core.config import settings
+from app.db.mongodb import ObjectIdField, PyObjectId, StrObjectId
+
+
+class MemoryState(BaseModel):
+    """
+    État de mémoire d'une note avant la révision (voir services/scheduler.py).
+    """
+    stability: float  # jours avant que la probabilité de rappel tombe à 90 %
+    difficulty: float  # 1 à 10
+    last_review: datetime
+    reps: int = 0
+    lapses: int = 0
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Les dates sont stockées en UTC sans fuseau
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class RevisionBase(BaseModel):
+    note_id: str
+    scheduled_date: datetime
+    status: str = "pending"  # pending, completed, missed
+    difficulty: Optional[int] = None  # 1-5, plus la valeur est élevée, plus c'était difficile
+
+    _naive_scheduled_date = field_validator("scheduled_date")(naive_utc)
+
+
+class RevisionCreate(RevisionBase):
+    pass
+
+
+class RevisionUpdate(BaseModel):
+    scheduled_date: Optional[datetime] = None
+    # "pending" : remettre à faire une révision manquée ; "missed" est posé par le balayeur
+    status: Optional[Literal["pending", "completed"]] = None
+    difficulty: Optional[int] = Field(None, ge=1, le=5)
+    feedback: Optional[str] = None
+
+    _naive_scheduled_date = field_validator("scheduled_date")(naive_utc)
+
+
+class RevisionInDB(RevisionBase):
+    id: ObjectIdField = Field(default_factory=PyObjectId, alias="_id")
+    user_id: str
+    course_id: Optional[str] = None  # cours de la note, recopié pour le tableau de bord du cours
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+    missed_at: Optional[datetime] = None  # passage au statut 'missed' (voir services/sweeper.py)
+    feedback: Optional[str] = None
+    memory: Optional[MemoryState] = None
+    # Révision terminée dont celle-ci est la suivante (unique)
+    previous_revision_id: Optional[str] = None
+    
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={PyObjectId: str}
+    )
+
+
+class RevisionResponse(RevisionBase):
+    id: StrObjectId = Field(..., alias="_id")
+    user_id: str
+    course_id: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    missed_at: Optional[datetime] = None
+    feedback: Optional[str] = None
+    memory: Optional[MemoryState] = None
+    
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class RescheduleResult(BaseModel):
+    scanned: int
+    rescheduled: int
+
+
+class DueRevisionCount(BaseModel):
+    overdue: int  # date prévue dépassée
+    due: int  # prévues d'ici la fin de la période demandée, `overdue` compris
+
+
+class RevisionStatsSummary(BaseModel):
+    """
+    Statistiques de révision d'une période (voir services/rollups.py).
+    """
+    completed: int = 0
+    missed: int = 0
+    lapses: int = 0  # notes oubliées parmi les révisions terminées
+    late: int = 0  # terminées après avoir été marquées manquées
+    average_difficulty: Optional[float] = None
+    retention: Optional[float] = None  # part des révisions terminées sans oubli
+
+
+class RevisionDayStats(RevisionStatsSummary):
+    day: datetime
+
+
+class CourseRevisionStats(RevisionStatsSummary):
+    course_id: Optional[str] = None  # révisions de notes sans cours
+
+
+class RevisionStats(BaseModel):
+    """
+    Statistiques des N derniers jours (UTC) et séries de jours de révision.
+    """
+    start: datetime
+    end: datetime
+    totals: RevisionStatsSummary
+    days: List[RevisionDayStats]
+    courses: List[CourseRevisionStats]
+    current_streak: int = 0
+    longest_streak: int = 0
+
+
+class RevisionReview(BaseModel):
+    """
+    Révision faite pendant une séance, éventuellement hors ligne.
+    """
+    revision_id: str
+    difficulty: int = Field(..., ge=1, le=5)
+    reviewed_at: Optional[datetime] = None  # par défaut, l'heure de réception
+    feedback: Optional[str] = None
+
+    _naive_reviewed_at = field_validator("reviewed_at")(naive_utc)
+
+
+class RevisionBatchRequest(BaseModel):
+    """
+    Révisions d'une séance (ou file hors ligne) envoyées en une requête.
+    """
+    reviews: List[RevisionReview] = Field(..., min_length=1, max_length=settings.REVISION_BATCH_MAX_ITEMS)
+
+
+class RevisionBatchOutcome(BaseModel):
+    """
+    Résultat d'une révision du lot.
+    """
+    revision_id: str
+    status: str  # 'completed', 'already_completed', 'not_found', 'duplicate', 'invalid'
+    message: Optional[str] = None
+    next_revision_id: Optional[str] = None
+    next_scheduled_date: Optional[datetime] = None
+
+
+class RevisionBatchResponse(BaseModel):
+    completed: int
+    results: List[RevisionBatchOutcome]
@@ -3,7 +3,7 @@ from typing import Optional, Dict, Any
 
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 
-from app.db.mongodb import ObjectIdField, PyObjectId
+from app.db.mongodb import ObjectIdField, PyObjectId, StrObjectId
 
 
 class UserBase(BaseModel):
@@ -56,7 +56,7 @@ class UserResponse(UserBase):
     """
     Modèle de réponse pour les informations utilisateur.
     """
-    id: str = Field(..., alias="_id")
+    id: StrObjectId = Field(..., alias="_id")
     created_at: datetime
     updated_at: Optional[datetime] = None
 
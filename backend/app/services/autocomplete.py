@@ -0,0 +1,238 @@
+"""
+Autocomplétion par préfixe sur les titres de notes, les tags et les noms de cours.
+
+Chaque utilisateur a un index en mémoire : une liste triée de clés
+normalisées (minuscules, sans accents) interrogée par `bisect`, soit
+O(log n + k) par frappe sans requête MongoDB. Un titre est indexé à partir
+de chacun de ses premiers mots, pour que « thermo » trouve « Cours de
+thermodynamique ».
+
+Les index sont construits à la première requête, tenus à jour par les
+écritures de notes et de cours de ce worker, reconstruits après
+AUTOCOMPLETE_MAX_AGE_SECONDS (écritures des autres workers) et évincés selon
+une politique LRU lorsque leur taille estimée dépasse
+AUTOCOMPLETE_MEMORY_BUDGET_MB.
+"""
+import asyncio
+import bisect
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+TITLE = "title"
+TAG = "tag"
+COURSE = "course"
+
+# Un titre est retrouvé à partir de ses N premiers mots
+MAX_WORD_POSITIONS = 8
+
+# Coût mémoire approximatif d'une entrée hors texte (tuple, références, liste)
+_ENTRY_OVERHEAD = 120
+
+# (clé normalisée, type, identifiant)
+Entry = Tuple[str, str, str]
+
+
+def fold(text: str) -> str:
+    """
+    Clé de comparaison : minuscules, sans accents, espaces normalisés.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def _keys(label: str) -> List[str]:
+    words = fold(label).split(" ")
+    return list(dict.fromkeys(" ".join(words[i:]) for i in range(min(len(words), MAX_WORD_POSITIONS)) if words[i]))
+
+
+class PrefixIndex:
+    """
+    Index de préfixes d'un utilisateur.
+    """
+
+    def __init__(self):
+        self.entries: List[Entry] = []
+        self.labels: Dict[Tuple[str, str], str] = {}
+        self.note_tags: Dict[str, List[str]] = {}
+        self.tag_counts: Dict[str, int] = {}
+        self.size = 0
+        self.built_at = time.time()
+        # Pendant la construction, les entrées sont triées une seule fois à la fin
+        self._building = False
+
+    def _add(self, kind: str, ref: str, label: str) -> None:
+        self.labels[(kind, ref)] = label
+        for key in _keys(label):
+            if self._building:
+                self.entries.append((key, kind, ref))
+            else:
+                bisect.insort(self.entries, (key, kind, ref))
+            self.size += sys.getsizeof(key) + _ENTRY_OVERHEAD
+
+    def _remove(self, kind: str, ref: str) -> None:
+        label = self.labels.pop((kind, ref), None)
+        if label is None:
+            return
+        for key in _keys(label):
+            position = bisect.bisect_left(self.entries, (key, kind, ref))
+            if position < len(self.entries) and self.entries[position] == (key, kind, ref):
+                del self.entries[position]
+                self.size -= sys.getsizeof(key) + _ENTRY_OVERHEAD
+
+    @classmethod
+    def build(cls, notes: Iterable[dict], courses: Iterable[dict]) -> "PrefixIndex":
+        index = cls()
+        index._building = True
+        for note in notes:
+            index.set_note(str(note["_id"]), note.get("title"), note.get("tags") or [])
+        for course in courses:
+            index.set_course(str(course["_id"]), course.get("name"))
+        index.entries.sort()
+        index._building = False
+        return index
+
+    def set_note(self, note_id: str, title: Optional[str], tags: Optional[Iterable[str]] = None) -> None:
+        """
+        Indexe (ou réindexe) une note ; `tags=None` conserve ses tags actuels.
+        """
+        if tags is None:
+            tags = self.note_tags.get(note_id, [])
+        self.remove_note(note_id)
+        if title:
+            self._add(TITLE, note_id, title)
+        tags = list(dict.fromkeys(tag for tag in tags if tag))
+        self.note_tags[note_id] = tags
+        for tag in tags:
+            self.tag_counts[tag] = self.tag_counts.get(tag, 0) + 1
+            if self.tag_counts[tag] == 1:
+                self._add(TAG, tag, tag)
+
+    def remove_note(self, note_id: str) -> None:
+        self._remove(TITLE, note_id)
+        for tag in self.note_tags.pop(note_id, []):
+            self.tag_counts[tag] -= 1
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+                self._remove(TAG, tag)
+
+    def set_course(self, course_id: str, name: Optional[str]) -> None:
+        self._remove(COURSE, course_id)
+        if name:
+            self._add(COURSE, course_id, name)
+
+    def remove_course(self, course_id: str) -> None:
+        self._remove(COURSE, course_id)
+
+    def complete(self, prefix: str, limit: int) -> List[Dict[str, Optional[str]]]:
+        """
+        Suggestions dont une clé commence par `prefix`, par ordre alphabétique.
+        """
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        position = bisect.bisect_left(self.entries, (prefix,))
+        while position < len(self.entries) and len(results) < limit:
+            key, kind, ref = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            if (kind, ref) not in seen:
+                seen.add((kind, ref))
+                results.append({
+                    "kind": kind,
+                    "value": self.labels[(kind, ref)],
+                    "id": None if kind == TAG else ref,
+                })
+            position += 1
+        return results
+
+
+class AutocompleteIndex:
+    """
+    Index de préfixes par utilisateur, en LRU sous un budget mémoire.
+    """
+
+    def __init__(self, memory_budget: int, max_age: float):
+        self.memory_budget = memory_budget
+        self.max_age = max_age
+        self._indexes: "OrderedDict[str, PrefixIndex]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def memory_usage(self) -> int:
+        return sum(index.size for index in self._indexes.values())
+
+    def _evict(self) -> None:
+        usage = self.memory_usage
+        # L'index le plus récemment utilisé est toujours conservé
+        while usage > self.memory_budget and len(self._indexes) > 1:
+            _, index = self._indexes.popitem(last=False)
+            usage -= index.size
+
+    def _fresh(self, user_id: str) -> Optional[PrefixIndex]:
+        index = self._indexes.get(user_id)
+        if index is not None and time.time() - index.built_at <= self.max_age:
+            return index
+        return None
+
+    async def _build(self, db, user_id: str) -> PrefixIndex:
+        notes = await db.notes.find(
+            {"creator_id": user_id, "is_deleted": False}, {"title": 1, "tags": 1}
+        ).to_list(None)
+        courses = await db.courses.find({"user_id": user_id, "deleted_at": None}, {"name": 1}).to_list(None)
+        return PrefixIndex.build(notes, courses)
+
+    async def get(self, db, user_id: str) -> PrefixIndex:
+        index = self._fresh(user_id)
+        if index is None:
+            lock = self._locks.setdefault(user_id, asyncio.Lock())
+            async with lock:
+                index = self._fresh(user_id)
+                if index is None:
+                    index = await self._build(db, user_id)
+                    self._indexes[user_id] = index
+            self._locks.pop(user_id, None)
+        self._indexes.move_to_end(user_id)
+        self._evict()
+        return index
+
+    async def complete(self, db, user_id: str, prefix: str, limit: int) -> List[Dict[str, Optional[str]]]:
+        index = await self.get(db, user_id)
+        return index.complete(prefix, limit)
+
+    # Mises à jour : sans effet si l'index de l'utilisateur n'est pas chargé
+
+    def set_note(self, user_id: str, note_id: str, title: Optional[str], tags: Optional[Iterable[str]] = None) -> None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.set_note(note_id, title, tags)
+
+    def remove_note(self, user_id: str, note_id: str) -> None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.remove_note(note_id)
+
+    def set_course(self, user_id: str, course_id: str, name: Optional[str]) -> None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.set_course(course_id, name)
+
+    def remove_course(self, user_id: str, course_id: str) -> None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.remove_course(course_id)
+
+    def invalidate(self, user_id: str) -> None:
+        self._indexes.pop(user_id, None)
+
+
+autocomplete_index = AutocompleteIndex(
+    memory_budget=settings.AUTOCOMPLETE_MEMORY_BUDGET_MB * 1024 * 1024,
+    max_age=settings.AUTOCOMPLETE_MAX_AGE_SECONDS,
+)
@@ -0,0 +1,193 @@
+"""
+Compteurs matérialisés de notes par tag et par cours.
+
+Un document par (utilisateur, type, valeur) dans `note_counters`, incrémenté
+par `$inc` à chaque écriture de note ; la barre latérale les lit en une
+seule requête indexée au lieu d'agréger toutes les notes de l'utilisateur.
+
+Les compteurs peuvent dériver (écriture interrompue, modification directe
+en base) : une réconciliation périodique les recalcule par lots
+d'utilisateurs, en reprenant là où elle s'était arrêtée.
+"""
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DeleteMany, UpdateOne
+
+from app.core.background import WORKER_ID, Throttle, acquire_lease
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TAG = "tag"
+COURSE = "course"
+# Nombre total de notes ; sa présence indique que les compteurs sont
+# initialisés : il n'est créé que par la réconciliation (voir _update)
+TOTAL = "total"
+
+RECONCILE_LEASE = "note_counters_reconcile"
+
+Key = Tuple[str, Optional[str]]
+
+
+def note_keys(note: Optional[Dict[str, Any]]) -> List[Key]:
+    """
+    Compteurs auxquels contribue une note (aucun si absente ou supprimée).
+    """
+    if not note or note.get("is_deleted"):
+        return []
+    keys: List[Key] = [(TOTAL, None)]
+    keys += [(TAG, tag) for tag in dict.fromkeys(note.get("tags") or [])]
+    if note.get("course_id"):
+        keys.append((COURSE, note["course_id"]))
+    return keys
+
+
+def _update(user_id: str, kind: str, value: Optional[str], inc: int) -> UpdateOne:
+    # Tant que le total n'existe pas, les compteurs partiels créés ici sont
+    # remplacés par la première réconciliation (get_counts)
+    return UpdateOne(
+        {"user_id": user_id, "kind": kind, "value": value},
+        {"$inc": {"count": inc}},
+        upsert=kind != TOTAL,
+    )
+
+
+async def apply(db, user_id: str, deltas: Counter) -> None:
+    """
+    Applique des variations de compteurs en un seul `bulk_write`.
+    """
+    requests = [_update(user_id, kind, value, inc) for (kind, value), inc in deltas.items() if inc]
+    if requests:
+        await db.note_counters.bulk_write(requests, ordered=False)
+
+
+def note_deltas(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Counter:
+    deltas = Counter(note_keys(after))
+    deltas.subtract(note_keys(before))
+    return deltas
+
+
+async def record_change(
+    db, user_id: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]
+) -> None:
+    """
+    Répercute la création (before=None), la modification ou la suppression
+    (after=None) d'une note sur les compteurs de son auteur.
+    """
+    await apply(db, user_id, note_deltas(before, after))
+
+
+async def record_bulk(db, user_id: str, notes: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+    """
+    Ajoute (sign=1) ou retire (sign=-1) un lot de notes des compteurs.
+    """
+    deltas = Counter()
+    for note in notes:
+        for key in note_keys(note):
+            deltas[key] += sign
+    await apply(db, user_id, deltas)
+
+
+async def _compute(db, user_id: str) -> Counter:
+    pipeline = [
+        {"$match": {"creator_id": user_id, "is_deleted": False}},
+        {"$project": {"tags": {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}, "course_id": 1}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "tags": [{"$unwind": "$tags"}, {"$group": {"_id": "$tags", "count": {"$sum": 1}}}],
+            "courses": [
+                {"$match": {"course_id": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$course_id", "count": {"$sum": 1}}},
+            ],
+        }},
+    ]
+    facets = (await db.notes.aggregate(pipeline).to_list(1))[0]
+    counts = Counter({(TOTAL, None): facets["total"][0]["count"] if facets["total"] else 0})
+    counts.update({(TAG, f["_id"]): f["count"] for f in facets["tags"]})
+    counts.update({(COURSE, f["_id"]): f["count"] for f in facets["courses"]})
+    return counts
+
+
+async def reconcile_user(db, user_id: str) -> None:
+    """
+    Recalcule les compteurs d'un utilisateur depuis ses notes.
+    """
+    counts = await _compute(db, user_id)
+    requests = [
+        UpdateOne(
+            {"user_id": user_id, "kind": kind, "value": value},
+            {"$set": {"count": count, "reconciled_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        for (kind, value), count in counts.items()
+    ]
+    # Compteurs de tags ou cours qui n'existent plus
+    stale = {"user_id": user_id, "kind": {"$in": [TAG, COURSE]}}
+    keep = [{"kind": kind, "value": value} for kind, value in counts if kind != TOTAL]
+    if keep:
+        stale["$nor"] = keep
+    requests.append(DeleteMany(stale))
+    await db.note_counters.bulk_write(requests, ordered=False)
+
+
+async def get_counts(db, user_id: str) -> Dict[str, Any]:
+    """
+    Compteurs de l'utilisateur, initialisés au premier appel.
+    """
+    docs = await db.note_counters.find(
+        {"user_id": user_id}, {"_id": 0, "kind": 1, "value": 1, "count": 1}
+    ).to_list(None)
+    if not any(doc["kind"] == TOTAL for doc in docs):
+        await reconcile_user(db, user_id)
+        return await get_counts(db, user_id)
+
+    result: Dict[str, Any] = {"total": 0, "tags": [], "courses": []}
+    for doc in docs:
+        if doc["kind"] == TOTAL:
+            result["total"] = max(doc["count"], 0)
+        elif doc["count"] > 0:
+            result["tags" if doc["kind"] == TAG else "courses"].append(
+                {"value": doc["value"], "count": doc["count"]}
+            )
+    for key in ("tags", "courses"):
+        result[key].sort(key=lambda facet: (-facet["count"], facet["value"]))
+    return result
+
+
+async def reconcile(db) -> int:
+    """
+    Passe de réconciliation : un lot de COUNTERS_RECONCILE_BATCH_SIZE
+    utilisateurs par ordre d'_id, à partir du dernier traité (job_state).
+
+    Le bail est renouvelé avant chaque utilisateur, la passe (ralentie par
+    Throttle) pouvant durer plus que COUNTERS_RECONCILE_INTERVAL_SECONDS ;
+    s'il a été perdu, la passe s'arrête sans enregistrer sa progression.
+    """
+    ttl = settings.COUNTERS_RECONCILE_INTERVAL_SECONDS
+    if not await acquire_lease(db, RECONCILE_LEASE, ttl):
+        return 0
+    state = await db.job_state.find_one({"_id": RECONCILE_LEASE}) or {}
+    query = {"deleted_at": None}
+    if state.get("last_user_id") is not None:
+        query["_id"] = {"$gt": state["last_user_id"]}
+    batch_size = settings.COUNTERS_RECONCILE_BATCH_SIZE
+    users = await db.users.find(query, {"_id": 1}).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+
+    throttle = Throttle(settings.BACKGROUND_DUTY_CYCLE)
+    for user in users:
+        if not await acquire_lease(db, RECONCILE_LEASE, ttl):
+            logger.warning("Bail de réconciliation des compteurs perdu, passe interrompue")
+            return 0
+        await reconcile_user(db, str(user["_id"]))
+        await throttle.pause()
+    # Fin de la liste : la passe suivante repart du début
+    last_user_id = users[-1]["_id"] if len(users) == batch_size else None
+    await db.job_state.update_one(
+        {"_id": RECONCILE_LEASE, "lease_owner": WORKER_ID}, {"$set": {"last_user_id": last_user_id}}
+    )
+    if users:
+        logger.info("Compteurs de notes réconciliés pour %d utilisateurs", len(users))
+    return len(users)
@@ -0,0 +1,240 @@
+"""
+Détection des notes quasi identiques (MinHash + LSH).
+
+Le contenu d'une note est découpé en n-grammes de mots normalisés, dont on
+garde la signature MinHash (NUM_PERM minimums de hachages indépendants,
+stockés sur 4 octets chacun) : la proportion de positions égales entre deux
+signatures estime la similarité de Jaccard des deux notes.
+
+Pour ne pas comparer toutes les paires, la signature est découpée en BANDS
+bandes de ROWS lignes, chacune hachée en un entier indexé (`bands`) : deux
+notes ne sont comparées que si elles partagent au moins une bande, ce qui
+arrive presque toujours au-dessus de ~0,7 de similarité et rarement
+en dessous.
+
+Les signatures sont calculées à l'écriture des notes (`record`) et, pour les
+notes existantes, par `python -m app.db.backfill_signatures`.
+"""
+import hashlib
+import random
+import re
+import struct
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import Binary
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.core.config import settings
+from app.db.mongodb import to_object_id
+from app.services.autocomplete import fold
+
+try:
+    import numpy as np
+except ImportError:  # dépendances IA absentes (requirements-minimal.txt)
+    np = None
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Taille des n-grammes de mots
+SHINGLE_SIZE = 3
+
+# Hachages universels h(x) = (a * x + b) mod P sur des hachages de 32 bits :
+# a < 2**31 garantit que a * x + b tient sur 64 bits non signés
+_PRIME = 4294967291  # plus grand nombre premier < 2**32
+_rng = random.Random(0x5eed)
+_A = [_rng.randrange(1, 2 ** 31) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, 2 ** 32) for _ in range(NUM_PERM)]
+if np is not None:
+    _A_VEC = np.array(_A, dtype=np.uint64)
+    _B_VEC = np.array(_B, dtype=np.uint64)
+
+# Nombre de n-grammes traités à la fois (matrice CHUNK x NUM_PERM)
+_CHUNK = 4096
+
+_WORD = re.compile(r"\w+")
+
+
+def _shingle_hashes(text: str) -> List[int]:
+    words = _WORD.findall(fold(text))
+    if len(words) < settings.DEDUP_MIN_WORDS:
+        return []
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+
+
+def signature(text: Optional[str]) -> Optional[bytes]:
+    """
+    Signature MinHash du texte (NUM_PERM entiers de 32 bits, petit-boutiste),
+    ou None si le texte est trop court pour être comparé.
+    """
+    hashes = _shingle_hashes(text or "")
+    if not hashes:
+        return None
+    if np is None:
+        mins = [min((a * x + b) % _PRIME for x in hashes) for a, b in zip(_A, _B)]
+        return struct.pack(f"<{NUM_PERM}I", *mins)
+    values = np.array(hashes, dtype=np.uint64)
+    mins = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    for start in range(0, len(values), _CHUNK):
+        chunk = values[start:start + _CHUNK, None]
+        np.minimum(mins, ((chunk * _A_VEC + _B_VEC) % _PRIME).min(axis=0), out=mins)
+    return mins.astype("<u4").tobytes()
+
+
+def bands(sig: bytes) -> List[int]:
+    """
+    Clés LSH de la signature : une par bande (entier signé de 64 bits).
+    """
+    width = ROWS * 4
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + sig[band * width:(band + 1) * width], digest_size=8).digest(),
+            "little", signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """
+    Similarité de Jaccard estimée entre deux signatures.
+    """
+    if np is None:
+        left, right = struct.unpack(f"<{NUM_PERM}I", a), struct.unpack(f"<{NUM_PERM}I", b)
+        return sum(x == y for x, y in zip(left, right)) / NUM_PERM
+    return float(np.count_nonzero(np.frombuffer(a, "<u4") == np.frombuffer(b, "<u4"))) / NUM_PERM
+
+
+def _signature_update(user_id: str, note_id: str, version: int, sig: Optional[bytes]) -> Tuple[dict, dict]:
+    # Une signature n'est remplacée que par celle d'une version plus récente
+    if sig is None:
+        fields = {"signature": None, "bands": []}
+    else:
+        fields = {"signature": Binary(sig), "bands": bands(sig)}
+    return (
+        {"note_id": note_id, "note_version": {"$lt": version}},
+        {"$set": {**fields, "user_id": user_id, "note_version": version, "updated_at": datetime.utcnow()}},
+    )
+
+
+async def record(db, user_id: str, note_id: str, version: int, content: Optional[str]) -> None:
+    """
+    Enregistre la signature du contenu (déjà décodé) d'une note.
+    """
+    try:
+        await db.note_signatures.update_one(
+            *_signature_update(user_id, note_id, version, signature(content)), upsert=True
+        )
+    except DuplicateKeyError:
+        # Signature d'une version plus récente déjà enregistrée
+        pass
+
+
+async def record_many(db, user_id: str, notes: Iterable[Dict[str, Any]]) -> None:
+    """
+    Enregistre en un seul `bulk_write` les signatures de notes décodées.
+    """
+    requests = [
+        UpdateOne(
+            *_signature_update(user_id, str(note["_id"]), note.get("version", 1), signature(note.get("content"))),
+            upsert=True,
+        )
+        for note in notes
+    ]
+    if not requests:
+        return
+    try:
+        await db.note_signatures.bulk_write(requests, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+
+class _Clusters:
+    """
+    Union-find sur les notes, avec la plus faible similarité de chaque groupe.
+    """
+
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.similarity: Dict[str, float] = {}
+
+    def find(self, note_id: str) -> str:
+        root = self.parent.setdefault(note_id, note_id)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while note_id != root:
+            self.parent[note_id], note_id = root, self.parent[note_id]
+        return root
+
+    def union(self, a: str, b: str, score: float) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        merged = min(score, self.similarity.get(root_a, 1.0), self.similarity.get(root_b, 1.0))
+        self.parent[root_b] = root_a
+        self.similarity.pop(root_b, None)
+        self.similarity[root_a] = merged
+
+
+async def find_clusters(db, user_id: str, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Groupes de notes quasi identiques de l'utilisateur (au moins deux notes
+    dont la similarité estimée dépasse `threshold`), les plus grands d'abord.
+    """
+    threshold = settings.DEDUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    # Candidats : notes partageant au moins une bande, regroupées côté MongoDB
+    buckets = await db.note_signatures.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$unwind": "$bands"},
+        {"$group": {"_id": "$bands", "notes": {"$push": "$note_id"}}},
+        {"$match": {"notes.1": {"$exists": True}}},
+        {"$project": {"_id": 0, "notes": 1}},
+    ]).to_list(None)
+    candidates = {note_id for bucket in buckets for note_id in bucket["notes"]}
+    if not candidates:
+        return []
+
+    notes = {
+        str(note["_id"]): note async for note in db.notes.find(
+            {"_id": {"$in": [to_object_id(i) for i in candidates]}, "creator_id": user_id, "is_deleted": False},
+            {"title": 1, "updated_at": 1, "created_at": 1},
+        )
+    }
+    signatures = {
+        doc["note_id"]: bytes(doc["signature"]) async for doc in db.note_signatures.find(
+            {"note_id": {"$in": list(notes)}, "signature": {"$ne": None}}, {"note_id": 1, "signature": 1}
+        )
+    }
+
+    clusters = _Clusters()
+    for bucket in buckets:
+        members = [note_id for note_id in dict.fromkeys(bucket["notes"]) if note_id in signatures]
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                # Déjà regroupées par une autre bande : comparaison inutile
+                if clusters.find(a) == clusters.find(b):
+                    continue
+                score = similarity(signatures[a], signatures[b])
+                if score >= threshold:
+                    clusters.union(a, b, score)
+
+    groups: Dict[str, List[str]] = {}
+    for note_id in clusters.parent:
+        groups.setdefault(clusters.find(note_id), []).append(note_id)
+    result = []
+    for root, members in groups.items():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda note_id: notes[note_id].get("updated_at") or notes[note_id]["created_at"], reverse=True)
+        result.append({
+            "similarity": round(clusters.similarity[root], 3),
+            "notes": [
+                {"id": note_id, "title": notes[note_id]["title"], "updated_at": notes[note_id].get("updated_at")}
+                for note_id in members
+            ],
+        })
+    result.sort(key=lambda cluster: (-len(cluster["notes"]), -cluster["similarity"]))
+    return result
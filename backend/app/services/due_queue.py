@@ -0,0 +1,374 @@
+"""
+File des révisions à faire (en attente ou manquées), par utilisateur,
+triée par date prévue.
+
+GET /revisions/due est l'endpoint le plus sollicité de l'application mobile :
+il est servi depuis un ensemble trié (date prévue -> révision) et le JSON
+déjà sérialisé de chaque révision, sans requête MongoDB. Les révisions
+« à faire d'ici N jours » sont une lecture par intervalle de score
+(O(log n + k)) et les compteurs un simple comptage par intervalle.
+
+Deux implémentations :
+
+- `RedisQueue` : un ensemble trié et un hash par utilisateur dans Redis
+  (REDIS_URL), partagés par tous les workers ;
+- `MemoryQueue` : listes triées en mémoire (`bisect`), propres à chaque
+  worker, utilisées sans Redis (DUE_QUEUE_BACKEND="memory", tests).
+
+La file d'un utilisateur est chargée depuis MongoDB à la première lecture
+puis tenue à jour par les écritures de révisions ; elle expire après
+DUE_QUEUE_TTL_SECONDS, ce qui borne l'effet d'une mise à jour manquée
+(écriture d'un autre worker en mémoire, erreur Redis). Si Redis est
+indisponible, les lectures repassent par MongoDB.
+
+Chaque mise à jour incrémente une version de la file : un chargement
+n'est appliqué que si la version n'a pas changé depuis la lecture MongoDB,
+sinon il est recommencé (une mise à jour concurrente serait écrasée par un
+état déjà dépassé). Les révisions des notes en corbeille et des cours
+supprimés, conservées jusqu'au passage du purgeur, ne sont pas chargées.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic_core import to_json
+
+from app.core.config import settings
+from app.core.responses import ModelSerializer, _json_fallback
+from app.models.revision import RevisionResponse
+from app.services.scheduler import REVIEWABLE_STATUSES
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError, WatchError
+except ImportError:  # Redis absent (requirements-minimal.txt) : file en mémoire
+    aioredis = None
+    RedisError = WatchError = OSError
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Chargements recommencés après une mise à jour concurrente, avant de lire MongoDB
+LOAD_ATTEMPTS = 3
+
+# (identifiant de révision, score, révision sérialisée en JSON)
+Item = Tuple[str, float, bytes]
+
+
+def score(date: datetime) -> float:
+    return (date - _EPOCH).total_seconds()
+
+
+class MemoryQueue:
+    """
+    Files en mémoire du worker : liste triée de (score, id) et JSON par id.
+    """
+
+    class _UserQueue:
+        def __init__(self, items: Iterable[Item], expires_at: float):
+            self.entries: List[Tuple[float, str]] = sorted((s, revision_id) for revision_id, s, _ in items)
+            self.scores = {revision_id: s for s, revision_id in self.entries}
+            self.payloads = {revision_id: payload for revision_id, _, payload in items}
+            self.expires_at = expires_at
+
+        def remove(self, revision_id: str) -> None:
+            old = self.scores.pop(revision_id, None)
+            self.payloads.pop(revision_id, None)
+            if old is not None:
+                position = bisect.bisect_left(self.entries, (old, revision_id))
+                if position < len(self.entries) and self.entries[position] == (old, revision_id):
+                    del self.entries[position]
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._users: Dict[str, "MemoryQueue._UserQueue"] = {}
+        # Mises à jour reçues pendant un chargement en cours, par utilisateur
+        self._loading: Dict[str, int] = {}
+
+    def _touch(self, user_id: str) -> None:
+        if user_id in self._loading:
+            self._loading[user_id] += 1
+
+    def _queue(self, user_id: str) -> Optional["MemoryQueue._UserQueue"]:
+        queue = self._users.get(user_id)
+        if queue is not None and queue.expires_at < time.monotonic():
+            del self._users[user_id]
+            return None
+        return queue
+
+    async def loaded(self, user_id: str) -> bool:
+        return self._queue(user_id) is not None
+
+    async def version(self, user_id: str) -> int:
+        return self._loading.setdefault(user_id, 0)
+
+    async def load(self, user_id: str, items: List[Item], version: int) -> bool:
+        if self._loading.pop(user_id, None) != version:
+            return False
+        now = time.monotonic()
+        for expired in [u for u, queue in self._users.items() if queue.expires_at < now]:
+            del self._users[expired]
+        self._users[user_id] = self._UserQueue(items, now + self.ttl)
+        return True
+
+    async def add(self, user_id: str, item: Item) -> None:
+        self._touch(user_id)
+        queue = self._queue(user_id)
+        if queue is None:
+            return
+        revision_id, item_score, payload = item
+        queue.remove(revision_id)
+        bisect.insort(queue.entries, (item_score, revision_id))
+        queue.scores[revision_id] = item_score
+        queue.payloads[revision_id] = payload
+
+    async def remove(self, user_id: str, revision_ids: List[str]) -> None:
+        self._touch(user_id)
+        queue = self._queue(user_id)
+        if queue is not None:
+            for revision_id in revision_ids:
+                queue.remove(revision_id)
+
+    async def range(self, user_id: str, max_score: float, limit: int) -> List[bytes]:
+        queue = self._users[user_id]
+        end = min(bisect.bisect_right(queue.entries, (max_score, "￿")), limit)
+        return [queue.payloads[revision_id] for _, revision_id in queue.entries[:end]]
+
+    async def count(self, user_id: str, max_score: float) -> int:
+        return bisect.bisect_right(self._users[user_id].entries, (max_score, "￿"))
+
+    async def invalidate(self, user_id: Optional[str] = None) -> None:
+        if user_id is None:
+            self._users.clear()
+            for loading in self._loading:
+                self._loading[loading] += 1
+        else:
+            self._touch(user_id)
+            self._users.pop(user_id, None)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisQueue:
+    """
+    Files partagées dans Redis : `<prefix>:<user>` (ensemble trié),
+    `<prefix>:<user>:data` (JSON par révision), `<prefix>:<user>:loaded`
+    (marqueur de chargement, expirant avec les deux autres clés) et
+    `<prefix>:<user>:version` (compteur des mises à jour, surveillé par
+    WATCH pendant le chargement).
+    """
+
+    PREFIX = "due"
+
+    def __init__(self, url: str, ttl: int):
+        self.ttl = ttl
+        self.redis = aioredis.from_url(url)
+
+    def _keys(self, user_id: str) -> Tuple[str, str, str, str]:
+        base = f"{self.PREFIX}:{user_id}"
+        return base, f"{base}:data", f"{base}:loaded", f"{base}:version"
+
+    def _bump(self, pipe, version: str) -> None:
+        pipe.incr(version)
+        pipe.expire(version, self.ttl)
+
+    async def loaded(self, user_id: str) -> bool:
+        return bool(await self.redis.exists(self._keys(user_id)[2]))
+
+    async def version(self, user_id: str) -> Optional[bytes]:
+        return await self.redis.get(self._keys(user_id)[3])
+
+    async def load(self, user_id: str, items: List[Item], version: Optional[bytes]) -> bool:
+        zset, data, marker, version_key = self._keys(user_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(version_key)
+                if await pipe.get(version_key) != version:
+                    return False
+                pipe.multi()
+                pipe.delete(zset, data)
+                if items:
+                    pipe.zadd(zset, {revision_id: item_score for revision_id, item_score, _ in items})
+                    pipe.hset(data, mapping={revision_id: payload for revision_id, _, payload in items})
+                    pipe.expire(zset, self.ttl)
+                    pipe.expire(data, self.ttl)
+                pipe.set(marker, 1, ex=self.ttl)
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def add(self, user_id: str, item: Item) -> None:
+        zset, data, marker, version = self._keys(user_id)
+        # Version incrémentée avant de tester le marqueur : un chargement
+        # concurrent est soit déjà écrit (marqueur présent), soit annulé
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._bump(pipe, version)
+            pipe.exists(marker)
+            *_, loaded = await pipe.execute()
+        # Sans marqueur, la file sera rechargée entièrement à la prochaine lecture
+        if not loaded:
+            return
+        revision_id, item_score, payload = item
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(zset, {revision_id: item_score})
+            pipe.hset(data, revision_id, payload)
+            await pipe.execute()
+
+    async def remove(self, user_id: str, revision_ids: List[str]) -> None:
+        if not revision_ids:
+            return
+        zset, data, _, version = self._keys(user_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._bump(pipe, version)
+            pipe.zrem(zset, *revision_ids)
+            pipe.hdel(data, *revision_ids)
+            await pipe.execute()
+
+    async def range(self, user_id: str, max_score: float, limit: int) -> List[bytes]:
+        zset, data, *_ = self._keys(user_id)
+        revision_ids = await self.redis.zrangebyscore(zset, "-inf", max_score, start=0, num=limit)
+        if not revision_ids:
+            return []
+        return [payload for payload in await self.redis.hmget(data, revision_ids) if payload is not None]
+
+    async def count(self, user_id: str, max_score: float) -> int:
+        return await self.redis.zcount(self._keys(user_id)[0], "-inf", max_score)
+
+    async def invalidate(self, user_id: Optional[str] = None) -> None:
+        if user_id is not None:
+            zset, data, marker, version = self._keys(user_id)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                self._bump(pipe, version)
+                pipe.delete(zset, data, marker)
+                await pipe.execute()
+            return
+        async for marker in self.redis.scan_iter(match=f"{self.PREFIX}:*:loaded", count=1000):
+            await self.redis.delete(marker)
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class DueQueue:
+    """
+    Façade des files : chargement depuis MongoDB, sérialisation et repli sur
+    MongoDB si le stockage de la file est indisponible.
+    """
+
+    def __init__(self, backend, fields: Dict[str, int]):
+        self.backend = backend
+        # Champs de la réponse (projection de RevisionResponse)
+        self.fields = fields
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def item(self, revision: Dict[str, Any]) -> Item:
+        payload = {key: revision.get(key) for key in self.fields}
+        payload["_id"] = str(revision["_id"])
+        return payload["_id"], score(revision["scheduled_date"]), to_json(payload, fallback=_json_fallback)
+
+    async def _pending(self, db, user_id: str, until: Optional[datetime] = None) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"user_id": user_id, "status": {"$in": REVIEWABLE_STATUSES}}
+        if until is not None:
+            query["scheduled_date"] = {"$lte": until}
+        # Notes en corbeille et cours supprimés dont le purgeur n'a pas encore
+        # supprimé les révisions
+        trashed = await db.notes.distinct("_id", {"creator_id": user_id, "is_deleted": True})
+        if trashed:
+            query["note_id"] = {"$nin": [str(note_id) for note_id in trashed]}
+        deleted = await db.courses.distinct("_id", {"user_id": user_id, "deleted_at": {"$ne": None}})
+        if deleted:
+            query["course_id"] = {"$nin": [str(course_id) for course_id in deleted]}
+        return query
+
+    async def _ensure_loaded(self, db, user_id: str) -> bool:
+        """
+        Charge la file de l'utilisateur si besoin ; False si des mises à jour
+        concurrentes ont fait échouer chaque tentative.
+        """
+        if await self.backend.loaded(user_id):
+            return True
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        try:
+            async with lock:
+                for _ in range(LOAD_ATTEMPTS):
+                    if await self.backend.loaded(user_id):
+                        return True
+                    version = await self.backend.version(user_id)
+                    revisions = await db.revisions.find(await self._pending(db, user_id), self.fields).to_list(None)
+                    if await self.backend.load(user_id, [self.item(revision) for revision in revisions], version):
+                        return True
+                return False
+        finally:
+            self._locks.pop(user_id, None)
+
+    async def due(self, db, user_id: str, until: datetime, limit: int) -> bytes:
+        """
+        Révisions en attente prévues au plus tard à `until`, par date
+        croissante, sous forme de tableau JSON déjà sérialisé.
+        """
+        try:
+            if await self._ensure_loaded(db, user_id):
+                payloads = await self.backend.range(user_id, score(until), limit)
+                return b"[" + b",".join(payloads) + b"]"
+        except RedisError:
+            logger.warning("File des révisions indisponible, lecture depuis MongoDB", exc_info=True)
+        revisions = await db.revisions.find(await self._pending(db, user_id, until), self.fields).sort(
+            [("scheduled_date", 1), ("_id", 1)]
+        ).limit(limit).to_list(limit)
+        return b"[" + b",".join(self.item(revision)[2] for revision in revisions) + b"]"
+
+    async def count(self, db, user_id: str, until: datetime) -> int:
+        try:
+            if await self._ensure_loaded(db, user_id):
+                return await self.backend.count(user_id, score(until))
+        except RedisError:
+            logger.warning("File des révisions indisponible, comptage depuis MongoDB", exc_info=True)
+        return await db.revisions.count_documents(await self._pending(db, user_id, until))
+
+    # Mises à jour : sans effet si la file de l'utilisateur n'est pas chargée
+
+    async def upsert(self, revision: Dict[str, Any]) -> None:
+        """
+        Répercute l'état d'une révision : présente dans la file si et
+        seulement si elle reste à faire (en attente ou manquée).
+        """
+        try:
+            if revision.get("status") in REVIEWABLE_STATUSES:
+                await self.backend.add(revision["user_id"], self.item(revision))
+            else:
+                await self.backend.remove(revision["user_id"], [str(revision["_id"])])
+        except RedisError:
+            logger.warning("Mise à jour de la file des révisions impossible", exc_info=True)
+
+    async def remove(self, user_id: str, revision_ids: List[str]) -> None:
+        try:
+            await self.backend.remove(user_id, revision_ids)
+        except RedisError:
+            logger.warning("Mise à jour de la file des révisions impossible", exc_info=True)
+
+    async def invalidate(self, user_id: Optional[str] = None) -> None:
+        """
+        Oublie la file d'un utilisateur (ou toutes) : rechargée à la prochaine lecture.
+        """
+        try:
+            await self.backend.invalidate(user_id)
+        except RedisError:
+            logger.warning("Invalidation de la file des révisions impossible", exc_info=True)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_backend():
+    if settings.DUE_QUEUE_BACKEND == "redis" and aioredis is not None and settings.REDIS_URL:
+        return RedisQueue(settings.REDIS_URL, settings.DUE_QUEUE_TTL_SECONDS)
+    return MemoryQueue(settings.DUE_QUEUE_TTL_SECONDS)
+
+
+due_queue = DueQueue(create_backend(), ModelSerializer(RevisionResponse).projection)
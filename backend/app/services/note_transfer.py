@@ -0,0 +1,132 @@
+"""
+Import et export des notes au format NDJSON (une note JSON par ligne).
+
+L'import lit le corps de la requête au fil de l'eau : chaque ligne est
+validée contre NoteCreate, les notes valides sont insérées par lots
+(`insert_many` non ordonné) et un seul lot est en cours d'écriture à la fois,
+ce qui borne la mémoire et ralentit la lecture si MongoDB ne suit pas.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.db import note_codec
+from app.models.note import NoteCreate, NoteInDB
+from app.services import counters, dedup, versioning
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Découpe un flux d'octets en lignes numérotées (à partir de 1).
+
+    Une ligne dépassant `max_line_bytes` est renvoyée comme None sans être
+    conservée en mémoire.
+    """
+    buffer = b""
+    line_no = 0
+    oversized = False
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, None if oversized or len(line) > max_line_bytes else line
+            oversized = False
+        if len(buffer) > max_line_bytes:
+            # Ligne trop longue : on ignore la suite jusqu'au prochain saut de ligne
+            oversized = True
+            buffer = b""
+    if buffer.strip() or oversized:
+        line_no += 1
+        yield line_no, None if oversized else buffer
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc']) or 'note'} : {e['msg']}" for e in error.errors()
+    )
+
+
+class NoteImport:
+    """
+    Import NDJSON des notes d'un utilisateur.
+    """
+
+    def __init__(self, db, user_id: str):
+        self.db = db
+        self.user_id = user_id
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._batch: List[Tuple[int, Dict[str, Any]]] = []
+        self._pending: Optional[asyncio.Task] = None
+
+    def _error(self, line_no: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.NOTE_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line_no, "message": message})
+
+    def _parse(self, line_no: int, line: Optional[bytes]) -> None:
+        if line is None:
+            self._error(line_no, f"Ligne trop longue (> {settings.NOTE_IMPORT_MAX_LINE_BYTES} octets)")
+            return
+        if not line.strip():
+            return
+        try:
+            note = NoteCreate.model_validate_json(line)
+        except ValidationError as e:
+            self._error(line_no, _validation_message(e))
+            return
+        doc = NoteInDB(**note.model_dump(), creator_id=self.user_id).model_dump(by_alias=True)
+        self._batch.append((line_no, doc))
+
+    async def _write(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        docs = [doc for _, doc in batch]
+        failed = set()
+        try:
+            await self.db.notes.insert_many([note_codec.encode_note(doc) for doc in docs], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed.add(error["index"])
+                self._error(batch[error["index"]][0], error.get("errmsg", "Erreur d'écriture"))
+        written = [doc for i, doc in enumerate(docs) if i not in failed]
+        self.inserted += len(written)
+        if written:
+            await counters.record_bulk(self.db, self.user_id, written)
+            await dedup.record_many(self.db, self.user_id, written)
+            await self.db.note_versions.insert_many([
+                versioning.build_version_record(
+                    str(doc["_id"]), 1, doc["title"], doc["content"], self.user_id
+                )
+                for doc in written
+            ], ordered=False)
+
+    async def _flush(self) -> None:
+        # Un seul lot en vol : on attend le précédent avant d'envoyer le suivant
+        if self._pending is not None:
+            await self._pending
+            self._pending = None
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self._pending = asyncio.ensure_future(self._write(batch))
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        async for line_no, line in iter_lines(chunks, settings.NOTE_IMPORT_MAX_LINE_BYTES):
+            self._parse(line_no, line)
+            if len(self._batch) >= settings.NOTE_IMPORT_BATCH_SIZE:
+                await self._flush()
+        await self._flush()
+        if self._pending is not None:
+            await self._pending
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+
+async def import_notes(db, user_id: str, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    """
+    Importe un flux NDJSON de notes et renvoie le bilan (insérées, échecs par ligne).
+    """
+    return await NoteImport(db, user_id).run(chunks)
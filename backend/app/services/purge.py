@@ -0,0 +1,222 @@
+"""
+Suppressions en cascade exécutées en tâche de fond.
+
+Les endpoints de suppression marquent seulement l'entité racine (note,
+cours, utilisateur) et enregistrent une tâche dans `purge_jobs`. Le purgeur
+supprime ensuite les données dépendantes par lots bornés (`bulk_write`),
+en se limitant à une fraction du temps (BACKGROUND_DUTY_CYCLE) pour ne pas
+pénaliser les requêtes.
+
+Reprise après incident : chaque étape sélectionne ce qui reste à supprimer
+et les notes ne sont supprimées qu'après leurs dépendances ; rejouer une
+étape interrompue est donc sans effet de bord. Une tâche est prise sous bail
+(PURGE_LEASE_SECONDS) et reprise par un autre worker si le sien s'arrête.
+
+Les notes restées en corbeille plus de NOTE_TRASH_RETENTION_DAYS jours sont
+purgées de la même façon.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from pymongo import ASCENDING, DeleteOne, ReturnDocument
+
+from app.core.background import WORKER_ID, Throttle, acquire_lease
+from app.core.config import settings
+from app.db.mongodb import to_object_id
+from app.services import counters
+from app.services.due_queue import due_queue
+
+logger = logging.getLogger(__name__)
+
+NOTE = "note"
+COURSE = "course"
+USER = "user"
+
+# Collections rattachées à une note par `note_id`
+NOTE_DEPENDENTS = ("revisions", "shares", "media", "note_versions", "note_signatures")
+
+TRASH_LEASE = "trash_retention"
+
+_NOTE_PROJECTION = {"creator_id": 1, "tags": 1, "course_id": 1, "is_deleted": 1}
+
+
+class Step(NamedTuple):
+    """
+    Étape d'une purge : suppression des documents de `collection` répondant
+    à `filter` ; pour les notes, leurs dépendances sont supprimées d'abord.
+    """
+    collection: str
+    filter: Dict[str, Any]
+
+
+def plan(job: Dict[str, Any]) -> List[Step]:
+    """
+    Étapes de la purge décrite par `job`, dans l'ordre d'exécution.
+    """
+    target_id = job["target_id"]
+    if job["kind"] == NOTE:
+        return [Step("notes", {"_id": to_object_id(target_id)})]
+    if job["kind"] == COURSE:
+        return [
+            Step("notes", {"creator_id": job["user_id"], "course_id": target_id}),
+            Step("courses", {"_id": to_object_id(target_id)}),
+        ]
+    if job["kind"] == USER:
+        return [
+            Step("notes", {"creator_id": target_id}),
+            Step("courses", {"user_id": target_id}),
+            Step("revisions", {"user_id": target_id}),
+            Step("shares", {"source_user_id": target_id}),
+            Step("shares", {"target_user_id": target_id}),
+            Step("note_counters", {"user_id": target_id}),
+            Step("revision_rollups", {"user_id": target_id}),
+            Step("users", {"_id": to_object_id(target_id)}),
+        ]
+    raise ValueError(f"Type de purge inconnu : {job['kind']}")
+
+
+async def enqueue(db, kind: str, target_id: str, user_id: Optional[str] = None) -> None:
+    """
+    Enregistre une purge à exécuter en tâche de fond (idempotent).
+    """
+    await db.purge_jobs.update_one(
+        {"kind": kind, "target_id": target_id, "status": "pending"},
+        {"$setOnInsert": {
+            "user_id": user_id,
+            "created_at": datetime.utcnow(),
+            "step": 0,
+            "deleted": {},
+            "lease_until": None,
+        }},
+        upsert=True,
+    )
+
+
+class Purger:
+    """
+    Exécute les purges par lots de PURGE_BATCH_SIZE documents.
+    """
+
+    def __init__(self, db, batch_size: Optional[int] = None, duty_cycle: Optional[float] = None):
+        self.db = db
+        self.batch_size = batch_size or settings.PURGE_BATCH_SIZE
+        self.throttle = Throttle(duty_cycle or settings.BACKGROUND_DUTY_CYCLE)
+        self.deleted: Dict[str, int] = {}
+
+    async def _delete_batch(self, collection: str, filter_query: Dict[str, Any]) -> int:
+        """
+        Supprime un lot de documents ; renvoie le nombre de documents sélectionnés.
+        """
+        ids = [
+            doc["_id"] for doc in
+            await self.db[collection].find(filter_query, {"_id": 1}).limit(self.batch_size).to_list(self.batch_size)
+        ]
+        if ids:
+            result = await self.db[collection].bulk_write([DeleteOne({"_id": i}) for i in ids], ordered=False)
+            self.deleted[collection] = self.deleted.get(collection, 0) + result.deleted_count
+            await self.throttle.pause()
+        return len(ids)
+
+    async def _delete_all(self, collection: str, filter_query: Dict[str, Any]) -> None:
+        while await self._delete_batch(collection, filter_query):
+            pass
+
+    async def _purge_notes(self, filter_query: Dict[str, Any], on_batch=None) -> None:
+        while True:
+            notes = await self.db.notes.find(filter_query, _NOTE_PROJECTION).sort("_id", ASCENDING).limit(
+                self.batch_size
+            ).to_list(self.batch_size)
+            if not notes:
+                return
+            note_ids = [str(note["_id"]) for note in notes]
+            for collection in NOTE_DEPENDENTS:
+                await self._delete_all(collection, {"note_id": {"$in": note_ids}})
+            for creator_id in {note["creator_id"] for note in notes}:
+                await due_queue.invalidate(creator_id)
+            # Les notes hors corbeille (cours ou compte supprimé) sortent des compteurs
+            live = [note for note in notes if not note.get("is_deleted")]
+            for creator_id in {note["creator_id"] for note in live}:
+                await counters.record_bulk(
+                    self.db, creator_id, [note for note in live if note["creator_id"] == creator_id], sign=-1
+                )
+            await self._delete_all("notes", {"_id": {"$in": [note["_id"] for note in notes]}})
+            if on_batch is not None:
+                await on_batch()
+
+    async def run_step(self, step: Step, on_batch=None) -> None:
+        if step.collection == "notes":
+            await self._purge_notes(step.filter, on_batch)
+        else:
+            await self._delete_all(step.collection, step.filter)
+
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        """
+        Exécute une tâche à partir de son étape courante, en renouvelant son bail.
+        """
+        async def renew():
+            await self.db.purge_jobs.update_one(
+                {"_id": job["_id"], "lease_owner": WORKER_ID},
+                {"$set": {"lease_until": _lease_deadline()}},
+            )
+
+        steps = plan(job)
+        for index in range(job.get("step", 0), len(steps)):
+            await self.run_step(steps[index], renew)
+            # Progression enregistrée : une reprise repart de l'étape suivante
+            progress = {"$set": {"step": index + 1, "lease_until": _lease_deadline()}}
+            if self.deleted:
+                progress["$inc"] = {f"deleted.{name}": count for name, count in self.deleted.items()}
+            await self.db.purge_jobs.update_one({"_id": job["_id"]}, progress)
+            self.deleted = {}
+        await self.db.purge_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "done", "finished_at": datetime.utcnow(), "lease_until": None}},
+        )
+
+
+def _lease_deadline() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.PURGE_LEASE_SECONDS)
+
+
+async def claim_job(db) -> Optional[Dict[str, Any]]:
+    """
+    Prend sous bail la plus ancienne tâche en attente libre (ou abandonnée).
+    """
+    now = datetime.utcnow()
+    return await db.purge_jobs.find_one_and_update(
+        {"status": "pending", "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+        {"$set": {"lease_owner": WORKER_ID, "lease_until": _lease_deadline()}},
+        sort=[("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def purge_expired_trash(db) -> int:
+    """
+    Purge les notes en corbeille depuis plus de NOTE_TRASH_RETENTION_DAYS jours.
+    """
+    if not await acquire_lease(db, TRASH_LEASE, settings.PURGE_LEASE_SECONDS):
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=settings.NOTE_TRASH_RETENTION_DAYS)
+    purger = Purger(db)
+    await purger.run_step(
+        Step("notes", {"is_deleted": True, "deleted_at": {"$lt": cutoff}}),
+        on_batch=lambda: acquire_lease(db, TRASH_LEASE, settings.PURGE_LEASE_SECONDS),
+    )
+    return purger.deleted.get("notes", 0)
+
+
+async def run_purges(db) -> None:
+    """
+    Passe du purgeur : tâches en attente puis corbeille expirée.
+    """
+    while True:
+        job = await claim_job(db)
+        if job is None:
+            break
+        await Purger(db).run_job(job)
+        logger.info("Purge %s %s terminée", job["kind"], job["target_id"])
+    trashed = await purge_expired_trash(db)
+    if trashed:
+        logger.info("%d notes expirées purgées de la corbeille", trashed)
@@ -0,0 +1,216 @@
+"""
+Statistiques de révision agrégées par jour, utilisateur et cours.
+
+Un document par (utilisateur, cours, jour UTC) dans `revision_rollups`,
+incrémenté par `$inc` quand une révision est terminée ou marquée manquée ;
+GET /revisions/stats additionne ces documents (au plus quelques centaines)
+au lieu d'agréger toutes les révisions de l'utilisateur. Les totaux de
+l'utilisateur sont la somme de ses cours.
+
+Compteurs d'un jour :
+
+- `completed` : révisions terminées ce jour-là (`completed_at`) ;
+- `lapses` : parmi elles, notes oubliées (rétention = 1 - lapses / completed) ;
+- `late` : parmi elles, révisions terminées après avoir été marquées manquées ;
+- `rated`, `difficulty_sum` : difficulté moyenne des révisions notées ;
+- `missed` : révisions marquées manquées, comptées au jour de leur date prévue.
+
+L'historique antérieur (ou des compteurs ayant dérivé) est recalculé depuis
+les révisions par `rebuild_user` (voir db/backfill_rollups.py).
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteMany, UpdateOne
+
+from app.services import scheduler
+
+# Notes de difficulté correspondant à une note oubliée
+LAPSE_RATINGS = tuple(rating for rating, grade in scheduler.GRADES.items() if grade == scheduler.AGAIN)
+
+FIELDS = ("completed", "lapses", "late", "rated", "difficulty_sum", "missed")
+
+# (utilisateur, cours, jour)
+Key = Tuple[str, Optional[str], datetime]
+
+
+def day_of(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def completion_counts(revision: Dict[str, Any]) -> Counter:
+    """
+    Compteurs d'une révision terminée (`difficulty`, `completed_at` renseignés).
+    """
+    counts = Counter(completed=1)
+    difficulty = revision.get("difficulty")
+    if difficulty is not None:
+        counts.update(rated=1, difficulty_sum=difficulty, lapses=int(difficulty in LAPSE_RATINGS))
+    if revision.get("missed_at") is not None:
+        counts["late"] += 1
+    return counts
+
+
+async def apply(db, deltas: Dict[Key, Counter]) -> None:
+    """
+    Applique des variations de compteurs en un seul `bulk_write`.
+    """
+    requests = [
+        UpdateOne(
+            {"user_id": user_id, "course_id": course_id, "day": day},
+            {"$inc": {field: value for field, value in counts.items() if value}},
+            upsert=True,
+        )
+        for (user_id, course_id, day), counts in deltas.items()
+        if any(counts.values())
+    ]
+    if requests:
+        await db.revision_rollups.bulk_write(requests, ordered=False)
+
+
+async def record_completed(db, revisions: Iterable[Dict[str, Any]]) -> None:
+    """
+    Ajoute des révisions qui viennent d'être terminées aux statistiques.
+    """
+    deltas: Dict[Key, Counter] = {}
+    for revision in revisions:
+        key = (revision["user_id"], revision.get("course_id"), day_of(revision["completed_at"]))
+        deltas.setdefault(key, Counter()).update(completion_counts(revision))
+    await apply(db, deltas)
+
+
+async def record_missed(db, revisions: Iterable[Dict[str, Any]]) -> None:
+    """
+    Ajoute des révisions qui viennent d'être marquées manquées aux statistiques.
+    """
+    deltas: Dict[Key, Counter] = {}
+    for revision in revisions:
+        key = (revision["user_id"], revision.get("course_id"), day_of(revision["scheduled_date"]))
+        deltas.setdefault(key, Counter())["missed"] += 1
+    await apply(db, deltas)
+
+
+def _day_expression(field: str) -> Dict[str, Any]:
+    return {"$dateFromParts": {
+        "year": {"$year": field}, "month": {"$month": field}, "day": {"$dayOfMonth": field},
+    }}
+
+
+async def _compute(db, user_id: str) -> Dict[Key, Counter]:
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "completed": [
+                {"$match": {"status": "completed", "completed_at": {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"course_id": "$course_id", "day": _day_expression("$completed_at")},
+                    "completed": {"$sum": 1},
+                    "lapses": {"$sum": {"$cond": [{"$in": ["$difficulty", list(LAPSE_RATINGS)]}, 1, 0]}},
+                    "late": {"$sum": {"$cond": [{"$gt": ["$missed_at", None]}, 1, 0]}},
+                    "rated": {"$sum": {"$cond": [{"$gt": ["$difficulty", None]}, 1, 0]}},
+                    "difficulty_sum": {"$sum": "$difficulty"},
+                }},
+            ],
+            "missed": [
+                {"$match": {"missed_at": {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"course_id": "$course_id", "day": _day_expression("$scheduled_date")},
+                    "missed": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]
+    facets = (await db.revisions.aggregate(pipeline).to_list(1))[0]
+    counts: Dict[Key, Counter] = {}
+    for group in facets["completed"] + facets["missed"]:
+        key = (user_id, group["_id"].get("course_id"), group["_id"]["day"])
+        counts.setdefault(key, Counter()).update({field: group[field] for field in FIELDS if field in group})
+    return counts
+
+
+async def rebuild_user(db, user_id: str) -> int:
+    """
+    Recalcule les statistiques d'un utilisateur depuis ses révisions ;
+    renvoie le nombre de jours (par cours) écrits.
+    """
+    counts = await _compute(db, user_id)
+    now = datetime.utcnow()
+    requests = [
+        UpdateOne(
+            {"user_id": user_id, "course_id": course_id, "day": day},
+            {"$set": {**{field: values[field] for field in FIELDS}, "rebuilt_at": now}},
+            upsert=True,
+        )
+        for (_, course_id, day), values in counts.items()
+    ]
+    # Jours sans révision restante (révisions supprimées depuis), après les mises à jour
+    requests.append(DeleteMany({"user_id": user_id, "rebuilt_at": {"$ne": now}}))
+    await db.revision_rollups.bulk_write(requests)
+    return len(counts)
+
+
+def _summary(counts: Counter) -> Dict[str, Any]:
+    completed = counts["completed"]
+    return {
+        "completed": completed,
+        "missed": counts["missed"],
+        "lapses": counts["lapses"],
+        "late": counts["late"],
+        "average_difficulty": counts["difficulty_sum"] / counts["rated"] if counts["rated"] else None,
+        "retention": 1 - counts["lapses"] / completed if completed else None,
+    }
+
+
+def _streaks(days: List[datetime], today: datetime) -> Tuple[int, int]:
+    """
+    Série en cours (jusqu'à aujourd'hui ou hier) et plus longue série de
+    jours consécutifs avec au moins une révision ; `days` est trié.
+    """
+    longest = run = 0
+    previous = None
+    for day in days:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous is not None and today - previous <= timedelta(days=1) else 0
+    return current, longest
+
+
+async def get_stats(db, user_id: str, days: int, course_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Statistiques des `days` derniers jours (aujourd'hui compris), par jour et
+    par cours, et séries de jours de révision sur tout l'historique.
+    """
+    today = day_of(datetime.utcnow())
+    start = today - timedelta(days=days - 1)
+    query: Dict[str, Any] = {"user_id": user_id}
+    if course_id is not None:
+        query["course_id"] = course_id
+
+    by_day = {start + timedelta(days=i): Counter() for i in range(days)}
+    by_course: Dict[Optional[str], Counter] = {}
+    totals = Counter()
+    async for doc in db.revision_rollups.find(
+        {**query, "day": {"$gte": start}}, {"_id": 0, "course_id": 1, "day": 1, **{field: 1 for field in FIELDS}}
+    ):
+        values = {field: doc.get(field, 0) for field in FIELDS}
+        if doc["day"] in by_day:
+            by_day[doc["day"]].update(values)
+        by_course.setdefault(doc.get("course_id"), Counter()).update(values)
+        totals.update(values)
+
+    active_days = await db.revision_rollups.distinct("day", {**query, "completed": {"$gt": 0}})
+    current_streak, longest_streak = _streaks(sorted(active_days), today)
+
+    courses = [{"course_id": course, **_summary(counts)} for course, counts in by_course.items()]
+    courses.sort(key=lambda course: (-course["completed"], course["course_id"] or ""))
+    return {
+        "start": start,
+        "end": today,
+        "totals": _summary(totals),
+        "days": [{"day": day, **_summary(counts)} for day, counts in by_day.items()],
+        "courses": courses,
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+    }
@@ -0,0 +1,235 @@
+"""
+Planification des révisions par répétition espacée (modèle FSRS).
+
+Chaque note suivie a un état de mémoire porté par sa révision en attente :
+stabilité S (en jours, délai au bout duquel la probabilité de se souvenir
+tombe à 90 %) et difficulté D (1 à 10). À chaque révision terminée, la note
+donnée par l'étudiant (`difficulty`, 1 facile à 5 oubliée) met à jour S et D,
+puis la révision suivante est planifiée à l'intervalle où la probabilité de
+rappel atteint REVISION_DESIRED_RETENTION.
+
+`reschedule` replanifie en NumPy toutes les révisions en attente à partir
+de leur état (par exemple après un changement de la rétention visée).
+"""
+import asyncio
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.models.revision import RevisionInDB
+
+try:
+    import numpy as np
+except ImportError:  # dépendances IA absentes (requirements-minimal.txt)
+    np = None
+
+# Poids par défaut de FSRS-4.5
+WEIGHTS = (
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+)
+DECAY = -0.5
+FACTOR = 0.9 ** (1 / DECAY) - 1  # R(S, S) = 0.9
+
+AGAIN, HARD, GOOD, EASY = 1, 2, 3, 4
+# `difficulty` d'une révision (1 facile ... 5 oubliée) -> note FSRS
+GRADES = {1: EASY, 2: GOOD, 3: GOOD, 4: HARD, 5: AGAIN}
+
+# Première révision d'une note, avant tout état de mémoire
+FIRST_REVIEW_DELAY = timedelta(days=1)
+
+# Révisions pouvant être terminées : une révision manquée peut encore être
+# faite (révision hors ligne envoyée en retard, par exemple)
+REVIEWABLE_STATUSES = ("pending", "missed")
+
+
+def retrievability(elapsed_days, stability):
+    """
+    Probabilité de se souvenir après `elapsed_days` jours.
+    """
+    return (1 + FACTOR * elapsed_days / stability) ** DECAY
+
+
+def initial_difficulty(grade: int) -> float:
+    return min(max(WEIGHTS[4] - (grade - 3) * WEIGHTS[5], 1.0), 10.0)
+
+
+def next_difficulty(difficulty: float, grade: int) -> float:
+    updated = difficulty - WEIGHTS[6] * (grade - 3)
+    # Retour progressif vers la difficulté initiale d'une note « bien »
+    return min(max(WEIGHTS[7] * initial_difficulty(GOOD) + (1 - WEIGHTS[7]) * updated, 1.0), 10.0)
+
+
+def next_stability(stability: float, difficulty: float, recall: float, grade: int) -> float:
+    if grade == AGAIN:
+        forgotten = (
+            WEIGHTS[11] * difficulty ** -WEIGHTS[12] * ((stability + 1) ** WEIGHTS[13] - 1)
+            * math.exp(WEIGHTS[14] * (1 - recall))
+        )
+        return min(forgotten, stability)
+    growth = (
+        math.exp(WEIGHTS[8]) * (11 - difficulty) * stability ** -WEIGHTS[9]
+        * (math.exp(WEIGHTS[10] * (1 - recall)) - 1)
+    )
+    if grade == HARD:
+        growth *= WEIGHTS[15]
+    elif grade == EASY:
+        growth *= WEIGHTS[16]
+    return stability * (1 + growth)
+
+
+def next_interval(stability, retention: Optional[float] = None, max_days: Optional[int] = None):
+    """
+    Intervalle (jours entiers, au moins 1) au bout duquel la probabilité de
+    rappel descend à `retention` ; `stability` peut être un tableau NumPy.
+    """
+    retention = retention or settings.REVISION_DESIRED_RETENTION
+    max_days = max_days or settings.REVISION_MAX_INTERVAL_DAYS
+    days = stability / FACTOR * (retention ** (1 / DECAY) - 1)
+    if np is not None and isinstance(days, np.ndarray):
+        return np.clip(np.rint(days), 1, max_days)
+    return min(max(round(days), 1), max_days)
+
+
+def review(memory: Optional[Dict[str, Any]], rating: int, now: datetime) -> Dict[str, Any]:
+    """
+    Nouvel état de mémoire après une révision notée `rating` (1 à 5).
+    """
+    grade = GRADES[rating]
+    if not memory:
+        return {
+            "stability": WEIGHTS[grade - 1],
+            "difficulty": initial_difficulty(grade),
+            "last_review": now,
+            "reps": 1,
+            "lapses": 0,
+        }
+    elapsed = max((now - memory["last_review"]).total_seconds() / 86400, 0)
+    recall = retrievability(elapsed, memory["stability"])
+    return {
+        "stability": max(next_stability(memory["stability"], memory["difficulty"], recall, grade), 0.01),
+        "difficulty": next_difficulty(memory["difficulty"], grade),
+        "last_review": now,
+        "reps": memory.get("reps", 0) + 1,
+        "lapses": memory.get("lapses", 0) + (grade == AGAIN),
+    }
+
+
+def next_review_date(memory: Dict[str, Any]) -> datetime:
+    return memory["last_review"] + timedelta(days=int(next_interval(memory["stability"])))
+
+
+def follow_up(revision: Dict[str, Any], rating: int, reviewed_at: datetime) -> Dict[str, Any]:
+    """
+    Révision suivante (document à insérer) d'une révision terminée à
+    `reviewed_at` avec la difficulté ressentie `rating`.
+    """
+    memory = review(revision.get("memory"), rating, reviewed_at)
+    return RevisionInDB(
+        note_id=revision["note_id"],
+        scheduled_date=next_review_date(memory),
+        user_id=revision["user_id"],
+        course_id=revision.get("course_id"),
+        memory=memory,
+        previous_revision_id=str(revision["_id"]),
+    ).model_dump(by_alias=True)
+
+
+def follow_up_upsert(next_revision: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Filtre et mise à jour (à appliquer avec upsert=True) insérant la révision
+    suivante une seule fois : rejouer une révision terminée est sans effet.
+    """
+    return (
+        {"previous_revision_id": next_revision["previous_revision_id"]},
+        {"$setOnInsert": next_revision},
+    )
+
+
+@dataclass
+class RescheduleStats:
+    scanned: int = 0
+    rescheduled: int = 0
+
+
+async def reschedule(
+    db,
+    user_id: Optional[str] = None,
+    retention: Optional[float] = None,
+    max_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> RescheduleStats:
+    """
+    Replanifie les révisions en attente (d'un utilisateur ou de tous) à partir
+    de leur état de mémoire, par exemple après un changement de
+    REVISION_DESIRED_RETENTION.
+
+    Les dates sont calculées par lots en NumPy et écrites par `bulk_write`,
+    un lot en cours d'écriture pendant la lecture du suivant. Une révision
+    n'est jamais avancée avant sa date actuelle si celle-ci est passée, ni
+    avant maintenant sinon : elle resterait en attente hors de la fenêtre du
+    balayeur (services/sweeper.py). Relancer l'opération est sans effet.
+    """
+    if np is None:
+        raise RuntimeError("NumPy est requis pour la replanification groupée")
+    batch_size = batch_size or settings.REVISION_RESCHEDULE_BATCH_SIZE
+    query: Dict[str, Any] = {"status": "pending", "memory.stability": {"$gt": 0}}
+    if user_id is not None:
+        query["user_id"] = user_id
+    cursor = db.revisions.find(
+        query, {"scheduled_date": 1, "memory.stability": 1, "memory.last_review": 1}
+    ).batch_size(batch_size)
+    now = datetime.utcnow()
+
+    stats = RescheduleStats()
+    pending: Optional[asyncio.Task] = None
+
+    async def write(requests):
+        result = await db.revisions.bulk_write(requests, ordered=False)
+        stats.rescheduled += result.modified_count
+
+    async def flush(batch):
+        nonlocal pending
+        stats.scanned += len(batch)
+        requests = _reschedule_batch(batch, retention, max_days, now)
+        # Un seul lot en vol : on attend le précédent avant d'envoyer le suivant
+        if pending is not None:
+            await pending
+            pending = None
+        if requests:
+            pending = asyncio.ensure_future(write(requests))
+
+    batch = []
+    async for revision in cursor:
+        batch.append(revision)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    if pending is not None:
+        await pending
+    return stats
+
+
+def _reschedule_batch(batch, retention: Optional[float], max_days: Optional[int], now: datetime):
+    stability = np.fromiter((r["memory"]["stability"] for r in batch), dtype=np.float64, count=len(batch))
+    last_review = np.array([r["memory"]["last_review"] for r in batch], dtype="datetime64[ms]")
+    scheduled = np.array([r["scheduled_date"] for r in batch], dtype="datetime64[ms]")
+    days = next_interval(stability, retention, max_days).astype(np.int64)
+    dates = last_review + days.astype("timedelta64[D]")
+    # Au plus tôt maintenant, ou la date actuelle si elle est déjà passée
+    dates = np.maximum(dates, np.minimum(scheduled, np.datetime64(now, "ms")))
+    changed = np.flatnonzero(dates != scheduled)
+    new_dates = dates[changed].astype(object)
+    return [
+        UpdateOne(
+            {"_id": batch[i]["_id"], "status": "pending"},
+            {"$set": {"scheduled_date": date}},
+        )
+        for i, date in zip(changed.tolist(), new_dates)
+    ]
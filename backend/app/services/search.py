@@ -0,0 +1,200 @@
+"""
+Recherche plein texte des notes.
+
+Une seule agrégation renvoie la page de résultats classés par pertinence
+(score `$text`), le nombre total de résultats et les facettes par tag et
+par cours. Les documents sont réduits aux champs des résultats avant le
+`$facet` (limite mémoire de l'agrégation) ; le contenu, nécessaire aux
+extraits surlignés, n'est relu que pour la page renvoyée. Les extraits sont
+calculés en Python.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+from app.core.config import settings
+from app.core.pagination import encode_cursor, keyset_filter
+from app.db import note_codec
+from app.models.note import NoteFilter
+
+# Champs renvoyés pour chaque résultat (voir NoteSearchHit)
+_HIT_PROJECTION = {
+    "title": 1,
+    "tags": 1,
+    "course_id": 1,
+    "snippet": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "version": 1,
+}
+
+_FRAGMENT_LENGTH = 160
+
+
+def build_match(user_id: str, filters: NoteFilter) -> Dict[str, Any]:
+    """
+    Construit le filtre de recherche. L'égalité sur `creator_id` est requise
+    par l'index texte, dont c'est le préfixe.
+    """
+    match: Dict[str, Any] = {"creator_id": user_id, "is_deleted": False}
+    if filters.text:
+        match["$text"] = {"$search": filters.text}
+    if filters.tags:
+        match["tags"] = {"$all": filters.tags}
+    if filters.course_id:
+        match["course_id"] = filters.course_id
+    if filters.start_date or filters.end_date:
+        match["created_at"] = {}
+        if filters.start_date:
+            match["created_at"]["$gte"] = filters.start_date
+        if filters.end_date:
+            match["created_at"]["$lte"] = filters.end_date
+    return match
+
+
+def build_pipeline(
+    user_id: str, filters: NoteFilter, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Construit l'agrégation de recherche et renvoie (pipeline, clé de tri).
+    """
+    has_text = bool(filters.text)
+    sort_field = "score" if has_text else "created_at"
+
+    pipeline: List[Dict[str, Any]] = [{"$match": build_match(user_id, filters)}]
+    projection: Dict[str, Any] = dict(_HIT_PROJECTION)
+    if has_text:
+        projection["score"] = {"$meta": "textScore"}
+    pipeline.append({"$project": projection})
+
+    results: List[Dict[str, Any]] = []
+    if cursor:
+        results.append({"$match": keyset_filter(sort_field, DESCENDING, cursor)})
+    results += [
+        {"$sort": {sort_field: DESCENDING, "_id": DESCENDING}},
+        {"$limit": limit + 1},
+    ]
+    if has_text:
+        # Le contenu n'est nécessaire que pour surligner les termes recherchés
+        results += [
+            {"$lookup": {"from": "notes", "localField": "_id", "foreignField": "_id", "as": "note"}},
+            {"$addFields": {"content": {"$arrayElemAt": ["$note.content", 0]}}},
+            {"$project": {"note": 0}},
+        ]
+
+    facet_limit = settings.SEARCH_FACET_LIMIT
+    pipeline.append({
+        "$facet": {
+            "results": results,
+            "total": [{"$count": "count"}],
+            "tags": [
+                {"$unwind": "$tags"},
+                {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                {"$sort": {"count": DESCENDING, "_id": 1}},
+                {"$limit": facet_limit},
+            ],
+            "courses": [
+                {"$group": {"_id": "$course_id", "count": {"$sum": 1}}},
+                {"$sort": {"count": DESCENDING, "_id": 1}},
+                {"$limit": facet_limit},
+            ],
+        }
+    })
+    return pipeline, sort_field
+
+
+def _fold(text: str) -> str:
+    """
+    Minuscules sans accents, en conservant une correspondance caractère
+    par caractère avec le texte d'origine (positions inchangées).
+    """
+    return "".join(unicodedata.normalize("NFKD", c)[0].lower() if c.strip() else c for c in text)
+
+
+def query_terms(text: str) -> List[str]:
+    """
+    Extrait les termes et phrases positifs d'une requête `$text`.
+    """
+    phrases = re.findall(r'"([^"]+)"', text)
+    words = [w for w in re.sub(r'"[^"]*"', " ", text).split() if not w.startswith("-")]
+    return [_fold(term) for term in phrases + words if term.strip()]
+
+
+def _term_pattern(terms: List[str]) -> Optional[re.Pattern]:
+    """
+    Motif approchant la racinisation de MongoDB : un terme long correspond
+    aux mots commençant par son radical.
+    """
+    parts = []
+    for term in terms:
+        if " " in term:
+            parts.append(re.escape(term))
+        else:
+            stem = term[:max(len(term) - 2, 4)] if len(term) > 5 else term
+            parts.append(re.escape(stem) + r"\w*")
+    if not parts:
+        return None
+    return re.compile(r"\b(?:" + "|".join(parts) + r")")
+
+
+def highlight(field: str, text: str, pattern: re.Pattern) -> Optional[Dict[str, Any]]:
+    """
+    Renvoie un extrait de `text` centré sur la première occurrence des termes.
+    """
+    folded = _fold(text)
+    first = pattern.search(folded)
+    if first is None:
+        return None
+    start = 0
+    if len(text) > _FRAGMENT_LENGTH:
+        start = max(0, first.start() - _FRAGMENT_LENGTH // 4)
+        # Commencer l'extrait sur une frontière de mot
+        space = text.find(" ", start)
+        if start and 0 <= space < first.start():
+            start = space + 1
+    end = min(len(text), start + _FRAGMENT_LENGTH)
+    matches = [
+        (m.start() - start, min(m.end(), end) - start)
+        for m in pattern.finditer(folded, start, end)
+    ]
+    return {"field": field, "fragment": text[start:end], "matches": matches}
+
+
+async def search_notes(
+    db, user_id: str, filters: NoteFilter, limit: int, cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Exécute la recherche en un seul aller-retour et met en forme la réponse.
+    """
+    pipeline, sort_field = build_pipeline(user_id, filters, limit, cursor)
+    facets = (await db.notes.aggregate(pipeline).to_list(1))[0]
+
+    hits = facets["results"]
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1], sort_field)
+
+    pattern = _term_pattern(query_terms(filters.text)) if filters.text else None
+    for hit in hits:
+        content = note_codec.decode_content(hit.pop("content", None))
+        hit["highlights"] = []
+        if pattern is None:
+            continue
+        for field, value in (("title", hit.get("title")), ("content", content)):
+            fragment = highlight(field, value or "", pattern)
+            if fragment:
+                hit["highlights"].append(fragment)
+
+    total = facets["total"][0]["count"] if facets["total"] else 0
+    return {
+        "results": hits,
+        "facets": {
+            "tags": [{"value": f["_id"], "count": f["count"]} for f in facets["tags"]],
+            "courses": [{"value": f["_id"], "count": f["count"]} for f in facets["courses"]],
+        },
+        "total": total,
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,344 @@
+"""
+Index sémantique local des notes (« notes liées »).
+
+Les notes d'un utilisateur sont vectorisées localement (hachage + TF-IDF +
+SVD tronquée) dans une matrice NumPy contiguë aux lignes normalisées : la
+similarité cosinus se réduit à un produit matriciel. L'index est construit à
+la demande, mis à jour incrémentalement lors des écritures du worker, et
+sauvegardé sur disque pour être rechargé en mémoire mappée au démarrage.
+
+Chaque worker possède ses propres index ; les écritures faites par les autres
+workers sont prises en compte à la reconstruction suivante
+(SEMANTIC_INDEX_MAX_AGE_SECONDS).
+"""
+import asyncio
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db import note_codec
+
+try:
+    import numpy as np
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+except ImportError:  # dépendances IA absentes (requirements-minimal.txt)
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# En dessous de ce nombre de notes, la SVD n'a pas de sens
+MIN_NOTES = 3
+
+_vectorizer = (
+    HashingVectorizer(n_features=2 ** 18, alternate_sign=False, norm=None, strip_accents="unicode")
+    if np is not None else None
+)
+
+
+def note_text(note: dict) -> str:
+    return f"{note.get('title') or ''}\n{note.get('content') or ''}"
+
+
+class UserIndex:
+    """
+    Index d'un utilisateur : matrice (n, dim) float32 + identifiants des notes.
+    """
+
+    def __init__(self, tfidf, svd, ids: List[str], vectors, built_at: float):
+        self.tfidf = tfidf
+        self.svd = svd
+        self.ids = list(ids)
+        self.positions = {note_id: i for i, note_id in enumerate(self.ids)}
+        self.matrix = vectors
+        self.size = len(self.ids)
+        self.built_at = built_at
+        self.changes = 0
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def fitted(self) -> bool:
+        return self.svd is not None
+
+    @classmethod
+    def build(cls, notes: Sequence[Tuple[str, str]]) -> "UserIndex":
+        """
+        Ajuste le modèle sur les notes (id, texte) et calcule leurs vecteurs.
+        """
+        if len(notes) < MIN_NOTES:
+            # Index vide : reconstruit dès la prochaine écriture
+            return cls(None, None, [], np.zeros((0, 0), dtype=np.float32), time.time())
+        counts = _vectorizer.transform([text for _, text in notes])
+        tfidf = TfidfTransformer(sublinear_tf=True).fit(counts)
+        weighted = tfidf.transform(counts)
+        svd = TruncatedSVD(
+            n_components=min(settings.SEMANTIC_INDEX_DIM, len(notes) - 1), random_state=0
+        ).fit(weighted)
+        vectors = _normalize(svd.transform(weighted))
+        return cls(tfidf, svd, [note_id for note_id, _ in notes], vectors, time.time())
+
+    def embed(self, texts: Sequence[str]):
+        weighted = self.tfidf.transform(_vectorizer.transform(list(texts)))
+        return _normalize(self.svd.transform(weighted))
+
+    def _writable(self) -> None:
+        # Une matrice chargée en mémoire mappée est copiée à la première écriture
+        if not self.matrix.flags.writeable or self.matrix.shape[0] <= self.size:
+            capacity = max(self.size * 2, 16)
+            matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            matrix[:self.size] = self.matrix[:self.size]
+            self.matrix = matrix
+
+    def upsert(self, note_id: str, text: str) -> None:
+        if not self.fitted:
+            self.changes += 1
+            return
+        vector = self.embed([text])[0]
+        position = self.positions.get(note_id)
+        if position is None:
+            self._writable()
+            position = self.size
+            self.ids.append(note_id)
+            self.positions[note_id] = position
+            self.size += 1
+        elif not self.matrix.flags.writeable:
+            self._writable()
+        self.matrix[position] = vector
+        self.changes += 1
+
+    def remove(self, note_id: str) -> None:
+        position = self.positions.pop(note_id, None)
+        if position is None:
+            self.changes += not self.fitted
+            return
+        self._writable()
+        last = self.size - 1
+        if position != last:
+            # La dernière ligne prend la place de la ligne supprimée
+            self.matrix[position] = self.matrix[last]
+            self.ids[position] = self.ids[last]
+            self.positions[self.ids[position]] = position
+        self.ids.pop()
+        self.size -= 1
+        self.changes += 1
+
+    def similar(self, note_ids: Sequence[str], k: int) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Renvoie les k notes les plus proches de chaque note demandée,
+        en un seul produit matriciel pour tout le lot.
+        """
+        known = [note_id for note_id in note_ids if note_id in self.positions]
+        k = min(k, self.size - 1)
+        if not known or k <= 0:
+            return {note_id: [] for note_id in note_ids}
+
+        rows = np.fromiter((self.positions[note_id] for note_id in known), dtype=np.intp)
+        scores = self.matrix[rows] @ self.matrix[:self.size].T
+        # Une note n'est pas liée à elle-même
+        scores[np.arange(len(rows)), rows] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = {note_id: [] for note_id in note_ids}
+        for i, note_id in enumerate(known):
+            order = top[i][np.argsort(-scores[i, top[i]])]
+            # Les notes sans rapport (similarité nulle ou négative) sont écartées
+            results[note_id] = [(self.ids[j], float(scores[i, j])) for j in order if scores[i, j] > 1e-6]
+        return results
+
+    def save(self, directory: str) -> None:
+        """
+        Écrit l'index de façon atomique : dans un répertoire propre à cette
+        sauvegarde, vers lequel le lien symbolique `directory` est ensuite
+        basculé (un seul renommage, sûr entre workers).
+        """
+        parent, name = os.path.split(directory)
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent, prefix=f".{name}.")
+        try:
+            np.save(os.path.join(tmp, "vectors.npy"), np.ascontiguousarray(self.matrix[:self.size]))
+            with open(os.path.join(tmp, "model.pkl"), "wb") as f:
+                pickle.dump((self.tfidf, self.svd), f)
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"ids": self.ids, "built_at": self.built_at}, f)
+            link = f"{tmp}.link"
+            os.symlink(os.path.basename(tmp), link)
+            previous = _unlink_index(directory, keep_link=True)
+            os.replace(link, directory)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        if previous is not None:
+            # Les workers qui l'ont en mémoire mappée gardent leurs fichiers ouverts
+            shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["UserIndex"]:
+        """
+        Recharge un index sauvegardé ; les vecteurs restent en mémoire mappée.
+        """
+        # Lien résolu une fois : les trois fichiers viennent de la même sauvegarde
+        directory = os.path.realpath(directory)
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+            with open(os.path.join(directory, "model.pkl"), "rb") as f:
+                tfidf, svd = pickle.load(f)
+            vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        except (OSError, ValueError, pickle.UnpicklingError):
+            return None
+        return cls(tfidf, svd, meta["ids"], vectors, meta["built_at"])
+
+
+def _unlink_index(directory: str, keep_link: bool = False) -> Optional[str]:
+    """
+    Répertoire de la sauvegarde désignée par le lien `directory` (None sans
+    lien). Sans `keep_link`, le lien est supprimé ; un ancien index stocké
+    directement dans `directory` est supprimé dans tous les cas.
+    """
+    if os.path.islink(directory):
+        target = os.path.join(os.path.dirname(directory), os.readlink(directory))
+        if not keep_link:
+            os.unlink(directory)
+        return target
+    shutil.rmtree(directory, ignore_errors=True)
+    return None
+
+
+def _normalize(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class SemanticIndex:
+    """
+    Index sémantiques par utilisateur, gardés en mémoire selon une politique LRU.
+    """
+
+    def __init__(self, directory: str, max_users: int, max_age: float):
+        self.directory = directory
+        self.max_users = max_users
+        self.max_age = max_age
+        self._indexes: "OrderedDict[str, Optional[UserIndex]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return np is not None
+
+    def _path(self, user_id: str) -> str:
+        return os.path.join(self.directory, user_id)
+
+    def _is_stale(self, index: Optional[UserIndex]) -> bool:
+        if index is None:
+            return True
+        if time.time() - index.built_at > self.max_age:
+            return True
+        if not index.fitted:
+            return index.changes > 0
+        # Le modèle dérive lorsque trop de notes ont changé depuis l'ajustement
+        return index.changes > max(index.size // 2, MIN_NOTES)
+
+    def _remember(self, user_id: str, index: Optional[UserIndex]) -> None:
+        self._indexes[user_id] = index
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > self.max_users:
+            self._indexes.popitem(last=False)
+
+    async def _build(self, db, user_id: str) -> Optional[UserIndex]:
+        cursor = db.notes.find(
+            {"creator_id": user_id, "is_deleted": False}, {"title": 1, "content": 1}
+        )
+        notes = [(str(note["_id"]), note_text(note_codec.decode_note(note))) async for note in cursor]
+        index = await run_in_threadpool(UserIndex.build, notes)
+        if index.fitted:
+            try:
+                await run_in_threadpool(index.save, self._path(user_id))
+            except OSError:
+                # Le snapshot disque n'est qu'une optimisation du démarrage
+                logger.warning("Sauvegarde de l'index sémantique impossible (%s)", user_id, exc_info=True)
+        return index
+
+    async def get(self, db, user_id: str) -> UserIndex:
+        """
+        Renvoie l'index de l'utilisateur (mémoire, snapshot disque ou reconstruction).
+        """
+        if user_id in self._indexes and not self._is_stale(self._indexes[user_id]):
+            self._indexes.move_to_end(user_id)
+            return self._indexes[user_id]
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            if self._is_stale(index):
+                index = await run_in_threadpool(UserIndex.load, self._path(user_id))
+            if self._is_stale(index):
+                index = await self._build(db, user_id)
+            self._remember(user_id, index)
+        self._locks.pop(user_id, None)
+        return index
+
+    async def related(
+        self, db, user_id: str, note_ids: Sequence[str], k: int
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        if not self.enabled:
+            return {note_id: [] for note_id in note_ids}
+        index = await self.get(db, user_id)
+        return index.similar(note_ids, k)
+
+    def upsert(self, user_id: str, note_id: str, note: dict) -> None:
+        """
+        Met à jour la note dans l'index de l'utilisateur s'il est chargé.
+        """
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.upsert(note_id, note_text(note))
+
+    def remove(self, user_id: str, note_id: str) -> None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.remove(note_id)
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        Oublie l'index de l'utilisateur (mémoire et disque) après des écritures
+        en masse : il sera reconstruit à la prochaine lecture.
+        """
+        self._indexes.pop(user_id, None)
+        try:
+            target = _unlink_index(self._path(user_id))
+        except OSError:
+            return
+        if target is not None:
+            shutil.rmtree(target, ignore_errors=True)
+
+    def flush(self) -> None:
+        """
+        Sauvegarde les index modifiés depuis leur chargement (arrêt du worker).
+        """
+        for user_id, index in self._indexes.items():
+            if index is not None and index.fitted and index.changes:
+                try:
+                    index.save(self._path(user_id))
+                except OSError:
+                    logger.exception("Sauvegarde de l'index sémantique impossible (%s)", user_id)
+
+
+semantic_index = SemanticIndex(
+    directory=settings.SEMANTIC_INDEX_DIR,
+    max_users=settings.SEMANTIC_INDEX_MAX_USERS,
+    max_age=settings.SEMANTIC_INDEX_MAX_AGE_SECONDS,
+)
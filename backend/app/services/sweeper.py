@@ -0,0 +1,124 @@
+"""
+Passage au statut « manquée » des révisions en attente dont la date prévue
+est dépassée de plus de REVISION_MISSED_AFTER_HOURS heures.
+
+Le statut est écrit une fois pour toutes plutôt que recalculé à chaque
+lecture, pour que les requêtes filtrent sur `status` par index. Chaque passe
+ne parcourt que la fenêtre écoulée depuis la précédente : le repère
+`swept_until` (date prévue jusqu'à laquelle tout a été traité) est conservé
+dans `job_state`. Les révisions sont lues par l'index `scheduled_date` et
+modifiées par lots de REVISION_SWEEP_BATCH_SIZE (`update_many`), au plus
+REVISION_SWEEP_MAX_BATCHES lots par passe.
+
+Le repère ne dépasse jamais `missed_threshold()` : une révision écrite en
+attente à une date antérieure ne serait jamais reprise. Les écritures
+appliquent donc la même règle (`mark_if_overdue` à la création et pour les
+révisions suivantes, refus d'une replanification dans le passé, voir
+endpoints/revisions.py et scheduler.reschedule). Une révision manquée reste
+à faire : elle demeure dans la file des révisions (due_queue) et peut
+encore être terminée. Les révisions
+marquées sont comptées dans les statistiques quotidiennes (rollups).
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import ASCENDING
+
+from app.core.background import Throttle, acquire_lease
+from app.core.config import settings
+from app.services import rollups
+from app.services.due_queue import due_queue
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LEASE = "revision_sweeper"
+
+
+def missed_threshold(now: Optional[datetime] = None) -> datetime:
+    """
+    Date prévue en deçà de laquelle une révision en attente est manquée.
+    """
+    return (now or datetime.utcnow()) - timedelta(hours=settings.REVISION_MISSED_AFTER_HOURS)
+
+
+def mark_if_overdue(revision: Dict[str, Any], now: datetime) -> bool:
+    """
+    Marque manquée une révision en attente, pas encore écrite, dont la date
+    prévue est déjà dépassée (le balayeur ne la reprendrait pas).
+    """
+    if revision.get("status") == "pending" and revision["scheduled_date"] < missed_threshold(now):
+        revision.update(status="missed", missed_at=now)
+        return True
+    return False
+
+
+def sweep_window(cutoff: datetime, swept_until: Optional[datetime]) -> Dict[str, Any]:
+    """
+    Filtre `scheduled_date` des révisions restant à examiner, du repère
+    `swept_until` (inclus) jusqu'à `cutoff` (exclu).
+    """
+    window: Dict[str, Any] = {"$lt": cutoff}
+    # $gte : les révisions à la date du repère déjà traitées ne sont plus en attente
+    if swept_until is not None:
+        window["$gte"] = swept_until
+    return window
+
+
+async def sweep_missed(db, now: Optional[datetime] = None) -> int:
+    """
+    Passe du balayeur ; renvoie le nombre de révisions marquées manquées.
+    """
+    if not await acquire_lease(db, SWEEP_LEASE, settings.REVISION_SWEEP_INTERVAL_SECONDS * 2):
+        return 0
+    now = now or datetime.utcnow()
+    cutoff = missed_threshold(now)
+    state = await db.job_state.find_one({"_id": SWEEP_LEASE}) or {}
+    swept_until = state.get("swept_until")
+    batch_size = settings.REVISION_SWEEP_BATCH_SIZE
+
+    throttle = Throttle(settings.BACKGROUND_DUTY_CYCLE)
+    missed = 0
+    users = set()
+    for _ in range(settings.REVISION_SWEEP_MAX_BATCHES):
+        batch = await db.revisions.find(
+            {"scheduled_date": sweep_window(cutoff, swept_until), "status": "pending"}, {"scheduled_date": 1, "user_id": 1, "course_id": 1}
+        ).sort("scheduled_date", ASCENDING).limit(batch_size).to_list(batch_size)
+        if not batch:
+            # Fenêtre épuisée : la prochaine passe repart de la limite actuelle
+            swept_until = cutoff
+            break
+        result = await db.revisions.update_many(
+            {"_id": {"$in": [revision["_id"] for revision in batch]}, "status": "pending"},
+            {"$set": {"status": "missed", "missed_at": now}},
+        )
+        missed += result.modified_count
+        marked = batch
+        if result.modified_count < len(batch):
+            # Certaines ont été terminées entre la lecture et la mise à jour
+            marked = await db.revisions.find(
+                {"_id": {"$in": [revision["_id"] for revision in batch]}, "missed_at": now},
+                {"scheduled_date": 1, "user_id": 1, "course_id": 1},
+            ).to_list(None)
+        await rollups.record_missed(db, marked)
+        users.update(revision["user_id"] for revision in batch)
+        swept_until = batch[-1]["scheduled_date"]
+        await db.job_state.update_one(
+            {"_id": SWEEP_LEASE},
+            {"$set": {"swept_until": swept_until}, "$inc": {"missed_total": result.modified_count}},
+        )
+        if len(batch) < batch_size:
+            swept_until = cutoff
+            break
+        await throttle.pause()
+
+    await db.job_state.update_one(
+        {"_id": SWEEP_LEASE},
+        {"$set": {"swept_until": swept_until, "last_run_at": now, "last_run_missed": missed}},
+    )
+    # Le statut figure dans le JSON des files : elles sont rechargées à la prochaine lecture
+    for user_id in users:
+        await due_queue.invalidate(user_id)
+    if missed:
+        logger.info("%d révisions marquées manquées (%d utilisateurs)", missed, len(users))
+    return missed
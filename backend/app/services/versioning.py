@@ -0,0 +1,231 @@
+"""
+Historique compact des versions de notes.
+
+Chaque version est stockée dans `note_versions` soit comme instantané complet,
+soit comme diff avant (liste d'éditions par rapport à la version précédente),
+compressé avec zlib. Un instantané est écrit toutes les
+NOTE_VERSION_SNAPSHOT_INTERVAL versions (ou quand le diff serait plus gros que
+le contenu), ce qui borne le nombre de diffs à rejouer pour reconstruire une
+version quelconque.
+"""
+import difflib
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import Binary
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+
+# Édition : remplace text[start:end] par `text` (positions dans le texte d'origine)
+Edit = Tuple[int, int, str]
+
+SNAPSHOT = "snapshot"
+DIFF = "diff"
+
+
+def compute_edits(old: str, new: str) -> List[Edit]:
+    """
+    Calcule les éditions transformant `old` en `new`, par lignes.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    # Positions de début de chaque ligne de l'ancien texte
+    offsets = [0]
+    for line in old_lines:
+        offsets.append(offsets[-1] + len(line))
+
+    edits: List[Edit] = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            edits.append((offsets[i1], offsets[i2], "".join(new_lines[j1:j2])))
+    return edits
+
+
+def apply_edits(text: str, edits: Sequence[Edit]) -> str:
+    """
+    Applique des éditions non chevauchantes exprimées sur `text`.
+    """
+    ordered = sorted(edits, key=lambda edit: (edit[0], edit[1]))
+    parts = []
+    position = 0
+    for start, end, replacement in ordered:
+        if start < position or end < start or end > len(text):
+            raise ValueError("Éditions invalides ou chevauchantes")
+        parts.append(text[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def rebase_edits(edits: Sequence[Edit], applied: Sequence[Edit]) -> List[Edit]:
+    """
+    Transpose des éditions exprimées sur une version de base pour les
+    appliquer après `applied` (éditions concurrentes sur la même base).
+
+    Lève ValueError si une édition chevauche une édition concurrente.
+    """
+    applied = sorted(applied, key=lambda edit: (edit[0], edit[1]))
+    rebased: List[Edit] = []
+    for start, end, text in edits:
+        shift = 0
+        for a_start, a_end, a_text in applied:
+            if a_end <= start:
+                # Édition concurrente entièrement avant : décalage
+                shift += len(a_text) - (a_end - a_start)
+            elif a_start >= end:
+                break
+            else:
+                raise ValueError("Édition en conflit avec une modification concurrente")
+        rebased.append((start + shift, end + shift, text))
+    return rebased
+
+
+def _pack(payload: Any) -> Binary:
+    return Binary(zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8")))
+
+
+def _unpack(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def build_version_record(
+    note_id: str,
+    version: int,
+    title: str,
+    content: str,
+    created_by: str,
+    previous_content: Optional[str] = None,
+    edits: Optional[List[Edit]] = None,
+) -> Dict[str, Any]:
+    """
+    Construit l'entrée d'historique de `version` : instantané ou diff avant.
+    """
+    record = {
+        "note_id": note_id,
+        "version": version,
+        "title": title,
+        "created_at": datetime.utcnow(),
+        "created_by": created_by,
+    }
+    periodic = (version - 1) % settings.NOTE_VERSION_SNAPSHOT_INTERVAL == 0
+    if previous_content is not None and not periodic:
+        if edits is None:
+            edits = compute_edits(previous_content, content)
+        data = _pack(edits)
+        # Un diff plus gros que le contenu n'apporte rien
+        if len(data) < len(content.encode("utf-8")):
+            record.update(kind=DIFF, data=data)
+            return record
+    record.update(kind=SNAPSHOT, data=_pack(content))
+    return record
+
+
+async def record_version(db, note_id: str, version: int, title: str, content: str,
+                         created_by: str, previous_content: Optional[str] = None,
+                         edits: Optional[List[Edit]] = None, previous_title: Optional[str] = None) -> None:
+    """
+    Enregistre une version dans l'historique de la note.
+
+    Une note antérieure à l'historique n'a aucune entrée : sa version
+    précédente est d'abord enregistrée comme instantané, base des diffs
+    suivants.
+    """
+    if previous_content is not None and await db.note_versions.find_one(
+        {"note_id": note_id, "version": {"$lt": version}}, {"_id": 1}
+    ) is None:
+        try:
+            await db.note_versions.insert_one(build_version_record(
+                note_id, version - 1, previous_title or title, previous_content, created_by
+            ))
+        except DuplicateKeyError:
+            # Enregistrée simultanément par une autre modification
+            pass
+    await db.note_versions.insert_one(build_version_record(
+        note_id, version, title, content, created_by, previous_content, edits
+    ))
+
+
+async def load_edits_since(db, note_id: str, base_version: int, version: int) -> Optional[List[List[Edit]]]:
+    """
+    Éditions successives ayant mené de `base_version` à `version`, ou None si
+    un instantané s'intercale (les éditions ne sont alors pas conservées).
+    """
+    cursor = db.note_versions.find(
+        {"note_id": note_id, "version": {"$gt": base_version, "$lte": version}}
+    ).sort("version", ASCENDING)
+    steps = []
+    async for record in cursor:
+        if record["kind"] != DIFF:
+            return None
+        steps.append([tuple(edit) for edit in _unpack(record["data"])])
+    if len(steps) != version - base_version:
+        return None
+    return steps
+
+
+async def rebase_onto(db, note_id: str, base_version: int, version: int,
+                      content: str, edits: List[Edit]) -> List[Edit]:
+    """
+    Transpose des éditions faites sur `base_version` pour les appliquer à
+    `content`, contenu actuel de la note (version `version`).
+
+    Lève ValueError si la base est trop ancienne ou en cas de conflit.
+    """
+    if version - base_version > settings.NOTE_VERSION_SNAPSHOT_INTERVAL:
+        raise ValueError("Version de base trop ancienne")
+    steps = await load_edits_since(db, note_id, base_version, version)
+    if steps is None:
+        base = await rebuild_version(db, note_id, base_version)
+        if base is None:
+            raise ValueError("Version de base introuvable")
+        steps = [compute_edits(base["content"], content)]
+    for applied in steps:
+        edits = rebase_edits(edits, applied)
+    return edits
+
+
+async def rebuild_version(db, note_id: str, version: int) -> Optional[Dict[str, Any]]:
+    """
+    Reconstruit le contenu d'une version en rejouant les diffs depuis
+    l'instantané le plus proche (au plus NOTE_VERSION_SNAPSHOT_INTERVAL diffs).
+
+    Renvoie None si la version ou une version intermédiaire manque ; lève
+    ValueError si un diff ne s'applique pas (historique corrompu).
+    """
+    snapshot = await db.note_versions.find_one(
+        {"note_id": note_id, "kind": SNAPSHOT, "version": {"$lte": version}},
+        sort=[("version", DESCENDING)],
+    )
+    if snapshot is None:
+        return None
+
+    content = _unpack(snapshot["data"])
+    record = snapshot
+    previous = snapshot["version"]
+    if snapshot["version"] < version:
+        cursor = db.note_versions.find(
+            {"note_id": note_id, "version": {"$gt": snapshot["version"], "$lte": version}}
+        ).sort("version", ASCENDING)
+        async for record in cursor:
+            if record["version"] != previous + 1:
+                return None
+            previous = record["version"]
+            payload = _unpack(record["data"])
+            content = payload if record["kind"] == SNAPSHOT else apply_edits(content, payload)
+        if record["version"] != version:
+            return None
+
+    return {
+        "note_id": note_id,
+        "version": version,
+        "title": record["title"],
+        "content": content,
+        "created_at": record["created_at"],
+        "created_by": record["created_by"],
+    }
@@ -0,0 +1,63 @@
+"""
+Compare la sérialisation d'une page de 100 notes :
+- chemin standard FastAPI (validation `List[NoteResponse]` + jsonable_encoder + json.dumps)
+- chemin rapide (`ModelSerializer.dump_json`, sans validation par élément)
+
+Usage (depuis backend/) :
+
+    python -m benchmarks.bench_list_serialization
+"""
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.responses import ModelSerializer
+from app.models.note import NoteResponse
+
+PAGE_SIZE = 100
+REPEAT = 200
+
+
+def make_docs(count: int = PAGE_SIZE) -> List[dict]:
+    now = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Cours de thermodynamique {i}",
+            "content": "Le premier principe de la thermodynamique... " * 40,
+            "tags": ["physique", "thermodynamique", "L2"],
+            "course_id": str(ObjectId()),
+            "metadata": {"source": "editor", "words": 320},
+            "creator_id": str(ObjectId()),
+            "created_at": now - timedelta(hours=i),
+            "updated_at": now,
+            "version": 3,
+        }
+        for i in range(count)
+    ]
+
+
+adapter = TypeAdapter(List[NoteResponse])
+serializer = ModelSerializer(NoteResponse)
+
+
+def standard_path(docs: List[dict]) -> bytes:
+    validated = adapter.validate_python(docs)
+    content = adapter.dump_python(validated, mode="json", by_alias=True)
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(docs: List[dict]) -> bytes:
+    return serializer.dump_json(docs)
+
+
+if __name__ == "__main__":
+    docs = make_docs()
+    for name, func in (("standard", standard_path), ("rapide", fast_path)):
+        seconds = min(timeit.repeat(lambda: func(docs), number=REPEAT, repeat=3)) / REPEAT
+        print(f"{name:>8} : {seconds * 1000:.3f} ms / page de {PAGE_SIZE} notes")
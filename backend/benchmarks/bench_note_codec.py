@@ -0,0 +1,57 @@
+"""
+Mesure le compromis stockage / latence du codec de contenu des notes :
+taux de compression et temps d'encodage / décodage par note, selon la
+taille de la note et le codec (zlib, zstd).
+
+Usage (depuis backend/) :
+
+    python -m benchmarks.bench_note_codec
+"""
+import random
+import timeit
+
+from app.db import note_codec
+
+SIZES = (4 * 1024, 16 * 1024, 128 * 1024)
+REPEAT = 200
+
+# Vocabulaire de cours : un texte aléatoire sur ce lexique se compresse moins
+# bien qu'un texte répété, et reste proche de vraies notes
+WORDS = (
+    "le la les un une des de du et en à au pour par sur dans avec est sont "
+    "énergie entropie système température pression volume travail chaleur "
+    "principe thermodynamique transformation réversible isotherme adiabatique "
+    "gaz parfait équation état constante molaire cycle Carnot rendement moteur "
+    "démonstration théorème lemme hypothèse conclusion exemple exercice cours "
+    "on considère alors donc ainsi soit où avec 1 2 3 10 100 ΔU = Q + W"
+).split()
+
+
+def make_note(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines, length = [], 0
+    while length < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))) + ".\n"
+        lines.append(line)
+        length += len(line.encode("utf-8"))
+    return "".join(lines)
+
+
+def measure(text: str, codec: int):
+    raw = text.encode("utf-8")
+    packed = note_codec.compress(raw, codec)
+    encode = min(timeit.repeat(lambda: note_codec.compress(raw, codec), number=REPEAT, repeat=3)) / REPEAT
+    decode = min(timeit.repeat(lambda: note_codec.decompress(packed, codec), number=REPEAT, repeat=3)) / REPEAT
+    return len(packed) / len(raw), encode, decode
+
+
+if __name__ == "__main__":
+    codecs = [("zlib", note_codec.ZLIB)]
+    if note_codec.zstandard is not None:
+        codecs.append(("zstd", note_codec.ZSTD))
+    print(f"{'taille':>8} {'codec':>6} {'ratio':>6} {'encodage':>10} {'décodage':>10}")
+    for size in SIZES:
+        text = make_note(size)
+        for name, codec in codecs:
+            ratio, encode, decode = measure(text, codec)
+            print(f"{size // 1024:>6} Ko {name:>6} {ratio:>6.2f} {encode * 1e6:>8.0f} µs {decode * 1e6:>8.0f} µs")
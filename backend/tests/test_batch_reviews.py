@@ -0,0 +1,71 @@
+"""
+Révisions envoyées par lot (POST /revisions/batch) : validation et idempotence.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.revision import RevisionBatchRequest, RevisionReview
+from app.services import scheduler
+
+REVIEWED_AT = datetime(2026, 1, 10, 12, 0)
+
+
+def _completed():
+    return {
+        "_id": ObjectId(),
+        "note_id": str(ObjectId()),
+        "user_id": str(ObjectId()),
+        "course_id": str(ObjectId()),
+        "memory": {"stability": 4.0, "difficulty": 5.0, "last_review": REVIEWED_AT - timedelta(days=4)},
+    }
+
+
+def test_follow_up_upsert_inserts_once_per_revision():
+    next_revision = scheduler.follow_up(_completed(), 2, REVIEWED_AT)
+    query, update = scheduler.follow_up_upsert(next_revision)
+    assert query == {"previous_revision_id": next_revision["previous_revision_id"]}
+    assert update == {"$setOnInsert": next_revision}
+
+
+def test_replayed_review_yields_same_follow_up():
+    revision = _completed()
+    first = scheduler.follow_up(revision, 3, REVIEWED_AT)
+    replay = scheduler.follow_up(revision, 3, REVIEWED_AT)
+    for generated in ("_id", "created_at"):
+        first.pop(generated)
+        replay.pop(generated)
+    assert first == replay
+    assert scheduler.follow_up_upsert(first)[0] == scheduler.follow_up_upsert(replay)[0]
+
+
+def test_reviewed_at_is_stored_as_naive_utc():
+    review = RevisionReview(
+        revision_id=str(ObjectId()),
+        difficulty=2,
+        reviewed_at=datetime(2026, 1, 10, 14, 0, tzinfo=timezone(timedelta(hours=2))),
+    )
+    assert review.reviewed_at == REVIEWED_AT
+    assert review.reviewed_at.tzinfo is None
+
+
+def test_reviewed_at_defaults_to_none():
+    assert RevisionReview(revision_id=str(ObjectId()), difficulty=1).reviewed_at is None
+
+
+@pytest.mark.parametrize("difficulty", [0, 6])
+def test_review_difficulty_out_of_range(difficulty):
+    with pytest.raises(ValidationError):
+        RevisionReview(revision_id=str(ObjectId()), difficulty=difficulty)
+
+
+def test_batch_size_limits():
+    review = {"revision_id": str(ObjectId()), "difficulty": 2}
+    with pytest.raises(ValidationError):
+        RevisionBatchRequest(reviews=[])
+    with pytest.raises(ValidationError):
+        RevisionBatchRequest(reviews=[review] * (settings.REVISION_BATCH_MAX_ITEMS + 1))
+    assert len(RevisionBatchRequest(reviews=[review] * settings.REVISION_BATCH_MAX_ITEMS).reviews) == settings.REVISION_BATCH_MAX_ITEMS
@@ -0,0 +1,52 @@
+"""
+Application et transposition des éditions de PATCH /notes/{id}/content.
+"""
+import pytest
+
+from app.services.versioning import apply_edits, rebase_edits
+
+
+def test_apply_edits_order_independent():
+    edits = [(6, 11, "monde"), (0, 5, "Salut")]
+    assert apply_edits("Hello world", edits) == "Salut monde"
+    assert apply_edits("Hello world", list(reversed(edits))) == "Salut monde"
+
+
+def test_apply_edits_insert_and_delete():
+    assert apply_edits("abc", [(1, 1, "X"), (2, 3, "")]) == "aXb"
+
+
+@pytest.mark.parametrize("edits", [
+    [(0, 3, "x"), (2, 4, "y")],
+    [(2, 1, "x")],
+    [(0, 99, "x")],
+    [(-1, 0, "x")],
+])
+def test_apply_edits_rejects_invalid(edits):
+    with pytest.raises(ValueError):
+        apply_edits("abcdef", edits)
+
+
+def test_rebase_shifts_edits_after_concurrent_change():
+    base = "Hello world"
+    applied = [(0, 5, "Bonjour")]
+    concurrent = apply_edits(base, applied)
+    rebased = rebase_edits([(6, 11, "monde")], applied)
+    assert rebased == [(8, 13, "monde")]
+    assert apply_edits(concurrent, rebased) == "Bonjour monde"
+
+
+def test_rebase_keeps_edits_before_concurrent_change():
+    applied = [(6, 11, "everyone")]
+    assert rebase_edits([(0, 5, "Hi")], applied) == [(0, 5, "Hi")]
+
+
+def test_rebase_accumulates_shifts():
+    applied = [(4, 4, "++"), (0, 2, "")]
+    assert rebase_edits([(6, 7, "z")], applied) == [(6, 7, "z")]
+    assert rebase_edits([(5, 5, "!")], [(0, 1, "abc")]) == [(7, 7, "!")]
+
+
+def test_rebase_rejects_overlap():
+    with pytest.raises(ValueError):
+        rebase_edits([(3, 8, "x")], [(5, 10, "y")])
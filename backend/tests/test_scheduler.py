@@ -0,0 +1,123 @@
+"""
+Planification FSRS (services/scheduler.py).
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services import scheduler
+
+NOW = datetime(2026, 1, 10, 12, 0)
+
+
+def test_retrievability_at_stability_is_90_percent():
+    assert scheduler.retrievability(7.0, 7.0) == pytest.approx(0.9)
+    assert scheduler.retrievability(0.0, 7.0) == pytest.approx(1.0)
+
+
+def test_first_review_uses_initial_weights():
+    for rating, grade in scheduler.GRADES.items():
+        memory = scheduler.review(None, rating, NOW)
+        assert memory["stability"] == scheduler.WEIGHTS[grade - 1]
+        assert 1.0 <= memory["difficulty"] <= 10.0
+        assert memory["last_review"] == NOW
+        assert (memory["reps"], memory["lapses"]) == (1, 0)
+
+
+def test_recall_grows_stability_and_lapse_shrinks_it():
+    memory = scheduler.review(None, 2, NOW)
+    later = NOW + timedelta(days=5)
+    recalled = scheduler.review(memory, 2, later)
+    forgotten = scheduler.review(memory, 5, later)
+    assert recalled["stability"] > memory["stability"]
+    assert forgotten["stability"] <= memory["stability"]
+    assert (recalled["reps"], recalled["lapses"]) == (2, 0)
+    assert (forgotten["reps"], forgotten["lapses"]) == (2, 1)
+    assert forgotten["difficulty"] > recalled["difficulty"]
+
+
+def test_easier_rating_never_schedules_sooner():
+    memory = scheduler.review(None, 2, NOW)
+    later = NOW + timedelta(days=3)
+    intervals = [scheduler.next_interval(scheduler.review(memory, rating, later)["stability"]) for rating in (5, 4, 2, 1)]
+    assert intervals == sorted(intervals)
+
+
+def test_next_interval_bounds():
+    assert scheduler.next_interval(0.01) == 1
+    assert scheduler.next_interval(1e6, max_days=30) == 30
+    # À 90 % de rétention, l'intervalle vaut la stabilité
+    assert scheduler.next_interval(12.0, retention=0.9) == 12
+
+
+def test_next_interval_numpy_matches_scalar():
+    np = pytest.importorskip("numpy")
+    stability = np.array([0.01, 3.4, 12.0, 1e6])
+    days = scheduler.next_interval(stability, 0.85, 365)
+    assert days.tolist() == [scheduler.next_interval(s, 0.85, 365) for s in stability.tolist()]
+
+
+def _revision(memory=None):
+    return {
+        "_id": ObjectId(),
+        "note_id": str(ObjectId()),
+        "user_id": str(ObjectId()),
+        "course_id": None,
+        "scheduled_date": NOW,
+        "status": "completed",
+        "memory": memory,
+    }
+
+
+def test_follow_up_links_and_schedules():
+    revision = _revision()
+    next_revision = scheduler.follow_up(revision, 2, NOW)
+    assert next_revision["previous_revision_id"] == str(revision["_id"])
+    assert next_revision["note_id"] == revision["note_id"]
+    assert next_revision["user_id"] == revision["user_id"]
+    assert next_revision["status"] == "pending"
+    assert next_revision["memory"]["last_review"] == NOW
+    assert next_revision["scheduled_date"] == scheduler.next_review_date(next_revision["memory"])
+    assert next_revision["scheduled_date"] > NOW
+
+
+def _pending(stability, last_review, scheduled_date):
+    return {
+        "_id": ObjectId(),
+        "scheduled_date": scheduled_date,
+        "memory": {"stability": stability, "last_review": last_review},
+    }
+
+
+def test_reschedule_batch_only_updates_changed_dates():
+    pytest.importorskip("numpy")
+    last_review = NOW - timedelta(days=2)
+    interval = scheduler.next_interval(10.0, 0.9, 365)
+    unchanged = _pending(10.0, last_review, last_review + timedelta(days=interval))
+    moved = _pending(10.0, last_review, NOW + timedelta(days=30))
+    updates = scheduler._reschedule_batch([unchanged, moved], 0.9, 365, NOW)
+    assert len(updates) == 1
+    assert updates[0]._filter == {"_id": moved["_id"], "status": "pending"}
+    assert updates[0]._doc == {"$set": {"scheduled_date": last_review + timedelta(days=interval)}}
+
+
+def test_reschedule_batch_never_moves_into_the_past():
+    pytest.importorskip("numpy")
+    # Nouvelle date théorique déjà passée : la révision est due maintenant
+    future = _pending(1.0, NOW - timedelta(days=20), NOW + timedelta(days=3))
+    updates = scheduler._reschedule_batch([future], 0.9, 365, NOW)
+    assert updates[0]._doc["$set"]["scheduled_date"] == NOW
+    # Révision déjà en retard : sa date actuelle est conservée
+    overdue = _pending(1.0, NOW - timedelta(days=20), NOW - timedelta(days=5))
+    assert scheduler._reschedule_batch([overdue], 0.9, 365, NOW) == []
+
+
+def test_reschedule_batch_is_idempotent():
+    pytest.importorskip("numpy")
+    batch = [_pending(s, NOW - timedelta(days=1), NOW + timedelta(days=40)) for s in (2.0, 8.0, 50.0)]
+    for update in scheduler._reschedule_batch(batch, 0.9, settings.REVISION_MAX_INTERVAL_DAYS, NOW):
+        revision = next(r for r in batch if r["_id"] == update._filter["_id"])
+        revision["scheduled_date"] = update._doc["$set"]["scheduled_date"]
+    assert scheduler._reschedule_batch(batch, 0.9, settings.REVISION_MAX_INTERVAL_DAYS, NOW) == []
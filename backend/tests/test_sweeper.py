@@ -0,0 +1,69 @@
+"""
+Balayeur des révisions manquées (services/sweeper.py) : seuil et fenêtre.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.services import sweeper
+
+NOW = datetime(2026, 1, 10, 12, 0)
+DELAY = timedelta(hours=settings.REVISION_MISSED_AFTER_HOURS)
+
+
+def _in_window(date, window):
+    return date < window["$lt"] and ("$gte" not in window or date >= window["$gte"])
+
+
+def test_missed_threshold():
+    assert sweeper.missed_threshold(NOW) == NOW - DELAY
+
+
+@pytest.mark.parametrize("offset, overdue", [
+    (timedelta(seconds=-1), True),
+    (timedelta(0), False),
+    (timedelta(seconds=1), False),
+])
+def test_mark_if_overdue_boundary(offset, overdue):
+    revision = {"status": "pending", "scheduled_date": NOW - DELAY + offset}
+    assert sweeper.mark_if_overdue(revision, NOW) is overdue
+    if overdue:
+        assert revision["status"] == "missed"
+        assert revision["missed_at"] == NOW
+    else:
+        assert revision["status"] == "pending"
+        assert "missed_at" not in revision
+
+
+@pytest.mark.parametrize("status", ["completed", "missed"])
+def test_mark_if_overdue_ignores_other_statuses(status):
+    revision = {"status": status, "scheduled_date": NOW - timedelta(days=30)}
+    assert sweeper.mark_if_overdue(revision, NOW) is False
+    assert revision == {"status": status, "scheduled_date": NOW - timedelta(days=30)}
+
+
+def test_first_sweep_window_is_open_ended():
+    cutoff = sweeper.missed_threshold(NOW)
+    assert sweeper.sweep_window(cutoff, None) == {"$lt": cutoff}
+
+
+def test_sweep_window_starts_at_high_water_mark():
+    swept_until = NOW - timedelta(days=2)
+    cutoff = sweeper.missed_threshold(NOW)
+    window = sweeper.sweep_window(cutoff, swept_until)
+    assert window == {"$lt": cutoff, "$gte": swept_until}
+    assert _in_window(swept_until, window)
+    assert not _in_window(swept_until - timedelta(seconds=1), window)
+    assert not _in_window(cutoff, window)
+
+
+def test_revisions_left_pending_are_reached_by_later_sweeps():
+    # Repère laissé par une passe à NOW : au plus le seuil de cette passe
+    swept_until = sweeper.missed_threshold(NOW)
+    # Révision écrite ensuite et non marquée : sa date n'est pas sous le repère
+    revision = {"status": "pending", "scheduled_date": sweeper.missed_threshold(NOW + timedelta(minutes=5))}
+    written_at = NOW + timedelta(minutes=5)
+    assert not sweeper.mark_if_overdue(revision, written_at)
+    later = sweeper.sweep_window(sweeper.missed_threshold(written_at + timedelta(seconds=1)), swept_until)
+    assert _in_window(revision["scheduled_date"], later)
@@ -0,0 +1,62 @@
+"""
+Historique compact des versions (services/versioning.py) : diffs et instantanés.
+"""
+import pytest
+
+from app.core.config import settings
+from app.services import versioning
+
+
+@pytest.mark.parametrize("old, new", [
+    ("", ""),
+    ("", "une ligne\n"),
+    ("une ligne\n", ""),
+    ("a\nb\nc\n", "a\nB\nc\n"),
+    ("a\nb\nc\n", "a\nc\nd\ne\n"),
+    ("sans fin de ligne", "sans fin de ligne, modifiée"),
+    ("été\nçà\n", "été\nlà\nici\n"),
+])
+def test_compute_edits_round_trip(old, new):
+    edits = versioning.compute_edits(old, new)
+    assert versioning.apply_edits(old, edits) == new
+
+
+def test_compute_edits_identical_texts():
+    assert versioning.compute_edits("a\nb\n", "a\nb\n") == []
+
+
+def test_pack_round_trip():
+    payload = [[0, 3, "é\n"], [5, 5, ""]]
+    assert versioning._unpack(versioning._pack(payload)) == payload
+
+
+def _record(version, content, previous_content=None):
+    return versioning.build_version_record("note", version, "titre", content, "user", previous_content)
+
+
+def test_first_version_is_snapshot():
+    record = _record(1, "contenu")
+    assert record["kind"] == versioning.SNAPSHOT
+    assert versioning._unpack(record["data"]) == "contenu"
+
+
+def test_small_change_on_large_content_is_diff():
+    previous = "".join(f"ligne {i}\n" for i in range(200))
+    content = previous.replace("ligne 100\n", "ligne cent\n")
+    record = _record(2, content, previous)
+    assert record["kind"] == versioning.DIFF
+    edits = [tuple(edit) for edit in versioning._unpack(record["data"])]
+    assert versioning.apply_edits(previous, edits) == content
+
+
+def test_periodic_snapshot(monkeypatch):
+    monkeypatch.setattr(settings, "NOTE_VERSION_SNAPSHOT_INTERVAL", 5)
+    previous = "".join(f"ligne {i}\n" for i in range(200))
+    content = previous + "fin\n"
+    kinds = {version: _record(version, content, previous)["kind"] for version in range(2, 12)}
+    assert [v for v, kind in kinds.items() if kind == versioning.SNAPSHOT] == [6, 11]
+
+
+def test_diff_larger_than_content_is_snapshot():
+    record = _record(2, "b", "a")
+    assert record["kind"] == versioning.SNAPSHOT